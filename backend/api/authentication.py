@@ -0,0 +1,86 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """Small per-process LRU of User objects whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            # Views may modify request.user; they must not modify the cached instance
+            return copy.copy(entry[0])
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+def invalidate_user(user):
+    """Drop ``user`` from this process's cache after it changed; other workers expire it within USER_CACHE_TTL."""
+    user_cache.invalidate(str(getattr(user, api_settings.USER_ID_FIELD)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps recently seen users in a TTL/LRU cache.
+
+    For endpoints that need the full User (profile, permissions); a cached user is at most
+    USER_CACHE_TTL seconds old, so deactivating an account takes effect within that time.
+    """
+
+    def get_user(self, validated_token):
+        user_id = str(validated_token.get(api_settings.USER_ID_CLAIM))
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        return user
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Trusts the claims of a validated token without reading the User row.
+
+    The default authentication with JWT_STATELESS_AUTH: ``request.user`` is a TokenUser
+    carrying the user id from the token, so views that need the full User set
+    ``authentication_classes = [CachedJWTAuthentication]``.
+    """
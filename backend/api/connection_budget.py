@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+
+class ConnectionBudgetTimeout(TimeoutError):
+    pass
+
+
+class ConnectionBudget:
+    """
+    Caps the connections this process holds open to the primary database, across stacks.
+
+    Django's ORM, the sync SQLAlchemy engines and the async ones each take a slot before
+    opening a connection and give it back when it is closed. Idle pooled connections still
+    hold their slot, so a connect that finds the budget full first asks the reclaimers to
+    close some before waiting for one to be returned.
+    """
+
+    def __init__(self, limit):
+        # 0 or less counts connections without capping them
+        self.limit = limit
+        self._cond = threading.Condition()
+        self._reclaimers = []
+        self.in_use = Counter()
+        self.waiting = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.reclaimed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def add_reclaimer(self, reclaim):
+        """``reclaim()`` closes one idle connection if it can and returns whether it did."""
+        self._reclaimers.append(reclaim)
+
+    def _full(self):
+        return 0 < self.limit <= sum(self.in_use.values())
+
+    def _reclaim(self):
+        for reclaim in self._reclaimers:
+            if reclaim():
+                self.reclaimed += 1
+                return True
+        return False
+
+    def acquire(self, stack, timeout, sleep=None):
+        """
+        Take a slot for a new connection of ``stack``.
+
+        Args:
+            stack (str): Label the slot is counted under.
+            timeout (float): Seconds to wait for a slot.
+            sleep (callable): Waits between attempts instead of blocking on the lock, for
+                callers on an event loop, which must not block the thread.
+
+        Raises:
+            ConnectionBudgetTimeout: No slot was freed within ``timeout``.
+        """
+        started = None
+        while True:
+            with self._cond:
+                if self._full():
+                    self._reclaim()
+                if not self._full():
+                    self.in_use[stack] += 1
+                    if started is not None:
+                        self._finish_wait(time.perf_counter() - started)
+                    return
+                if started is None:
+                    started = time.perf_counter()
+                    self.waiting += 1
+                remaining = timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self._finish_wait(time.perf_counter() - started)
+                    self.timeouts += 1
+                    print(f"Connection budget of {self.limit} exhausted: {dict(self.in_use)} open, {stack} gave up after {timeout}s")
+                    raise ConnectionBudgetTimeout(f"No database connection available within {timeout}s (budget {self.limit})")
+                if sleep is None:
+                    self._cond.wait(remaining)
+            if sleep is not None:
+                sleep(min(remaining, 0.01))
+
+    def _finish_wait(self, seconds):
+        self.waiting -= 1
+        self.waits += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def release(self, stack):
+        with self._cond:
+            if self.in_use[stack] > 0:
+                self.in_use[stack] -= 1
+            self._cond.notify()
+
+    def reset(self):
+        """Forget every slot, for a forked child that doesn't own its parent's connections."""
+        self._cond = threading.Condition()
+        self.in_use = Counter()
+        self.waiting = 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit if self.limit > 0 else None,
+                'open': sum(self.in_use.values()),
+                'by_stack': {stack: count for stack, count in self.in_use.items() if count},
+                'waiting': self.waiting,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'reclaimed_idle': self.reclaimed,
+                'avg_wait_ms': round(self.total_wait / self.waits * 1000, 3) if self.waits else None,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+connection_budget = ConnectionBudget(settings.DB_CONNECTION_BUDGET)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+
+from api.connection_budget import connection_budget, ConnectionBudgetTimeout
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """The PostgreSQL backend, taking a connection budget slot for each connection it opens."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_budget_slot = False
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection_budget.acquire('django', settings.DB_BUDGET_TIMEOUT)
+        except ConnectionBudgetTimeout as e:
+            raise OperationalError(str(e)) from e
+        try:
+            connection = super().get_new_connection(conn_params)
+        except BaseException:
+            connection_budget.release('django')
+            raise
+        self._holds_budget_slot = True
+        return connection
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            if self._holds_budget_slot:
+                self._holds_budget_slot = False
+                connection_budget.release('django')
@@ -0,0 +1,434 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.util import await_only, queue as sqla_queue
+
+from api.connection_budget import connection_budget, ConnectionBudgetTimeout
+
+_engines = {}
+_sessionmakers = {}
+_lock = threading.Lock()
+# Async engines are bound to the event loop that created their connections: {loop: {name: engine}}
+_async_engines = {}
+# Budget slots held by the async engines of each loop, see _use_budget
+_async_slots = {}
+_async_lock = threading.Lock()
+
+
+class PoolMetrics:
+    """Checkout timings for one pool. Waits include opening a new connection when the pool grows."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record_checkout(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.recent_waits.append(seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.recent_waits)
+            p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'avg_checkout_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else None,
+                'p95_checkout_wait_ms': round(p95 * 1000, 3) if p95 is not None else None,
+                'max_checkout_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        event.listen(self, 'connect', lambda *_: self.metrics.record_connect())
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return record
+
+    def release_idle(self):
+        """Close one checked-in connection for good, shrinking the pool. Returns whether there was one."""
+        try:
+            record = self._pool.get(False)
+        except sqla_queue.Empty:
+            return False
+        # What QueuePool does with a connection returned to a full pool
+        connected = record.dbapi_connection is not None
+        try:
+            record.close()
+        finally:
+            self._dec_overflow()
+        return connected
+
+
+def engine_options():
+    return {
+        'poolclass': MeteredQueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+
+
+def _database_url(name):
+    if name == 'default':
+        return settings.DATABASE_URL
+    if name == 'replica':
+        return settings.DATABASE_REPLICA_URL
+    if name == 'direct':
+        return settings.DATABASE_DIRECT_URL or settings.DATABASE_URL
+    raise KeyError(f"Unknown database: {name}")
+
+
+# Engines connecting to the primary server, whose connections count against the budget
+BUDGETED_DATABASES = ('default', 'direct')
+
+
+def _use_budget(engine, stack, sleep=None):
+    """
+    Take a connection budget slot before each connect of ``engine`` and return it on close.
+
+    Returns:
+        dict: ``slots`` the engine's connections hold; once ``abandoned`` is set (the slots were
+            given back for them, see _release_closed_loop_slots) closing them returns nothing.
+    """
+    held = {'stack': stack, 'slots': 0, 'abandoned': False}
+
+    def give_back():
+        if not held['abandoned']:
+            held['slots'] -= 1
+            connection_budget.release(stack)
+
+    @event.listens_for(engine, 'do_connect')
+    def acquire(dialect, connection_record, cargs, cparams):
+        try:
+            connection_budget.acquire(stack, settings.DB_BUDGET_TIMEOUT, sleep)
+        except ConnectionBudgetTimeout as e:
+            # Surfaces like an exhausted pool
+            raise exc.TimeoutError(str(e)) from e
+        held['slots'] += 1
+        try:
+            connection = dialect.connect(*cargs, **cparams)
+        except BaseException:
+            give_back()
+            raise
+        connection_record.info['budget_stack'] = stack
+        return connection
+
+    def release(dbapi_connection, connection_record):
+        if connection_record is not None and connection_record.info.pop('budget_stack', None):
+            give_back()
+
+    event.listen(engine, 'close', release)
+    # Detached connections (the delta listener's) are closed outside the pool
+    event.listen(engine, 'close_detached', lambda dbapi_connection: give_back())
+    return held
+
+
+def _release_idle_connection():
+    for name in BUDGETED_DATABASES:
+        engine = _engines.get(name)
+        if engine is not None and isinstance(engine.pool, MeteredQueuePool) and engine.pool.release_idle():
+            return True
+    return False
+
+
+def _release_closed_loop_slots():
+    """
+    Give back the slots of async engines whose event loop has closed.
+
+    Their connections can't be used or closed anymore (asyncpg needs the loop), so the slots
+    are returned without waiting for the garbage collector to drop the sockets.
+    """
+    with _async_lock:
+        closed = [loop for loop in _async_engines if loop.is_closed()]
+        abandoned = []
+        for loop in closed:
+            del _async_engines[loop]
+            abandoned.extend(_async_slots.pop(loop, []))
+    released = False
+    for held in abandoned:
+        held['abandoned'] = True
+        for _ in range(held['slots']):
+            connection_budget.release(held['stack'])
+        released = released or held['slots'] > 0
+        held['slots'] = 0
+    return released
+
+
+connection_budget.add_reclaimer(_release_idle_connection)
+connection_budget.add_reclaimer(_release_closed_loop_slots)
+
+
+def _async_sleep(seconds):
+    # Connects of async engines run in a greenlet on the event loop
+    await_only(asyncio.sleep(seconds))
+
+
+def pgbouncer_connect_args():
+    """
+    asyncpg arguments for a PgBouncer in transaction pooling mode.
+
+    Consecutive transactions may run on different server connections there, so asyncpg must
+    not cache prepared statements, and the ones it still needs get unique names.
+    """
+    return {
+        'statement_cache_size': 0,
+        'prepared_statement_name_func': lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+def get_engine(name='default'):
+    """
+    Process-wide engine for ``name``, created on first use.
+
+    Every request, job and command shares the engine and its pool instead of paying for a
+    new pool and TLS handshake per call.
+    """
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+    with _lock:
+        if name not in _engines:
+            db_url = _database_url(name)
+            if not db_url:
+                raise ValueError("DATABASE_URL environment variable is not set")
+            options = engine_options()
+            if name == 'replica':
+                # An unreachable replica must fail its health check quickly, not hang it
+                options['connect_args'] = {'connect_timeout': settings.REPLICA_CONNECT_TIMEOUT}
+            _engines[name] = create_engine(db_url, **options)
+            if name in BUDGETED_DATABASES:
+                _use_budget(_engines[name], 'sqlalchemy')
+            _sessionmakers[name] = sessionmaker(bind=_engines[name])
+        return _engines[name]
+
+
+def get_sessionmaker(name='default'):
+    get_engine(name)
+    return _sessionmakers[name]
+
+
+def async_database_url(db_url):
+    """
+    Translate a psycopg2 URL to asyncpg.
+
+    asyncpg has no ``sslmode`` parameter; the mode is passed as its ``ssl`` argument instead.
+    Likewise ``application_name`` goes to the server as one of its ``server_settings``.
+
+    Returns:
+        tuple: ``(url, connect_args)``
+    """
+    url = make_url(db_url)
+    connect_args = {}
+    if url.get_backend_name() == 'postgresql':
+        sslmode = url.query.get('sslmode')
+        application_name = url.query.get('application_name')
+        url = url.set(drivername='postgresql+asyncpg').difference_update_query(['sslmode', 'application_name'])
+        if sslmode and sslmode != 'disable':
+            connect_args['ssl'] = sslmode
+        if application_name:
+            connect_args['server_settings'] = {'application_name': application_name}
+    return url, connect_args
+
+
+def get_async_engine(name='default'):
+    """
+    AsyncEngine for ``name`` on the running event loop.
+
+    Under uvicorn each worker runs a single loop, so this is one shared engine per process.
+    Code driven through async_to_sync (the WSGI server) gets a fresh loop per call and with it
+    a separate engine, which keeps asyncpg connections from being used across loops; such
+    callers must await dispose_async_engines() before their loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    engines = _async_engines.get(loop, {})
+    if name not in engines:
+        _release_closed_loop_slots()
+        # Imported here so the sync stack doesn't need asyncpg/greenlet installed
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        db_url = _database_url(name)
+        if not db_url:
+            raise ValueError("DATABASE_URL environment variable is not set")
+        url, connect_args = async_database_url(db_url)
+        if settings.DB_PGBOUNCER:
+            url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+            connect_args.update(pgbouncer_connect_args())
+        options = engine_options()
+        # Async engines need the asyncio-aware pool they pick by default
+        options.pop('poolclass')
+        engine = create_async_engine(url, connect_args=connect_args, **options)
+        held = _use_budget(engine.sync_engine, 'sqlalchemy_async', _async_sleep) if name in BUDGETED_DATABASES else None
+        with _async_lock:
+            _async_engines.setdefault(loop, {})[name] = engine
+            if held is not None:
+                _async_slots.setdefault(loop, []).append(held)
+        return engine
+    return engines[name]
+
+
+async def dispose_async_engines():
+    """Close the async engines of the running loop and their connections, for loops about to end."""
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        engines = _async_engines.pop(loop, {})
+        _async_slots.pop(loop, None)
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def get_async_sessionmaker(name='default'):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    # Objects must stay readable after commit without lazy IO, which AsyncSession can't do implicitly
+    return async_sessionmaker(get_async_engine(name), expire_on_commit=False)
+
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+# (an idle primary doesn't make a caught-up replica stale) or isn't a standby at all
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_replica_state = {'checked_at': None, 'usable': False, 'lag_seconds': None, 'error': None}
+_replica_lock = threading.Lock()
+
+
+def _replica_lag():
+    with get_engine('replica').connect() as conn:
+        return float(conn.execute(REPLICA_LAG_QUERY).scalar())
+
+
+def _check_replica():
+    try:
+        lag = _replica_lag()
+        usable = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        error = None if usable else f"Replica is {lag:.1f}s behind"
+    except Exception as e:
+        lag, usable, error = None, False, str(e)
+    if not usable and _replica_state['usable']:
+        print(f"Routing reads to the primary: {error}")
+    _replica_state.update(checked_at=time.monotonic(), usable=usable, lag_seconds=lag, error=error)
+
+
+def read_database_name():
+    """
+    Database that read-only work should use: 'replica' or 'default' (the primary).
+
+    The replica is used when DATABASE_REPLICA_URL is set, it answers, and it is at most
+    REPLICA_MAX_LAG_SECONDS behind. That is checked at most every REPLICA_CHECK_INTERVAL
+    seconds by one thread; the others keep using the last result meanwhile.
+    """
+    if not settings.DATABASE_REPLICA_URL:
+        return 'default'
+    checked_at = _replica_state['checked_at']
+    if checked_at is None or time.monotonic() - checked_at >= settings.REPLICA_CHECK_INTERVAL:
+        # The first check is waited for; later ones only by the thread doing them
+        if _replica_lock.acquire(blocking=checked_at is None):
+            try:
+                if _replica_state['checked_at'] == checked_at:
+                    _check_replica()
+            finally:
+                _replica_lock.release()
+    return 'replica' if _replica_state['usable'] else 'default'
+
+
+def replica_status():
+    if not settings.DATABASE_REPLICA_URL:
+        return None
+    return {
+        'routing_reads': _replica_state['usable'],
+        'lag_seconds': _replica_state['lag_seconds'],
+        'error': _replica_state['error'],
+    }
+
+
+def get_read_engine():
+    """Engine for reads that tolerate REPLICA_MAX_LAG_SECONDS of staleness, see read_database_name."""
+    return get_engine(read_database_name())
+
+
+def get_read_sessionmaker():
+    return get_sessionmaker(read_database_name())
+
+
+def pool_stats():
+    """Pool occupancy and checkout timings of every engine created so far."""
+    stats = {}
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        stats[name] = {
+            'pool_size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': checked_out,
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'utilization': round(checked_out / capacity, 3) if capacity else None,
+            **(pool.metrics.snapshot() if isinstance(pool, MeteredQueuePool) else {}),
+        }
+    return stats
+
+
+def dispose_engines():
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _sessionmakers.clear()
+
+
+def _reset_after_fork():
+    # A forked worker must not reuse the parent's sockets; drop them without closing
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    connection_budget.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
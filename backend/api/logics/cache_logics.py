@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time as clock
+from datetime import date, datetime, time
+
+from django.conf import settings
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from api.models import get_db_connection, SearchedCompanies
+from api.logics.version_logics import get_data_version, TWEETS
+
+_table = SearchedCompanies.__table__
+# Lookups answered by this process
+_stats = {'hits': 0, 'misses': 0, 'flushes': 0}
+# Hits not yet written to searched_companies: {(company, cache_key): [count, last_accessed_at]}
+_pending_hits = {}
+_pending_lock = threading.Lock()
+_flusher_started = False
+
+
+def get_cached_companies(conn, companies, cache_key):
+    """
+    Cached payloads of ``companies`` for ``cache_key``, counting a hit on each one found.
+
+    Lookups only read: hits are counted in memory and written in batches by flush_hits.
+
+    Args:
+        conn: SQLAlchemy connection.
+        companies (list): Company names.
+        cache_key (str): ETL validator (etl_validator) the payloads must have been built for.
+
+    Returns:
+        dict: ``{company: payload}`` for the companies that were cached.
+    """
+    if not companies:
+        return {}
+    rows = conn.execute(
+        select(_table.c.company, _table.c.response)
+        .where(_table.c.cache_key == cache_key, _table.c.company.in_(companies))
+    )
+    found = {row.company: row.response for row in rows}
+    now = datetime.now()
+    with _pending_lock:
+        for company in found:
+            pending = _pending_hits.setdefault((company, cache_key), [0, now])
+            pending[0] += 1
+            pending[1] = now
+        _stats['hits'] += len(found)
+        _stats['misses'] += len(companies) - len(found)
+    if found:
+        _start_flusher()
+    return found
+
+
+def flush_hits(conn):
+    """
+    Add the hits counted by this process to hit_count and last_accessed_at, in one batch.
+
+    Args:
+        conn: SQLAlchemy connection inside a transaction, on the primary.
+
+    Returns:
+        int: Number of entries updated.
+    """
+    with _pending_lock:
+        pending = dict(_pending_hits)
+        _pending_hits.clear()
+    if not pending:
+        return 0
+    try:
+        conn.execute(
+            update(_table)
+            .where(_table.c.company == bindparam('_company'), _table.c.cache_key == bindparam('_cache_key'))
+            .values(
+                hit_count=_table.c.hit_count + bindparam('_hits'),
+                last_accessed_at=func.greatest(_table.c.last_accessed_at, bindparam('_accessed_at')),
+            ),
+            [
+                {'_company': company, '_cache_key': cache_key, '_hits': count, '_accessed_at': accessed_at}
+                for (company, cache_key), (count, accessed_at) in pending.items()
+            ],
+        )
+    except Exception:
+        # Put them back for the next flush
+        with _pending_lock:
+            for key, (count, accessed_at) in pending.items():
+                current = _pending_hits.setdefault(key, [0, accessed_at])
+                current[0] += count
+                current[1] = max(current[1], accessed_at)
+        raise
+    with _pending_lock:
+        _stats['flushes'] += 1
+    return len(pending)
+
+
+def _flush_forever():
+    while True:
+        clock.sleep(settings.COMPANY_CACHE_HIT_FLUSH_SECONDS)
+        try:
+            engine, _ = get_db_connection()
+            with engine.begin() as conn:
+                flush_hits(conn)
+        except Exception as e:
+            print(f"Company cache hit flush failed: {str(e)}")
+
+
+def _start_flusher():
+    # Started by the first hit rather than at import, like the hot tier's sync thread
+    global _flusher_started
+    if _flusher_started or settings.COMPANY_CACHE_HIT_FLUSH_SECONDS <= 0:
+        return
+    with _pending_lock:
+        if _flusher_started:
+            return
+        _flusher_started = True
+    threading.Thread(target=_flush_forever, name='company-cache-hits', daemon=True).start()
+
+
+def store_companies(conn, payloads, cache_key, data_version):
+    """
+    Insert or replace the payloads of several companies for ``cache_key``.
+
+    Args:
+        conn: SQLAlchemy connection inside a transaction.
+        payloads (dict): ``{company: payload}``, payloads being JSON-serializable.
+        cache_key (str): ETL validator the payloads were built for.
+        data_version (int): Tweets data version read before building them.
+    """
+    if not payloads:
+        return
+    now = datetime.now()
+    records = []
+    for company, payload in payloads.items():
+        body = json.dumps(payload)
+        records.append({
+            'company': company,
+            'cache_key': cache_key,
+            # Stored from the serialized form so numpy scalars never reach the driver
+            'response': json.loads(body),
+            'data_version': data_version,
+            'size_bytes': len(body),
+            'hit_count': 0,
+            'created_at': now,
+            'last_accessed_at': now,
+        })
+    statement = insert(_table)
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=['company', 'cache_key'],
+        set_={
+            'response': statement.excluded.response,
+            'data_version': statement.excluded.data_version,
+            'size_bytes': statement.excluded.size_bytes,
+            'created_at': statement.excluded.created_at,
+            'last_accessed_at': statement.excluded.last_accessed_at,
+        },
+    ), records)
+
+
+def evict(conn):
+    """
+    Drop entries that can no longer be hit, then the least recently used ones over budget.
+
+    Entries are unreachable once the tweets data version moved or the day rolled over (both
+    are part of the ETL validator). The rest is trimmed to COMPANY_CACHE_MAX_ENTRIES entries
+    and COMPANY_CACHE_MAX_BYTES of payload, keeping the most recently accessed.
+
+    Returns:
+        int: Number of entries removed.
+    """
+    # Recency of the entries is only known once this process's hits are written
+    flush_hits(conn)
+    version, _ = get_data_version(conn, TWEETS)
+    removed = conn.execute(
+        _table.delete().where(_table.c.cache_key.isnot(None)).where(
+            (_table.c.data_version < version) | (_table.c.created_at < datetime.combine(date.today(), time.min))
+        )
+    ).rowcount
+    removed += conn.execute(text("""
+        DELETE FROM searched_companies WHERE id IN (
+            SELECT id FROM (
+                SELECT id,
+                       row_number() OVER recent AS position,
+                       sum(size_bytes) OVER recent AS total_bytes
+                FROM searched_companies
+                WHERE cache_key IS NOT NULL
+                WINDOW recent AS (ORDER BY last_accessed_at DESC, id DESC)
+            ) ranked
+            WHERE position > :max_entries OR total_bytes > :max_bytes
+        )
+    """), {'max_entries': settings.COMPANY_CACHE_MAX_ENTRIES, 'max_bytes': settings.COMPANY_CACHE_MAX_BYTES}).rowcount
+    return removed
+
+
+def company_cache_stats():
+    """Hits and misses of the lookups made by this process, and its unwritten hits (no database access)."""
+    with _pending_lock:
+        return {**_stats, 'pending_hits': sum(count for count, _ in _pending_hits.values())}
+
+
+def _reset_after_fork():
+    # The parent flushes its own hits; its flusher thread doesn't exist in the child
+    global _pending_lock, _flusher_started
+    _pending_lock = threading.Lock()
+    _pending_hits.clear()
+    _flusher_started = False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def cache_stats(conn):
+    """Entry count, payload bytes and total hits of the company cache."""
+    entries, size_bytes, hits = conn.execute(
+        select(func.count(), func.coalesce(func.sum(_table.c.size_bytes), 0), func.coalesce(func.sum(_table.c.hit_count), 0))
+        .where(_table.c.cache_key.isnot(None))
+    ).one()
+    return {'entries': entries, 'bytes': int(size_bytes), 'hits': int(hits)}
@@ -0,0 +1,170 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from sqlalchemy import func, select
+
+from api.models import get_db_connection, CompanyDailyStats, Tweet, DAILY_STATS_COMPLETE
+from api.logics.version_logics import data_version_query, get_data_version, TWEETS
+
+
+def normalize(name):
+    return ' '.join(name.casefold().split())
+
+
+class CompanyIndex:
+    """
+    Sorted prefix index over company names, answering autocomplete lookups with bisect.
+
+    Every company is indexed under its full name and under each later word ("inc" finds
+    "Apple Inc."), so a lookup is two binary searches plus a scan of the matching range.
+    """
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self._normalized = {company: normalize(company) for company in self.counts}
+        entries = sorted(
+            (key, company)
+            for company in self.counts
+            for key in self._index_keys(company)
+        )
+        self._keys_sorted = [key for key, _ in entries]
+        self._companies = [company for _, company in entries]
+        self._by_count = sorted(self.counts, key=lambda company: (-self.counts[company], company))
+
+    @staticmethod
+    def _index_keys(company):
+        words = normalize(company).split(' ')
+        return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def search(self, prefix, limit=10):
+        """
+        Companies matching ``prefix``, as ``[{'company', 'tweet_count'}]``.
+
+        Names starting with the prefix come before names where only a later word does;
+        within each group companies with more tweets come first. An empty prefix returns
+        the companies with the most tweets.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            matches = self._by_count[:limit]
+        else:
+            start = bisect_left(self._keys_sorted, prefix)
+            end = bisect_left(self._keys_sorted, prefix + '\uffff', lo=start)
+            candidates = set(self._companies[start:end])
+            matches = heapq.nsmallest(
+                limit, candidates,
+                key=lambda company: (not self._normalized[company].startswith(prefix), -self.counts[company], company)
+            )
+        return [{'company': company, 'tweet_count': self.counts[company]} for company in matches]
+
+
+def load_company_counts(conn):
+    """
+    Tweets per company, summed from the per company and day rollups rather than counted
+    over the whole tweets table; from the tweets table until the rollups are known to cover
+    every tweet (DAILY_STATS_COMPLETE, see rebuild_daily_stats), since companies that were
+    only partly rolled up would otherwise come out short.
+    """
+    if conn.execute(data_version_query(DAILY_STATS_COMPLETE)).first() is None:
+        query = select(Tweet.company, func.count()).group_by(Tweet.company)
+        return {company: count for company, count in conn.execute(query)}
+    rollups = CompanyDailyStats.__table__
+    query = select(rollups.c.company, func.sum(rollups.c.tweet_count)).group_by(rollups.c.company)
+    return {company: int(count) for company, count in conn.execute(query)}
+
+
+class _IndexState:
+    def __init__(self, index, version):
+        self.index = index
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.stale = False
+
+
+_lock = threading.Lock()
+_state = None
+
+
+def get_company_index():
+    """
+    The process's CompanyIndex, built on first use (servers warm it at startup).
+
+    Batches loaded by this process update it in place (apply_company_counts). Writes from
+    other processes are noticed through the tweets data version, checked at most every
+    COMPANY_INDEX_MAX_AGE seconds; the index is only rebuilt when the version moved.
+    """
+    global _state
+    state = _state
+    if state is not None and not state.stale and time.monotonic() - state.checked_at < settings.COMPANY_INDEX_MAX_AGE:
+        return state.index
+
+    with _lock:
+        state = _state
+        if state is not None and not state.stale and time.monotonic() - state.checked_at < settings.COMPANY_INDEX_MAX_AGE:
+            return state.index
+
+        engine, _ = get_db_connection()
+        with engine.connect() as conn:
+            version, _ = get_data_version(conn, TWEETS)
+            if state is not None and not state.stale and state.version == version:
+                state.checked_at = time.monotonic()
+                return state.index
+
+            started = time.perf_counter()
+            index = CompanyIndex(load_company_counts(conn))
+        print(f"Built company index with {len(index)} companies in {time.perf_counter() - started:.3f}s")
+        _state = _IndexState(index, version)
+        return index
+
+
+def company_index_stats():
+    """Size and age of the process's index, None before it was first built."""
+    state = _state
+    if state is None:
+        return None
+    return {
+        'companies': len(state.index),
+        'tweets_version': state.version,
+        'checked_seconds_ago': round(time.monotonic() - state.checked_at, 1),
+        'stale': state.stale,
+    }
+
+
+def apply_company_counts(version, changes):
+    """
+    Add the tweet count changes of a batch this process's loader committed as ``version``.
+
+    They only apply on top of the version right before it; when the index missed a write
+    from another process it is rebuilt on next use instead.
+
+    Args:
+        version (int): Tweets data version of the batch.
+        changes (dict): ``{company: tweets added (or removed, when negative)}``.
+    """
+    global _state
+    with _lock:
+        state = _state
+        if state is None or state.stale:
+            return
+        if state.version != version - 1:
+            state.stale = True
+            return
+        counts = dict(state.index.counts)
+        for company, change in changes.items():
+            counts[company] = counts.get(company, 0) + change
+            if counts[company] <= 0:
+                del counts[company]
+        _state = _IndexState(CompanyIndex(counts), version)
+
+
+def invalidate_company_index():
+    """Rebuild the company index on its next use, e.g. after an ingest batch committed."""
+    state = _state
+    if state is not None:
+        state.stale = True
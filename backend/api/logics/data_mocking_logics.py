@@ -5,6 +5,7 @@ import random
 from datetime import datetime, timedelta
 import uuid
 from api.models import get_db_connection, Tweet, create_tables
+from api.logics.loader_logics import upsert_tweets_from_df
 from sqlalchemy.types import JSON
 from sqlalchemy import text
 import os
@@ -250,110 +251,6 @@ def generate_all_tweets(num_tweets_per_company=5000, days=365):
     return df
 
 
-# Function to upsert tweets from a DataFrame
-def upsert_tweets_from_df(df):
-    engine, _ = get_db_connection()
-    try:
-        # Process DataFrame in batches to avoid memory issues
-        batch_size = 1000
-        total_tweets = len(df)
-        processed = 0
-        
-        # Flatten the nested structures in the DataFrame
-        flattened_df = pd.DataFrame()
-        
-        # Copy basic columns
-        flattened_df['id'] = df['id']
-        flattened_df['text'] = df['text']
-        flattened_df['created_at'] = pd.to_datetime(df['created_at'])
-        flattened_df['company'] = df['company']
-        
-        # Extract sentiment columns
-        flattened_df['sentiment_score'] = df['sentiment'].apply(lambda x: x['score'])
-        flattened_df['sentiment_label'] = df['sentiment'].apply(lambda x: x['label'])
-        flattened_df['sentiment_confidence'] = df['sentiment'].apply(lambda x: x.get('confidence'))
-        
-        # Extract user columns
-        flattened_df['user_username'] = df['user'].apply(lambda x: x['username'])
-        flattened_df['user_name'] = df['user'].apply(lambda x: x['name'])
-        flattened_df['user_profile_image_url'] = df['user'].apply(lambda x: x['profile_image_url'])
-        flattened_df['user_followers_count'] = df['user'].apply(lambda x: x['followers_count'])
-        
-        # Extract metrics columns
-        flattened_df['retweet_count'] = df['metrics'].apply(lambda x: x['retweet_count'])
-        flattened_df['reply_count'] = df['metrics'].apply(lambda x: x['reply_count'])
-        flattened_df['like_count'] = df['metrics'].apply(lambda x: x['like_count'])
-        flattened_df['quote_count'] = df['metrics'].apply(lambda x: x['quote_count'])
-        flattened_df['hashtags'] = df['hashtags']
-
-        # Process in batches
-        for i in range(0, total_tweets, batch_size):
-            batch_df = flattened_df.iloc[i:i+batch_size]
-            
-            # Use to_sql with method='multi' for better performance
-            # The 'replace' method doesn't work for upserts, so we'll use a custom function
-            temp_table_name = 'temp_tweets'
-            batch_df.to_sql(temp_table_name, engine, if_exists='replace', index=False)
-            # Perform the upsert using a SQL query
-            with engine.connect() as conn:
-                # Start a transaction
-                trans = conn.begin()
-                try:
-                    if i == 0:
-                        conn.execute(text(f"TRUNCATE tweets"))
-                    # Perform the upsert
-                    conn.execute(text(f"""
-                        INSERT INTO tweets (
-                            id, text, created_at, company, 
-                            sentiment_score, sentiment_label, sentiment_confidence,
-                            user_username, user_name, user_profile_image_url, user_followers_count,
-                            retweet_count, reply_count, like_count, quote_count, hashtags
-                        )
-                        SELECT 
-                            id, text, created_at, company, 
-                            sentiment_score, sentiment_label, sentiment_confidence,
-                            user_username, user_name, user_profile_image_url, user_followers_count,
-                            retweet_count, reply_count, like_count, quote_count, hashtags
-                        FROM {temp_table_name}
-                        ON CONFLICT (id) DO UPDATE SET
-                            text = EXCLUDED.text,
-                            created_at = EXCLUDED.created_at,
-                            company = EXCLUDED.company,
-                            sentiment_score = EXCLUDED.sentiment_score,
-                            sentiment_label = EXCLUDED.sentiment_label,
-                            sentiment_confidence = EXCLUDED.sentiment_confidence,
-                            user_username = EXCLUDED.user_username,
-                            user_name = EXCLUDED.user_name,
-                            user_profile_image_url = EXCLUDED.user_profile_image_url,
-                            user_followers_count = EXCLUDED.user_followers_count,
-                            retweet_count = EXCLUDED.retweet_count,
-                            reply_count = EXCLUDED.reply_count,
-                            like_count = EXCLUDED.like_count,
-                            quote_count = EXCLUDED.quote_count,
-                            hashtags = EXCLUDED.hashtags
-                    """))
-                    
-                    # Drop the temporary table
-                    conn.execute(text(f"DROP TABLE {temp_table_name}"))
-                    
-                    # Commit the transaction
-                    trans.commit()
-                except Exception as e:
-                    # Rollback in case of error
-                    trans.rollback()
-                    raise e
-            
-            processed += len(batch_df)
-            print(f"Processed {processed}/{total_tweets} tweets")
-        
-        print("All tweets have been successfully upserted into the database")
-        return total_tweets
-        
-    except Exception as e:
-        print(f"Error upserting tweets: {str(e)}")
-        raise
-
-
 def erase_tweets_table():
      engine, _ = get_db_connection()
      with engine.connect() as conn:
@@ -370,14 +267,14 @@ def erase_tweets_table():
 
 
 # Function to load tweets from a DataFrame and upsert them
-def load_and_upsert_df(df):
+def load_and_upsert_df(df, progress_callback=None):
     # Create tables if they don't exist
     create_tables()
 
     
     
     # Upsert tweets from the DataFrame
-    return upsert_tweets_from_df(df)
+    return upsert_tweets_from_df(df, progress_callback=progress_callback)
 
 def create_mocked_data_and_update_db():
     print("Generating mock tweet data...")
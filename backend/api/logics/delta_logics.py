@@ -0,0 +1,366 @@
+import asyncio
+import json
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.conf import settings
+from sqlalchemy import insert, text
+
+from api.engines import get_engine
+from api.models import get_db_connection, TweetDelta
+from api.logics.process_logics import build_top_tweets
+
+# Postgres NOTIFY channel carrying the version of each committed delta
+CHANNEL = 'tweet_deltas'
+
+
+def build_delta(written_rows, previous_rows=(), reset=False):
+    """
+    What one loader batch changed, per company, shaped like the dashboard sections.
+
+    Counters and trend points are net changes: inserted rows are added, and an updated row
+    takes its previous version out and adds its new one, so they can go down when a tweet
+    was rescored or moved to another company or week.
+
+    Args:
+        written_rows (list): Mappings of the `tweets` rows the batch inserted or changed,
+            each with an ``inserted`` flag.
+        previous_rows (list): The changed rows as they were before the batch.
+        reset (bool): The batch replaced the whole table; clients should refetch.
+
+    Returns:
+        dict: ``{'reset': bool, 'companies': {company: {section: delta}}}``; a company's
+            ``updated_tweet_ids`` lists the tweets whose previous version clients should
+            drop from their top lists.
+    """
+    delta = {'reset': reset, 'companies': {}}
+    if not written_rows:
+        return delta
+
+    df = pd.DataFrame([dict(row) for row in written_rows])
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['weight'] = 1
+    removed = pd.DataFrame([dict(row) for row in previous_rows], columns=[name for name in df.columns if name not in ('inserted', 'weight')])
+    removed['created_at'] = pd.to_datetime(removed['created_at'])
+    changes = pd.concat([df, removed.assign(inserted=False, weight=-1)], ignore_index=True) if len(removed) else df
+
+    for company, company_df in changes.groupby('company', sort=False):
+        added_df = company_df[company_df['weight'] > 0]
+        inserted = int(added_df['inserted'].astype(bool).sum())
+        weights = company_df['weight']
+        labels = company_df['sentiment_label']
+        company_delta = {
+            'sentiment_summary': {
+                'new_tweets': inserted,
+                'updated_tweets': len(added_df) - inserted,
+                'positive': int(weights[labels == 'positive'].sum()),
+                'negative': int(weights[labels == 'negative'].sum()),
+                'neutral': int(weights[labels == 'neutral'].sum()),
+                'score_sum': round(float((company_df['sentiment_score'] * weights).sum()), 6),
+            },
+        }
+        # Sums rather than averages so clients can merge them into the weekly points they have
+        week_start = company_df['created_at'].dt.to_period('W-MON').dt.start_time
+        weekly = company_df.assign(weighted_score=company_df['sentiment_score'] * weights).groupby(week_start).agg(
+            count=('weight', 'sum'), sum=('weighted_score', 'sum'),
+        )
+        trend = [
+            {'date': week.strftime('%Y-%m-%d'), 'tweet_count': int(row['count']), 'score_sum': round(float(row['sum']), 6)}
+            for week, row in weekly.iterrows()
+            if row['count'] or round(float(row['sum']), 6)
+        ]
+        if trend:
+            company_delta['sentiment_trend'] = trend
+        if len(added_df):
+            # Candidates only: clients merge them into their current top lists
+            company_delta['top_tweets'] = build_top_tweets(added_df)
+        replaced = company_df.loc[company_df['weight'] < 0, 'id'].tolist()
+        if replaced:
+            company_delta['updated_tweet_ids'] = replaced
+        buckets = recent_buckets(company_df)
+        if buckets:
+            company_delta['recent_buckets'] = buckets
+        delta['companies'][company] = company_delta
+    return delta
+
+
+def recent_buckets(tweets_df):
+    """
+    Counters of the tweets created in the last HOT_TIER_HOURS, per HOT_TIER_BUCKET_MINUTES bucket.
+
+    Rows with a ``weight`` column count that many times (-1 for the previous version of an
+    updated tweet).
+
+    Returns:
+        list: ``{'start', 'tweet_count', 'positive', 'negative', 'neutral', 'score_sum'}`` per
+            bucket whose counters changed, oldest first.
+    """
+    recent = tweets_df[tweets_df['created_at'] >= datetime.now() - timedelta(hours=settings.HOT_TIER_HOURS)]
+    if not len(recent):
+        return []
+    weights = recent['weight'] if 'weight' in recent else pd.Series(1, index=recent.index)
+    labels = recent['sentiment_label']
+    buckets = recent.assign(
+        bucket=recent['created_at'].dt.floor(f"{settings.HOT_TIER_BUCKET_MINUTES}min"),
+        tweet_count=weights,
+        positive=labels.eq('positive') * weights, negative=labels.eq('negative') * weights,
+        neutral=labels.eq('neutral') * weights, score_sum=recent['sentiment_score'] * weights,
+    ).groupby('bucket')[['tweet_count', 'positive', 'negative', 'neutral', 'score_sum']].sum()
+    return [
+        {
+            'start': start.isoformat(),
+            'tweet_count': int(row['tweet_count']),
+            'positive': int(row['positive']),
+            'negative': int(row['negative']),
+            'neutral': int(row['neutral']),
+            'score_sum': round(float(row['score_sum']), 6),
+        }
+        for start, row in buckets.iterrows()
+        if row['tweet_count'] or row['positive'] or row['negative'] or row['neutral'] or round(float(row['score_sum']), 6)
+    ]
+
+
+def record_delta(conn, version, delta):
+    """
+    Store the delta of ``version`` and notify listeners, inside the loader's transaction.
+
+    Both only become visible when the batch commits; deltas older than
+    TWEET_DELTA_RETENTION versions are pruned.
+    """
+    conn.execute(insert(TweetDelta.__table__), {'version': version, 'payload': delta, 'created_at': datetime.now()})
+    conn.execute(text("SELECT pg_notify(:channel, :version)"), {'channel': CHANNEL, 'version': str(version)})
+    conn.execute(
+        text("DELETE FROM tweet_deltas WHERE version <= :oldest"),
+        {'oldest': version - settings.TWEET_DELTA_RETENTION}
+    )
+
+
+def fetch_deltas(after_version=None, versions=None):
+    """
+    Stored deltas in version order, either ``versions`` or everything after ``after_version``.
+
+    Returns:
+        tuple: ``(deltas, complete)`` where deltas is a list of ``(version, payload)`` and
+            complete is False when pruned versions are missing after ``after_version``.
+    """
+    _, Session = get_db_connection()
+    session = Session()
+    try:
+        query = session.query(TweetDelta.version, TweetDelta.payload).order_by(TweetDelta.version)
+        if versions is not None:
+            query = query.filter(TweetDelta.version.in_(versions))
+        else:
+            query = query.filter(TweetDelta.version > after_version)
+        deltas = [(row.version, row.payload) for row in query]
+    finally:
+        session.close()
+
+    complete = True
+    if after_version is not None and deltas and deltas[0][0] != after_version + 1:
+        complete = False
+    return deltas, complete
+
+
+class DeltaEvent:
+    """A delta serialized once per company, rendered per subscriber as an SSE message."""
+
+    def __init__(self, version, payload):
+        self.version = version
+        self.reset = payload.get('reset', False)
+        self.company_json = {company: json.dumps(value) for company, value in payload['companies'].items()}
+        self._rendered_all = None
+
+    def render(self, companies=None):
+        if companies is None:
+            if self._rendered_all is None:
+                self._rendered_all = self._render(list(self.company_json))
+            return self._rendered_all
+        names = [name for name in self.company_json if name in companies]
+        if not names and not self.reset:
+            return None
+        return self._render(names)
+
+    def _render(self, names):
+        body = ', '.join(f'{json.dumps(name)}: {self.company_json[name]}' for name in names)
+        data = f'{{"version": {self.version}, "reset": {json.dumps(self.reset)}, "companies": {{{body}}}}}'
+        return f"id: {self.version}\nevent: delta\ndata: {data}\n\n"
+
+
+# Queued instead of a delta when a subscriber fell too far behind
+RESYNC = object()
+
+
+class Subscriber:
+    def __init__(self, loop, companies=None, queue_size=100):
+        self.loop = loop
+        self.companies = set(companies) if companies else None
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client gets one resync instead of an ever-growing backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class DeltaHub:
+    """
+    Fans committed tweet deltas out to the SSE subscribers of this process.
+
+    A single LISTEN connection per process receives the versions the loader NOTIFYs from
+    any process. Each delta is read and serialized once and then queued for every subscriber,
+    so the number of clients doesn't multiply the database work. The listener thread runs
+    while there are subscribers and reconnects on errors, replaying what it missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._listening = threading.Event()
+        self.last_version = None
+
+    def subscribe(self, companies=None):
+        subscriber = Subscriber(asyncio.get_running_loop(), companies, settings.SSE_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._listening.clear()
+                self._thread = threading.Thread(target=self._run, name='tweet-delta-listener', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def wait_until_listening(self, timeout=10.0):
+        return self._listening.wait(timeout)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, version, payload):
+        event = DeltaEvent(version, payload)
+        self.last_version = version
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(subscriber)
+
+    def _has_subscribers(self):
+        with self._lock:
+            if not self._subscribers:
+                self._thread = None
+                return False
+            return True
+
+    def _run(self):
+        # Replays after a reconnect only; a fresh listener serves clients that just loaded the dashboard
+        self.last_version = None
+        # _has_subscribers() detaches the thread when it returns False, so this thread must exit then
+        while True:
+            try:
+                self._listen()
+                return
+            except Exception as e:
+                print(f"Tweet delta listener failed: {str(e)}")
+                time.sleep(1)
+                if not self._has_subscribers():
+                    return
+
+    def _listen(self):
+        # LISTEN needs a session of its own, which PgBouncer's transaction pooling doesn't give
+        engine = get_engine('direct') if settings.DB_PGBOUNCER else get_db_connection()[0]
+        connection = engine.raw_connection()
+        # Held for as long as there are subscribers, so it must not take a pool slot
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        try:
+            dbapi_connection.autocommit = True
+            dbapi_connection.cursor().execute(f"LISTEN {CHANNEL}")
+            if self.last_version is not None:
+                # Deltas committed while the listener was reconnecting
+                for version, payload in fetch_deltas(after_version=self.last_version)[0]:
+                    self.publish(version, payload)
+            self._listening.set()
+
+            while self._has_subscribers():
+                if not select.select([dbapi_connection], [], [], 1.0)[0]:
+                    continue
+                dbapi_connection.poll()
+                versions = sorted({int(notify.payload) for notify in dbapi_connection.notifies})
+                dbapi_connection.notifies.clear()
+                if versions:
+                    for version, payload in fetch_deltas(versions=versions)[0]:
+                        self.publish(version, payload)
+        finally:
+            with self._lock:
+                # A detached thread may finish after its replacement started listening
+                if self._thread is threading.current_thread():
+                    self._listening.clear()
+            connection.close()
+
+
+_hub = DeltaHub()
+
+
+def get_hub():
+    return _hub
+
+
+async def sse_events(companies=None, last_event_id=None, heartbeat=None):
+    """
+    Async generator of Server-Sent Events with the tweet deltas for ``companies`` (all when None).
+
+    With ``last_event_id`` (the version of the last delta a reconnecting client saw) the
+    retained deltas after it are replayed first; if some were already pruned the client gets
+    a ``resync`` event and should refetch the dashboard. Comment lines are sent as heartbeats.
+    """
+    heartbeat = heartbeat or settings.SSE_HEARTBEAT_SECONDS
+    hub = get_hub()
+    subscriber = hub.subscribe(companies)
+    try:
+        await asyncio.to_thread(hub.wait_until_listening)
+        yield "retry: 5000\n\n"
+
+        seen_version = last_event_id
+        if last_event_id is not None:
+            deltas, complete = await asyncio.to_thread(fetch_deltas, last_event_id)
+            if not complete:
+                yield "event: resync\ndata: {}\n\n"
+            for version, payload in deltas:
+                message = DeltaEvent(version, payload).render(subscriber.companies)
+                if message:
+                    yield message
+                seen_version = version
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is RESYNC:
+                yield "event: resync\ndata: {}\n\n"
+                continue
+            # Already sent by the replay above
+            if seen_version is not None and event.version <= seen_version:
+                continue
+            message = event.render(subscriber.companies)
+            if message:
+                yield message
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,151 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+
+from django.conf import settings
+from sqlalchemy import text
+
+from api.authentication import user_cache
+from api.connection_budget import connection_budget
+from api.engines import pool_stats, replica_status
+from api.models import get_db_connection, DataVersion
+from api.logics.cache_logics import company_cache_stats
+from api.logics.company_logics import company_index_stats
+from api.logics.singleflight_logics import single_flight_stats
+from api.logics.version_logics import get_data_version, TWEETS
+
+_started_at = time.time()
+
+
+def _loaded_stats(module_name, function_name):
+    # The module pulls in pandas; a process that never imported it has nothing to report
+    module = sys.modules.get(module_name)
+    return getattr(module, function_name)() if module else None
+
+
+class DurationStats:
+    """Durations of the last ``window`` runs of some operation in this process."""
+
+    def __init__(self, window=100):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.recent = deque(maxlen=window)
+        self.last_finished_at = None
+
+    def record(self, seconds):
+        with self._lock:
+            self.runs += 1
+            self.recent.append(seconds)
+            self.last_finished_at = datetime.now()
+
+    def snapshot(self):
+        with self._lock:
+            recent = list(self.recent)
+            return {
+                'runs': self.runs,
+                'last_seconds': round(recent[-1], 3) if recent else None,
+                'avg_seconds': round(sum(recent) / len(recent), 3) if recent else None,
+                'max_seconds': round(max(recent), 3) if recent else None,
+                'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+            }
+
+
+# Runs of process_tweets_for_frontend in this process
+etl_durations = DurationStats()
+
+
+def hit_rate(hits, misses):
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+
+def liveness():
+    """The process is up and serving requests; nothing external is checked."""
+    return {'status': 'ok', 'pid': os.getpid(), 'uptime_seconds': round(time.time() - _started_at, 1)}
+
+
+def _query_database():
+    started = time.perf_counter()
+    engine, _ = get_db_connection()
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(settings.HEALTH_DB_TIMEOUT * 1000)}"))
+            # The probe itself needs no tables, so a fresh database is ready too
+            conn.execute(text("SELECT 1"))
+            latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            # data_versions is only created once something is written
+            has_versions = conn.execute(
+                text("SELECT to_regclass(:table) IS NOT NULL"), {'table': DataVersion.__tablename__}
+            ).scalar()
+            updated_at = get_data_version(conn, TWEETS)[1] if has_versions else None
+    return {'latency_ms': latency_ms, 'last_ingest_at': updated_at}
+
+
+# One check at a time: probes arriving while it runs wait for the same result
+_checker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-check')
+_check_lock = threading.Lock()
+_pending = None
+
+
+def check_database(timeout):
+    """
+    Run ``SELECT 1`` and the tweets version lookup on the shared engine, giving up after ``timeout`` seconds.
+
+    The wait covers the pool checkout and connecting as well as the query, so an exhausted
+    pool or an unreachable server fail the check instead of hanging the probe.
+
+    Raises:
+        TimeoutError: The database didn't answer in time.
+    """
+    global _pending
+    with _check_lock:
+        if _pending is None or _pending.done():
+            _pending = _checker.submit(_query_database)
+        future = _pending
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        raise TimeoutError(f"Database did not answer within {timeout}s")
+
+
+def readiness():
+    """
+    Whether this worker can serve traffic, with the statistics it keeps in memory.
+
+    Only the database check does IO; everything else is read from counters, so the probe
+    never triggers a computation.
+
+    Returns:
+        tuple: ``(ready, report)``
+    """
+    report = {'status': 'ready'}
+    try:
+        database = check_database(settings.HEALTH_DB_TIMEOUT)
+        last_ingest_at = database.pop('last_ingest_at')
+        report['database'] = {'ok': True, **database}
+        report['last_ingest_at'] = last_ingest_at.isoformat() if last_ingest_at else None
+        report['last_ingest_age_seconds'] = round((datetime.now() - last_ingest_at).total_seconds(), 1) if last_ingest_at else None
+    except Exception as e:
+        report['status'] = 'unavailable'
+        report['database'] = {'ok': False, 'error': str(e)}
+
+    users = user_cache.stats()
+    companies = company_cache_stats()
+    report.update({
+        'pools': pool_stats(),
+        'connection_budget': connection_budget.stats(),
+        'replica': replica_status(),
+        'hot_tier': _loaded_stats('api.logics.hot_tier_logics', 'hot_tier_stats'),
+        'sentiment_scorer': _loaded_stats('api.logics.sentiment_logics', 'sentiment_scorer_stats'),
+        'caches': {
+            'users': {**users, 'hit_rate': hit_rate(users['hits'], users['misses'])},
+            'company_payloads': {**companies, 'hit_rate': hit_rate(companies['hits'], companies['misses'])},
+            'company_index': company_index_stats(),
+            'single_flight': single_flight_stats(),
+        },
+        'etl': etl_durations.snapshot(),
+    })
+    return report['status'] == 'ready', report
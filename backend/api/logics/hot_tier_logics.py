@@ -0,0 +1,307 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.conf import settings
+from sqlalchemy import select
+
+from api.models import get_db_connection, Tweet
+from api.logics.delta_logics import fetch_deltas, recent_buckets
+from api.logics.process_logics import format_tweet
+from api.logics.version_logics import get_data_version, TWEETS
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class HotBucket:
+    """Counters and best tweets of one company in one time bucket."""
+    __slots__ = ('index', 'tweet_count', 'positive', 'negative', 'neutral', 'score_sum', 'top_positive', 'top_negative')
+
+    def __init__(self, index):
+        self.index = index
+        self.tweet_count = self.positive = self.negative = self.neutral = 0
+        self.score_sum = 0.0
+        self.top_positive = []
+        self.top_negative = []
+
+
+def _rank(tweet):
+    # Same order as build_top_tweets: most extreme score first, ties broken by engagement
+    metrics = tweet['metrics']
+    engagement = metrics['retweet_count'] * 2 + metrics['like_count'] + metrics['reply_count'] * 1.5 + metrics['quote_count'] * 1.5
+    score = tweet['sentiment']['score']
+    return (score if tweet['sentiment']['label'] == 'positive' else -score, engagement)
+
+
+class HotTier:
+    """
+    Per-company ring buffers of the last ``hours`` of tweets, in buckets of ``bucket_minutes``.
+
+    Bucket ``n`` lives in slot ``n % slot_count`` and is replaced by the bucket that reuses the
+    slot ``hours`` later, so buckets leaving the window are evicted without a sweep. Summaries
+    are computed from memory only; ``version`` is the tweets data version the buffers reflect
+    (None until loaded).
+    """
+
+    def __init__(self, hours, bucket_minutes, top_count):
+        self.hours = hours
+        self.bucket_seconds = bucket_minutes * 60
+        self.slot_count = max(1, int(hours * 60 // bucket_minutes))
+        self.top_count = top_count
+        self._lock = threading.Lock()
+        self._companies = {}
+        self.version = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.deltas_applied = 0
+
+    @property
+    def ready(self):
+        return self.version is not None
+
+    def bucket_index(self, timestamp):
+        return int((timestamp - _EPOCH).total_seconds() // self.bucket_seconds)
+
+    def _slot(self, companies, company, index, current):
+        if not current - self.slot_count < index <= current:
+            return None
+        slots = companies.setdefault(company, [None] * self.slot_count)
+        bucket = slots[index % self.slot_count]
+        if bucket is None or bucket.index < index:
+            bucket = slots[index % self.slot_count] = HotBucket(index)
+        return bucket if bucket.index == index else None
+
+    def _add(self, companies, company, counters, candidates):
+        current = self.bucket_index(datetime.now())
+        for counts in counters:
+            bucket = self._slot(companies, company, self.bucket_index(datetime.fromisoformat(counts['start'])), current)
+            if bucket is not None:
+                bucket.tweet_count += counts['tweet_count']
+                bucket.positive += counts['positive']
+                bucket.negative += counts['negative']
+                bucket.neutral += counts['neutral']
+                bucket.score_sum += counts['score_sum']
+        for tweet in candidates:
+            bucket = self._slot(companies, company, self.bucket_index(datetime.fromisoformat(tweet['created_at'])), current)
+            if bucket is None:
+                continue
+            top = bucket.top_positive if tweet['sentiment']['label'] == 'positive' else bucket.top_negative
+            top.append(tweet)
+            top.sort(key=_rank, reverse=True)
+            del top[self.top_count:]
+
+    def load(self, tweets_df, version):
+        """Replace the buffers with ``tweets_df`` (all tweets of the window), as of ``version``."""
+        companies = {}
+        if len(tweets_df):
+            tweets_df = tweets_df.assign(
+                bucket=tweets_df['created_at'].dt.floor(f"{self.bucket_seconds // 60}min"),
+                engagement=tweets_df['retweet_count'] * 2 + tweets_df['like_count']
+                + tweets_df['reply_count'] * 1.5 + tweets_df['quote_count'] * 1.5,
+            )
+            # The best tweets of every company and bucket, selected in one sort per label
+            positive = tweets_df[tweets_df['sentiment_label'] == 'positive'].sort_values(
+                ['sentiment_score', 'engagement'], ascending=[False, False])
+            negative = tweets_df[tweets_df['sentiment_label'] == 'negative'].sort_values(
+                ['sentiment_score', 'engagement'], ascending=[True, False])
+            candidates = pd.concat([
+                positive.groupby(['company', 'bucket']).head(self.top_count),
+                negative.groupby(['company', 'bucket']).head(self.top_count),
+            ])
+            formatted = {}
+            for _, tweet in candidates.iterrows():
+                formatted.setdefault(tweet['company'], []).append(format_tweet(tweet))
+            for company, company_df in tweets_df.groupby('company', sort=False):
+                self._add(companies, company, recent_buckets(company_df), formatted.get(company, []))
+        with self._lock:
+            self._companies = companies
+            self.version = version
+            self.loaded_at = datetime.now()
+            self.reloads += 1
+
+    def _drop(self, companies, company, tweet_ids):
+        # Previous versions of updated tweets; their new version comes with the candidates
+        if not tweet_ids:
+            return
+        tweet_ids = set(tweet_ids)
+        for bucket in companies.get(company, []):
+            if bucket is not None:
+                bucket.top_positive = [tweet for tweet in bucket.top_positive if tweet['id'] not in tweet_ids]
+                bucket.top_negative = [tweet for tweet in bucket.top_negative if tweet['id'] not in tweet_ids]
+
+    def apply_delta(self, version, payload):
+        """
+        Apply the net changes of one loader delta (see delta_logics.build_delta).
+
+        Updated tweets leave the top lists they were in and compete again with their new
+        version; a bucket's list may then hold fewer than ``top_count`` tweets until the
+        next reload.
+
+        Returns:
+            bool: False when the delta can't be applied on top of the buffers (a version is
+                missing or the table was reloaded); they must be reloaded then.
+        """
+        with self._lock:
+            if self.version is None or version <= self.version:
+                return self.version is not None
+            if version != self.version + 1 or payload.get('reset'):
+                return False
+            for company, sections in payload['companies'].items():
+                self._drop(self._companies, company, sections.get('updated_tweet_ids'))
+            for company, sections in payload['companies'].items():
+                top = sections.get('top_tweets', {})
+                self._add(self._companies, company, sections.get('recent_buckets', []), top.get('positive', []) + top.get('negative', []))
+            self.version = version
+            self.deltas_applied += 1
+            return True
+
+    def evict(self):
+        """Drop companies without tweets in the window, whose buffers would otherwise stay allocated."""
+        oldest = self.bucket_index(datetime.now()) - self.slot_count
+        with self._lock:
+            for company in [name for name, slots in self._companies.items()
+                            if all(bucket is None or bucket.index <= oldest for bucket in slots)]:
+                del self._companies[company]
+
+    def summary(self, company, hours=None):
+        """
+        The sentiment_summary, sentiment_trend (per bucket) and top_tweets of the last ``hours``.
+
+        Returns:
+            dict: Same shapes as the dashboard sections; None when the company has no tweets then.
+        """
+        current = self.bucket_index(datetime.now())
+        span = self.slot_count if hours is None else min(self.slot_count, math.ceil(hours * 3600 / self.bucket_seconds))
+        with self._lock:
+            buckets = sorted(
+                (bucket for bucket in self._companies.get(company, []) if bucket is not None and current - span < bucket.index <= current),
+                key=lambda bucket: bucket.index,
+            )
+            buckets = [bucket for bucket in buckets if bucket.tweet_count]
+            if not buckets:
+                return None
+            total = sum(bucket.tweet_count for bucket in buckets)
+            positive = sum(bucket.positive for bucket in buckets)
+            negative = sum(bucket.negative for bucket in buckets)
+            score_sum = sum(bucket.score_sum for bucket in buckets)
+            top_positive = sorted((tweet for bucket in buckets for tweet in bucket.top_positive), key=_rank, reverse=True)
+            top_negative = sorted((tweet for bucket in buckets for tweet in bucket.top_negative), key=_rank, reverse=True)
+            trend = [
+                {
+                    'date': (_EPOCH + timedelta(seconds=bucket.index * self.bucket_seconds)).isoformat(),
+                    'average_score': round(bucket.score_sum / bucket.tweet_count, 2),
+                    'tweet_count': bucket.tweet_count,
+                }
+                for bucket in buckets
+            ]
+
+        positive_percentage = int(round(positive / total * 100))
+        negative_percentage = int(round(negative / total * 100))
+        return {
+            'sentiment_summary': {
+                'overall_score': round(score_sum / total, 2),
+                'positive_percentage': positive_percentage,
+                'negative_percentage': negative_percentage,
+                'neutral_percentage': 100 - positive_percentage - negative_percentage,
+                'total_tweets': total,
+            },
+            'sentiment_trend': trend,
+            'top_tweets': {'positive': top_positive[:self.top_count], 'negative': top_negative[:self.top_count]},
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'version': self.version,
+                'companies': len(self._companies),
+                'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+                'reloads': self.reloads,
+                'deltas_applied': self.deltas_applied,
+            }
+
+
+def new_hot_tier():
+    return HotTier(settings.HOT_TIER_HOURS, settings.HOT_TIER_BUCKET_MINUTES, settings.HOT_TIER_TOP_TWEETS)
+
+
+def reload(tier, companies=None):
+    """Load the window of ``tier`` from the tweets table (only ``companies`` when given)."""
+    table = Tweet.__table__
+    query = select(table).where(table.c.created_at >= datetime.now() - timedelta(hours=tier.hours))
+    if companies is not None:
+        query = query.where(table.c.company.in_(companies))
+    engine, _ = get_db_connection()
+    # The version and the rows come from the same snapshot, so deltas apply exactly on top
+    with engine.connect().execution_options(isolation_level='REPEATABLE READ') as conn:
+        with conn.begin():
+            version, _ = get_data_version(conn, TWEETS)
+            df = pd.read_sql_query(query, conn)
+    if len(df) and not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+        df['created_at'] = pd.to_datetime(df['created_at'])
+    tier.load(df, version)
+
+
+def sync(tier):
+    """
+    Bring ``tier`` up to the tweets version in the database.
+
+    The deltas it missed (written by other processes) are applied when they are all still
+    stored; otherwise, and on first use, the window is reloaded.
+    """
+    if tier.ready:
+        engine, _ = get_db_connection()
+        with engine.connect() as conn:
+            version, _ = get_data_version(conn, TWEETS)
+        if version == tier.version:
+            return
+        if settings.TWEET_DELTAS_ENABLED:
+            deltas, complete = fetch_deltas(after_version=tier.version)
+            if complete and all(tier.apply_delta(number, payload) for number, payload in deltas) and tier.version >= version:
+                return
+    reload(tier)
+
+
+def _sync_forever(tier):
+    while True:
+        try:
+            sync(tier)
+            tier.evict()
+        except Exception as e:
+            print(f"Hot tier sync failed: {str(e)}")
+        time.sleep(settings.HOT_TIER_SYNC_SECONDS)
+
+
+_hot_tier = None
+_start_lock = threading.Lock()
+
+
+def get_hot_tier():
+    """
+    The hot tier of this process, started on first use.
+
+    It is loaded from the database by a background thread, which then keeps it in sync;
+    until then ``ready`` is False. Starting on first use rather than at import keeps worker
+    boots and management commands off the database.
+    """
+    global _hot_tier
+    if _hot_tier is None:
+        with _start_lock:
+            if _hot_tier is None:
+                tier = new_hot_tier()
+                threading.Thread(target=_sync_forever, args=(tier,), name='hot-tier-sync', daemon=True).start()
+                _hot_tier = tier
+    return _hot_tier
+
+
+def feed_hot_tier(version, delta):
+    """Apply a batch the loader of this process just committed; other processes pick it up in sync."""
+    if _hot_tier is not None:
+        _hot_tier.apply_delta(version, delta)
+
+
+def hot_tier_stats():
+    """Statistics of the hot tier (no database access); None when this process hasn't started one."""
+    return None if _hot_tier is None else _hot_tier.stats()
@@ -0,0 +1,301 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from api.models import create_tables
+from api.logics.loader_logics import TWEET_COLUMNS, upsert_flat_tweets
+from api.logics.sentiment_logics import get_scorer
+
+SUPPORTED_FORMATS = ('jsonl', 'csv', 'parquet')
+SCORING_MODES = ('missing', 'all', 'off')
+
+REQUIRED_TEXT_COLUMNS = ['id', 'text', 'company', 'user_username', 'user_name']
+OPTIONAL_TEXT_COLUMNS = ['sentiment_label', 'user_profile_image_url', 'hashtags']
+SENTIMENT_COLUMNS = ['sentiment_score', 'sentiment_label', 'sentiment_confidence']
+COUNT_COLUMNS = ['retweet_count', 'reply_count', 'like_count', 'quote_count']
+SENTIMENT_LABELS = ('positive', 'negative', 'neutral')
+
+# Nested export fields that don't map onto `sentiment_`/`user_` prefixes after json_normalize
+COLUMN_ALIASES = {
+    'metrics_retweet_count': 'retweet_count',
+    'metrics_reply_count': 'reply_count',
+    'metrics_like_count': 'like_count',
+    'metrics_quote_count': 'quote_count',
+    'entities_hashtags': 'hashtags',
+}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if extension in ('csv', 'parquet'):
+        return extension
+    raise ValueError(f"Cannot detect the format of {path}; use one of {', '.join(SUPPORTED_FORMATS)}")
+
+
+def iter_jsonl_batches(path, batch_size):
+    """
+    Yield ``(records, rejects, bytes_read)`` for bounded slices of a JSON-lines file.
+
+    Lines that are not valid JSON objects are returned as rejects instead of aborting the file.
+    """
+    records, rejects = [], []
+    with open(path, 'rb') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("not an object")
+                record['_line'] = line_number
+                records.append(record)
+            except ValueError:
+                rejects.append({'line': line_number, 'reason': 'invalid JSON', 'row': line.decode('utf-8', 'replace').rstrip()})
+            if len(records) >= batch_size:
+                yield pd.json_normalize(records, sep='_'), rejects, f.tell()
+                records, rejects = [], []
+        if records or rejects:
+            yield pd.json_normalize(records, sep='_') if records else pd.DataFrame(), rejects, f.tell()
+
+
+def iter_csv_batches(path, batch_size):
+    # Read everything as text: coercion happens in validate_batch so bad cells become rejects
+    with open(path, 'rb') as f:
+        line_offset = 2  # header is line 1
+        for chunk in pd.read_csv(f, chunksize=batch_size, dtype=str, keep_default_na=False, na_values=['']):
+            chunk['_line'] = np.arange(line_offset, line_offset + len(chunk))
+            line_offset += len(chunk)
+            yield chunk, [], f.tell()
+
+
+def iter_parquet_batches(path, batch_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet ingestion requires the pyarrow package")
+
+    parquet_file = pq.ParquetFile(path)
+    total_rows = max(parquet_file.metadata.num_rows, 1)
+    file_size = os.path.getsize(path)
+    row_offset = 1
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        chunk = record_batch.to_pandas()
+        chunk['_line'] = np.arange(row_offset, row_offset + len(chunk))
+        row_offset += len(chunk)
+        # Parquet is read by row group, so progress is reported in rows scaled to the file size
+        yield chunk, [], int(file_size * min(row_offset - 1, total_rows) / total_rows)
+
+
+BATCH_READERS = {
+    'jsonl': iter_jsonl_batches,
+    'csv': iter_csv_batches,
+    'parquet': iter_parquet_batches,
+}
+
+
+def _hashtags_to_text(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return " " + " ".join(f"#{str(tag).lstrip('#')}" for tag in value) if len(value) else ""
+    return value
+
+
+def validate_batch(raw_df, require_sentiment=True):
+    """
+    Coerce one batch to the `tweets` schema.
+
+    All checks are column-wise; each row keeps the first reason it failed.
+
+    Args:
+        raw_df (DataFrame): Raw rows with flat (or json_normalize'd) column names and a ``_line`` column.
+        require_sentiment (bool): Reject rows without a sentiment score and label; when False
+            they are kept for score_batch.
+
+    Returns:
+        tuple: ``(valid_df, rejected_df)``; rejected_df holds the original rows plus ``reason``.
+    """
+    aliases = {source: target for source, target in COLUMN_ALIASES.items() if target not in raw_df.columns}
+    raw_df = raw_df.rename(columns=aliases).reset_index(drop=True)
+    df = pd.DataFrame(index=raw_df.index)
+    reason = pd.Series(pd.NA, index=raw_df.index, dtype=object)
+
+    def flag(mask, message):
+        nonlocal reason
+        reason = reason.mask(reason.isna() & mask, message)
+
+    def column(name):
+        return raw_df[name] if name in raw_df.columns else pd.Series(pd.NA, index=raw_df.index, dtype=object)
+
+    for name in REQUIRED_TEXT_COLUMNS + OPTIONAL_TEXT_COLUMNS:
+        values = column(name)
+        if name == 'hashtags':
+            values = values.map(_hashtags_to_text)
+        present = values.notna()
+        df[name] = values.where(~present, values.astype(str).str.strip())
+        if name in REQUIRED_TEXT_COLUMNS:
+            flag(df[name].isna() | (df[name] == ''), f"missing {name}")
+    df['hashtags'] = df['hashtags'].fillna("")
+
+    df['sentiment_label'] = df['sentiment_label'].str.lower()
+    if require_sentiment:
+        flag(df['sentiment_label'].isna() | (df['sentiment_label'] == ''), "missing sentiment_label")
+    flag(df['sentiment_label'].notna() & (df['sentiment_label'] != '') & ~df['sentiment_label'].isin(SENTIMENT_LABELS), "invalid sentiment_label")
+    df['sentiment_label'] = df['sentiment_label'].mask(df['sentiment_label'] == '')
+
+    created_at = pd.to_datetime(column('created_at'), errors='coerce', utc=True, format='mixed')
+    flag(created_at.isna(), "invalid created_at")
+    df['created_at'] = created_at.dt.tz_convert(None)
+
+    for name in ['sentiment_score', 'sentiment_confidence']:
+        raw = column(name)
+        values = pd.to_numeric(raw, errors='coerce')
+        flag(raw.notna() & values.isna(), f"invalid {name}")
+        flag(values.notna() & ((values < 0) | (values > 1)), f"{name} out of range")
+        df[name] = values
+    if require_sentiment:
+        flag(df['sentiment_score'].isna(), "missing sentiment_score")
+
+    for name in COUNT_COLUMNS + ['user_followers_count']:
+        raw = column(name)
+        values = pd.to_numeric(raw, errors='coerce')
+        flag(raw.notna() & (values.isna() | (values < 0) | (values % 1 != 0)), f"invalid {name}")
+        # Engagement counters default to 0 like the model; follower counts stay nullable
+        df[name] = values.fillna(0) if name in COUNT_COLUMNS else values
+        df[name] = df[name].astype('Int64')
+
+    valid_mask = reason.isna()
+    valid_df = df.loc[valid_mask, TWEET_COLUMNS]
+    # ON CONFLICT can't touch the same row twice in one statement; the last occurrence wins
+    valid_df = valid_df.drop_duplicates(subset='id', keep='last')
+
+    rejected_df = raw_df.loc[~valid_mask].copy()
+    rejected_df['reason'] = reason[~valid_mask]
+    return valid_df, rejected_df
+
+
+def score_batch(valid_df, scoring='missing'):
+    """
+    Fill in the sentiment of validated rows with the lexicon scorer.
+
+    Args:
+        valid_df (DataFrame): Rows from validate_batch.
+        scoring (str): 'missing' scores rows lacking a score or a label, 'all' every row
+            (replacing the source's sentiment) and 'off' none.
+
+    Returns:
+        tuple: ``(scored_df, rows_scored)``
+    """
+    if scoring == 'off' or not len(valid_df):
+        return valid_df, 0
+    if scoring == 'all':
+        unscored = pd.Series(True, index=valid_df.index)
+    else:
+        unscored = valid_df['sentiment_score'].isna() | valid_df['sentiment_label'].isna()
+    if not unscored.any():
+        return valid_df, 0
+
+    valid_df = valid_df.copy()
+    # Score, label and confidence come from one source per row
+    valid_df.loc[unscored, SENTIMENT_COLUMNS] = get_scorer().score(valid_df.loc[unscored, 'text'])[SENTIMENT_COLUMNS]
+    return valid_df, int(unscored.sum())
+
+
+def _write_rejects(reject_file, rejects, rejected_df, sample):
+    """Write a batch's rejects; the file's first INGEST_REJECT_SAMPLE_SIZE are also kept in ``sample``."""
+    for reject in rejects:
+        _write_reject(reject_file, reject, sample)
+    for record in rejected_df.to_dict(orient='records'):
+        line = record.pop('_line', None)
+        reason = record.pop('reason')
+        row = {key: value for key, value in record.items() if not _is_missing(value)}
+        _write_reject(reject_file, {'line': line, 'reason': reason, 'row': row}, sample)
+
+
+def _write_reject(reject_file, reject, sample):
+    encoded = json.dumps(reject, default=str)
+    reject_file.write(encoded + "\n")
+    if len(sample) < settings.INGEST_REJECT_SAMPLE_SIZE:
+        sample.append(json.loads(encoded))
+
+
+def _is_missing(value):
+    return not isinstance(value, (list, dict, np.ndarray)) and pd.isna(value)
+
+
+def ingest_file(path, fmt=None, batch_size=5000, reject_path=None, progress_callback=None, scoring=None):
+    """
+    Stream a tweet export into the `tweets` table in bounded batches.
+
+    Args:
+        path (str): JSONL, CSV or Parquet file with one tweet per row using the `tweets` column
+            names. JSONL may also use the nested export format (``sentiment``/``user``/``metrics``).
+        fmt (str): One of SUPPORTED_FORMATS; detected from the extension when None.
+        batch_size (int): Rows held in memory, validated and loaded at a time.
+        reject_path (str): JSON-lines file receiving malformed rows (default: ``<path>.rejects.jsonl``).
+        progress_callback (callable): Optional ``callback(fraction, message)``.
+        scoring (str): One of SCORING_MODES (see score_batch); INGEST_SENTIMENT_SCORING when None.
+
+    Returns:
+        dict: Rows read, loaded, rejected and scored, inserted/updated/unchanged counts, batch
+            count, durations, scoring throughput, the reject file path and the first rejects.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in BATCH_READERS:
+        raise ValueError(f"Unsupported format {fmt}; use one of {', '.join(SUPPORTED_FORMATS)}")
+    scoring = scoring or settings.INGEST_SENTIMENT_SCORING
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Unsupported scoring mode {scoring}; use one of {', '.join(SCORING_MODES)}")
+    reject_path = reject_path or f"{path}.rejects.jsonl"
+
+    create_tables()
+    file_size = max(os.path.getsize(path), 1)
+    started = time.monotonic()
+    stats = {
+        'rows_read': 0, 'rows_loaded': 0, 'rows_rejected': 0, 'rows_scored': 0, 'batches': 0,
+        'inserted': 0, 'updated': 0, 'unchanged': 0,
+    }
+    scoring_seconds = 0.0
+    reject_sample = []
+
+    with open(reject_path, 'w') as reject_file:
+        for raw_df, rejects, bytes_read in BATCH_READERS[fmt](path, batch_size):
+            if len(raw_df):
+                valid_df, rejected_df = validate_batch(raw_df, require_sentiment=(scoring == 'off'))
+                scoring_started = time.monotonic()
+                valid_df, rows_scored = score_batch(valid_df, scoring)
+                if rows_scored:
+                    stats['rows_scored'] += rows_scored
+                    scoring_seconds += time.monotonic() - scoring_started
+            else:
+                valid_df, rejected_df = pd.DataFrame(columns=TWEET_COLUMNS), pd.DataFrame(columns=['reason'])
+
+            if len(valid_df):
+                load_stats = upsert_flat_tweets(valid_df, truncate=False)
+                for key in ('inserted', 'updated', 'unchanged'):
+                    stats[key] += load_stats[key]
+            _write_rejects(reject_file, rejects, rejected_df, reject_sample)
+
+            stats['rows_read'] += len(raw_df) + len(rejects)
+            stats['rows_loaded'] += len(valid_df)
+            stats['rows_rejected'] += len(rejected_df) + len(rejects)
+            stats['batches'] += 1
+            if progress_callback:
+                progress_callback(bytes_read / file_size, f"Loaded {stats['rows_loaded']} rows, rejected {stats['rows_rejected']}")
+
+    if not stats['rows_rejected']:
+        os.remove(reject_path)
+        reject_path = None
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    stats['rows_per_second'] = round(stats['rows_read'] / stats['seconds'], 1) if stats['seconds'] else None
+    stats['scoring_seconds'] = round(scoring_seconds, 3)
+    stats['scored_per_second'] = round(stats['rows_scored'] / scoring_seconds, 1) if scoring_seconds else None
+    stats['reject_path'] = reject_path
+    stats['reject_sample'] = reject_sample
+    print(f"Ingested {path}: {stats}")
+    return stats
@@ -0,0 +1,392 @@
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from sqlalchemy import Text, cast, func, or_, text
+
+from api.models import get_db_connection, BackgroundJob, ADDED_COLUMNS
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+_table_ready = False
+_worker_id = None
+
+
+def worker_id():
+    """Identifies this process as the owner of the jobs it runs."""
+    global _worker_id
+    if _worker_id is None:
+        _worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return _worker_id
+
+
+def _ensure_jobs_table(engine):
+    global _table_ready
+    if not _table_ready:
+        BackgroundJob.__table__.create(engine, checkfirst=True)
+        # Columns added since the table was first created
+        with engine.begin() as conn:
+            for table_name, column_name, column_type in ADDED_COLUMNS:
+                if table_name == BackgroundJob.__tablename__:
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type}"))
+        _table_ready = True
+
+
+def _heartbeat():
+    """Mark the jobs this process is running alive, then fail those of dead workers."""
+    engine, Session = get_db_connection()
+    _ensure_jobs_table(engine)
+    session = Session()
+    try:
+        session.query(BackgroundJob).filter(
+            BackgroundJob.owner == worker_id(),
+            BackgroundJob.status == JOB_RUNNING,
+        ).update({'heartbeat_at': datetime.now()}, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+    reclaim_orphaned_jobs()
+
+
+def _heartbeat_forever(stop):
+    while not stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+        try:
+            _heartbeat()
+        except Exception as e:
+            print(f"Background job heartbeat failed: {str(e)}")
+
+
+def reclaim_orphaned_jobs():
+    """
+    Fail running jobs whose worker stopped sending heartbeats.
+
+    A worker restart loses the jobs it was running; without this they would stay running
+    forever and keep identical ETL submissions joining them. Queued jobs wait for any worker
+    and are left alone. Jobs from before heartbeats existed are judged by their creation time.
+
+    Returns:
+        int: Number of jobs marked failed.
+    """
+    engine, Session = get_db_connection()
+    _ensure_jobs_table(engine)
+    session = Session()
+    try:
+        cutoff = datetime.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT)
+        reclaimed = session.query(BackgroundJob).filter(
+            BackgroundJob.status == JOB_RUNNING,
+            func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.created_at) < cutoff,
+        ).update({
+            'status': JOB_FAILED,
+            'error': "The worker running this job stopped before it finished; submit it again",
+            'finished_at': datetime.now(),
+        }, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+    if reclaimed:
+        print(f"Marked {reclaimed} orphaned background jobs failed")
+    return reclaimed
+
+
+def _update_job(job_id, **fields):
+    engine, Session = get_db_connection()
+    _ensure_jobs_table(engine)
+    session = Session()
+    try:
+        session.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(fields)
+        session.commit()
+    finally:
+        session.close()
+
+
+class JobContext:
+    """Handed to job handlers so they can report progress without knowing about the jobs table."""
+
+    # Progress writes are throttled so chatty handlers don't flood the database
+    min_update_interval = 1.0
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_update = 0.0
+
+    def report_progress(self, fraction, message=""):
+        now = time.monotonic()
+        if now - self._last_update < self.min_update_interval and fraction < 1:
+            return
+        self._last_update = now
+        _update_job(self.job_id, progress=round(min(max(fraction, 0.0), 1.0), 4), message=message)
+
+
+def _run_mock_data_job(context, num_tweets_per_company=5000, days=365):
+    from api.logics.data_mocking_logics import generate_all_tweets, load_and_upsert_df
+
+    context.report_progress(0.0, "Generating mock tweets")
+    tweets_df = generate_all_tweets(num_tweets_per_company=num_tweets_per_company, days=days)
+    context.report_progress(0.2, f"Generated {len(tweets_df)} tweets")
+
+    def on_batch(processed, total):
+        context.report_progress(0.2 + 0.8 * processed / total, f"Loaded {processed}/{total} tweets")
+
+    count = load_and_upsert_df(tweets_df, progress_callback=on_batch)
+    return {'tweets': count}, None
+
+
+def _run_etl_job(context, days=30):
+    from api.logics.process_logics import process_tweets_coalesced
+
+    json_result = process_tweets_coalesced(days=days, progress_callback=context.report_progress)
+
+    os.makedirs(settings.JOB_RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(settings.JOB_RESULTS_DIR, f"{context.job_id}.json")
+    with open(result_path, 'w') as f:
+        f.write(json_result)
+    return {'bytes': len(json_result)}, result_path
+
+
+def _run_ingest_job(context, path, fmt=None, batch_size=5000, remove_upload=False):
+    """
+    Load a tweet export; its malformed rows (if any) become the job result.
+
+    With ``remove_upload`` the file is a spooled upload and is deleted however the job ends.
+    """
+    from api.logics.ingest_logics import ingest_file
+
+    os.makedirs(settings.JOB_RESULTS_DIR, exist_ok=True)
+    reject_path = os.path.join(settings.JOB_RESULTS_DIR, f"{context.job_id}.rejects.jsonl")
+    try:
+        stats = ingest_file(
+            path, fmt=fmt, batch_size=batch_size, reject_path=reject_path,
+            progress_callback=context.report_progress,
+        )
+    finally:
+        if remove_upload:
+            _remove_file(path)
+    # Served through the job result endpoint rather than as a server path
+    return stats, stats.pop('reject_path')
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Handlers receive a JobContext plus the job params and return (result, result_path)
+JOB_HANDLERS = {
+    'mock_data': _run_mock_data_job,
+    'etl': _run_etl_job,
+    'ingest': _run_ingest_job,
+}
+
+# Kinds where a submission joins a queued or running job with the same params instead of starting another
+COALESCED_JOB_KINDS = {'etl'}
+
+
+def claim_job():
+    """
+    Mark the oldest queued job as running on this worker.
+
+    SKIP LOCKED makes concurrent workers pass over a job another one is claiming, so each
+    job is claimed once without them waiting on each other.
+
+    Returns:
+        tuple: ``(job_id, kind, params)``, or None when no job is queued.
+    """
+    engine, Session = get_db_connection()
+    _ensure_jobs_table(engine)
+    session = Session()
+    try:
+        job = session.query(BackgroundJob).filter(
+            BackgroundJob.status == JOB_QUEUED,
+        ).order_by(BackgroundJob.created_at).with_for_update(skip_locked=True).first()
+        if job is None:
+            session.commit()
+            return None
+        now = datetime.now()
+        job.status = JOB_RUNNING
+        job.owner = worker_id()
+        job.started_at = now
+        job.heartbeat_at = now
+        job.message = "Started"
+        claimed = (job.id, job.kind, job.params or {})
+        session.commit()
+    finally:
+        session.close()
+    return claimed
+
+
+def _execute(job_id, kind, params):
+    try:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        result, result_path = JOB_HANDLERS[kind](JobContext(job_id), **params)
+    except Exception as e:
+        traceback.print_exc()
+        _update_job(job_id, status=JOB_FAILED, error=str(e), finished_at=datetime.now())
+        return
+    _update_job(
+        job_id,
+        status=JOB_SUCCEEDED,
+        progress=1.0,
+        message="Finished",
+        result=result,
+        result_path=result_path,
+        finished_at=datetime.now(),
+    )
+
+
+def submit_job(kind, **params):
+    """
+    Queue a job for the job workers (the run_jobs command); nothing runs in this process.
+
+    Args:
+        kind (str): Key of JOB_HANDLERS to run.
+        **params: JSON-serializable keyword arguments for the handler.
+
+    Returns:
+        dict: The serialized job, still queued.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    engine, Session = get_db_connection()
+    _ensure_jobs_table(engine)
+    session = Session()
+    try:
+        if kind in COALESCED_JOB_KINDS:
+            existing = _find_identical_job(session, kind, params)
+            if existing is not None:
+                job_data = serialize_job(existing)
+                session.commit()
+                return job_data
+        job = BackgroundJob(id=str(uuid.uuid4()), kind=kind, status=JOB_QUEUED, progress=0.0, params=params)
+        session.add(job)
+        session.commit()
+        job_data = serialize_job(job)
+    finally:
+        session.close()
+    return job_data
+
+
+def _find_identical_job(session, kind, params):
+    """
+    A queued or recently started job of ``kind`` with the same params, if any.
+
+    The advisory lock serializes identical submissions from every process until the caller
+    commits, so two of them can't both miss each other and start duplicate jobs. Jobs older
+    than JOB_COALESCE_WINDOW, or running without a recent heartbeat, are ignored in case
+    their worker died without finishing them.
+    """
+    params_text = json.dumps(params)
+    session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {'key': f"job:{kind}:{params_text}"})
+    return session.query(BackgroundJob).filter(
+        BackgroundJob.kind == kind,
+        BackgroundJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+        cast(BackgroundJob.params, Text) == params_text,
+        BackgroundJob.created_at >= datetime.now() - timedelta(seconds=settings.JOB_COALESCE_WINDOW),
+        or_(
+            BackgroundJob.status == JOB_QUEUED,
+            func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.created_at)
+            >= datetime.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT),
+        ),
+    ).order_by(BackgroundJob.created_at.desc()).first()
+
+
+def _work(stop, poll_interval):
+    while not stop.is_set():
+        try:
+            claimed = claim_job()
+        except Exception as e:
+            print(f"Claiming a background job failed: {str(e)}")
+            claimed = None
+        if claimed is None:
+            stop.wait(poll_interval)
+            continue
+        _execute(*claimed)
+
+
+def run_worker(workers=None, poll_interval=None, stop=None):
+    """
+    Run queued jobs on ``workers`` threads until ``stop`` is set; the run_jobs command.
+
+    Jobs run in this process rather than in the web workers, whose requests would otherwise
+    wait on the GIL while pandas-heavy jobs run. The heartbeat thread keeps this worker's
+    jobs alive and fails those of dead workers.
+
+    Args:
+        workers (int): Jobs run at once (JOB_WORKERS when None).
+        poll_interval (float): Seconds an idle thread waits before looking for a job again
+            (JOB_POLL_SECONDS when None).
+        stop (threading.Event): Set to return once the running jobs finish.
+    """
+    workers = workers or settings.JOB_WORKERS
+    poll_interval = settings.JOB_POLL_SECONDS if poll_interval is None else poll_interval
+    stop = stop or threading.Event()
+    reclaim_orphaned_jobs()
+    threads = [threading.Thread(target=_heartbeat_forever, args=(stop,), name='background-job-heartbeat', daemon=True)]
+    threads += [
+        threading.Thread(target=_work, args=(stop, poll_interval), name=f'background-job-{i}', daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"Running background jobs on {workers} threads as {worker_id()}")
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        stop.set()
+
+
+def get_job(job_id):
+    engine, Session = get_db_connection()
+    _ensure_jobs_table(engine)
+    session = Session()
+    try:
+        job = session.get(BackgroundJob, job_id)
+        return serialize_job(job) if job else None
+    finally:
+        session.close()
+
+
+def serialize_job(job):
+    if job.started_at:
+        duration = ((job.finished_at or datetime.now()) - job.started_at).total_seconds()
+    else:
+        duration = None
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'params': job.params,
+        'result': job.result,
+        'result_path': job.result_path,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        'duration_seconds': round(duration, 3) if duration is not None else None,
+    }
+
+
+def _reset_after_fork():
+    # The child doesn't own the parent's jobs
+    global _worker_id
+    _worker_id = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
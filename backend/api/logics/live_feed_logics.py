@@ -0,0 +1,240 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import select
+
+from api.models import get_db_connection, Tweet, create_tables
+from api.logics.data_mocking_logics import companies, generate_tweet
+from api.logics.loader_logics import upsert_tweets_from_df
+
+
+def seasonal_multiplier(when, amplitude=0.5, peak_hour=14):
+    """
+    Daily seasonality factor for the tweet rate.
+
+    Args:
+        when (datetime): Moment to evaluate.
+        amplitude (float): Relative swing around the base rate (0 disables seasonality).
+        peak_hour (float): Hour of the day with the highest activity.
+
+    Returns:
+        float: Multiplier applied to the base rate, never below 0.05.
+    """
+    hours = when.hour + when.minute / 60 + when.second / 3600
+    factor = 1 + amplitude * math.cos(2 * math.pi * (hours - peak_hour) / 24)
+    return max(factor, 0.05)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LiveFeedStats:
+    """Counters collected while the simulator runs."""
+
+    def __init__(self, latency_window=5000):
+        self.started_at = time.monotonic()
+        self.emitted = 0
+        self.ingested = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.backpressure_seconds = 0.0
+        self.write_seconds = 0.0
+        self.latencies = deque(maxlen=latency_window)
+
+    def snapshot(self, queue_depth=0):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        latencies = list(self.latencies)
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'emitted': self.emitted,
+            'ingested': self.ingested,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'queue_depth': queue_depth,
+            'emit_rate': round(self.emitted / elapsed, 2),
+            'ingest_throughput': round(self.ingested / elapsed, 2),
+            'avg_batch_write_seconds': round(self.write_seconds / self.batches, 4) if self.batches else None,
+            'backpressure_seconds': round(self.backpressure_seconds, 3),
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+            'latency_p99': percentile(latencies, 99),
+        }
+
+
+class LiveFeedSimulator:
+    """
+    Long-running tweet feed for sustained-load testing.
+
+    A producer emits tweets for the mocked `companies` following a Poisson process whose
+    rate follows a daily cycle and occasionally bursts. Tweets go through a bounded queue
+    (so a slow database throttles the producer instead of growing memory) to a consumer
+    that writes them in micro-batches with the regular bulk loader. After each batch a
+    sample of the new ids is read back from the `tweets` table to measure the latency
+    from emission to visibility for readers.
+    """
+
+    def __init__(self, rate=50.0, duration=None, batch_size=200, flush_interval=1.0,
+                 queue_size=5000, seasonality=0.5, peak_hour=14, burst_probability=0.01,
+                 burst_multiplier=5.0, burst_seconds=10.0, probe_sample=5,
+                 report_interval=10.0, positive_ratio=0.65):
+        self.rate = rate
+        self.duration = duration
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.seasonality = seasonality
+        self.peak_hour = peak_hour
+        self.burst_probability = burst_probability
+        self.burst_multiplier = burst_multiplier
+        self.burst_seconds = burst_seconds
+        self.probe_sample = probe_sample
+        self.report_interval = report_interval
+        self.positive_ratio = positive_ratio
+
+        self.stats = LiveFeedStats()
+        self._burst_until = 0.0
+        self._last_burst_check = 0.0
+
+    def current_rate(self, now=None):
+        """Tweets per second right now, including seasonality and any running burst."""
+        now = now or time.monotonic()
+        # Bursts start at most once per second so the probability is independent of the rate
+        if now - self._last_burst_check >= 1.0:
+            self._last_burst_check = now
+            if now >= self._burst_until and random.random() < self.burst_probability:
+                self._burst_until = now + self.burst_seconds
+        rate = self.rate * seasonal_multiplier(datetime.now(), self.seasonality, self.peak_hour)
+        if now < self._burst_until:
+            rate *= self.burst_multiplier
+        return rate
+
+    def make_tweet(self):
+        company = random.choice(companies)
+        sentiment = "positive" if random.random() < self.positive_ratio else "negative"
+        return generate_tweet(company, sentiment, datetime.now())
+
+    async def produce(self, queue, stop_event):
+        loop = asyncio.get_running_loop()
+        next_emit = loop.time()
+        while not stop_event.is_set():
+            next_emit += random.expovariate(self.current_rate())
+            delay = next_emit - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            item = (time.monotonic(), self.make_tweet())
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Backpressure: wait for the writer and don't try to catch up afterwards
+                blocked_at = time.monotonic()
+                await queue.put(item)
+                self.stats.backpressure_seconds += time.monotonic() - blocked_at
+                next_emit = loop.time()
+            self.stats.emitted += 1
+
+    async def _next_batch(self, queue, stop_event):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+            if stop_event.is_set() and queue.empty():
+                break
+        return batch
+
+    async def consume(self, queue, stop_event):
+        while not (stop_event.is_set() and queue.empty()):
+            batch = await self._next_batch(queue, stop_event)
+            if not batch:
+                continue
+
+            tweets_df = pd.DataFrame([tweet for _, tweet in batch])
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(upsert_tweets_from_df, tweets_df, truncate=False)
+            except Exception as e:
+                self.stats.failed_batches += 1
+                print(f"Live feed batch failed: {str(e)}")
+                continue
+            self.stats.write_seconds += time.monotonic() - started
+            self.stats.batches += 1
+            self.stats.ingested += len(batch)
+
+            sample = random.sample(batch, k=min(self.probe_sample, len(batch)))
+            await self._probe_visibility(sample)
+
+    async def _probe_visibility(self, sample, timeout=5.0):
+        pending = {tweet['id']: emitted_at for emitted_at, tweet in sample}
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            visible = await asyncio.to_thread(_fetch_visible_ids, list(pending))
+            now = time.monotonic()
+            for tweet_id in visible:
+                self.stats.latencies.append(round(now - pending.pop(tweet_id), 4))
+            if pending:
+                await asyncio.sleep(0.05)
+
+    async def report(self, queue, stop_event):
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), self.report_interval)
+            except asyncio.TimeoutError:
+                print(f"Live feed: {self.stats.snapshot(queue.qsize())}")
+
+    async def run(self):
+        """Run until `duration` seconds elapse (or forever) and return the final stats."""
+        await asyncio.to_thread(create_tables)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        stop_event = asyncio.Event()
+        self.stats = LiveFeedStats()
+
+        producer = asyncio.create_task(self.produce(queue, stop_event))
+        consumer = asyncio.create_task(self.consume(queue, stop_event))
+        reporter = asyncio.create_task(self.report(queue, stop_event))
+        try:
+            if self.duration:
+                await asyncio.sleep(self.duration)
+            else:
+                await asyncio.Event().wait()
+        finally:
+            stop_event.set()
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            # Let the writer drain what was already accepted
+            await consumer
+            await reporter
+
+        result = self.stats.snapshot(queue.qsize())
+        print(f"Live feed finished: {result}")
+        return result
+
+
+def _fetch_visible_ids(ids):
+    _, Session = get_db_connection()
+    session = Session()
+    try:
+        return set(session.execute(select(Tweet.id).where(Tweet.id.in_(ids))).scalars())
+    finally:
+        session.close()
+
+
+def run_live_feed(**options):
+    """Blocking entry point used by the `simulate_live_feed` management command."""
+    return asyncio.run(LiveFeedSimulator(**options).run())
@@ -0,0 +1,229 @@
+import hashlib
+
+import pandas as pd
+from django.conf import settings
+from sqlalchemy import text, table, column, insert
+
+from api.models import get_db_connection, DAILY_STATS_COMPLETE
+from api.logics.version_logics import bump_data_version, TWEETS
+from api.logics.delta_logics import build_delta, record_delta
+from api.logics.hot_tier_logics import feed_hot_tier
+from api.logics.company_logics import apply_company_counts, invalidate_company_index
+from api.logics.rollup_logics import update_daily_stats, ROLLUP_COLUMNS
+
+# Columns of the `tweets` table, in insert order
+TWEET_COLUMNS = [
+    'id', 'text', 'created_at', 'company',
+    'sentiment_score', 'sentiment_label', 'sentiment_confidence',
+    'user_username', 'user_name', 'user_profile_image_url', 'user_followers_count',
+    'retweet_count', 'reply_count', 'like_count', 'quote_count', 'hashtags',
+]
+
+
+def flatten_tweets_df(df):
+    """
+    Flatten tweets in the nested generator format (``sentiment``/``user``/``metrics`` dicts)
+    into the flat column layout of the `tweets` table.
+    """
+    flattened_df = pd.DataFrame()
+
+    # Copy basic columns
+    flattened_df['id'] = df['id']
+    flattened_df['text'] = df['text']
+    flattened_df['created_at'] = pd.to_datetime(df['created_at'])
+    flattened_df['company'] = df['company']
+
+    # Extract sentiment columns
+    flattened_df['sentiment_score'] = df['sentiment'].apply(lambda x: x['score'])
+    flattened_df['sentiment_label'] = df['sentiment'].apply(lambda x: x['label'])
+    flattened_df['sentiment_confidence'] = df['sentiment'].apply(lambda x: x.get('confidence'))
+
+    # Extract user columns
+    flattened_df['user_username'] = df['user'].apply(lambda x: x['username'])
+    flattened_df['user_name'] = df['user'].apply(lambda x: x['name'])
+    flattened_df['user_profile_image_url'] = df['user'].apply(lambda x: x['profile_image_url'])
+    flattened_df['user_followers_count'] = df['user'].apply(lambda x: x['followers_count'])
+
+    # Extract metrics columns
+    flattened_df['retweet_count'] = df['metrics'].apply(lambda x: x['retweet_count'])
+    flattened_df['reply_count'] = df['metrics'].apply(lambda x: x['reply_count'])
+    flattened_df['like_count'] = df['metrics'].apply(lambda x: x['like_count'])
+    flattened_df['quote_count'] = df['metrics'].apply(lambda x: x['quote_count'])
+    flattened_df['hashtags'] = df['hashtags']
+
+    return flattened_df
+
+
+# Fields that define a tweet's content; a changed hash is the only reason to rewrite a row
+HASHED_COLUMNS = [name for name in TWEET_COLUMNS if name != 'id']
+FLOAT_COLUMNS = ['sentiment_score', 'sentiment_confidence']
+INTEGER_COLUMNS = ['user_followers_count', 'retweet_count', 'reply_count', 'like_count', 'quote_count']
+
+STAGING_TABLE = 'tweets_staging'
+STAGING_COLUMNS = TWEET_COLUMNS + ['content_hash']
+
+
+def compute_content_hashes(flattened_df):
+    """
+    Hash the content columns of each row.
+
+    Values are first rendered to a canonical text form so the hash doesn't depend on
+    whether a loader produced int64, nullable Int64 or float columns for the same data.
+    That text is hashed with SHA-1, so stored hashes stay valid across pandas upgrades.
+
+    Returns:
+        Series: 16-character hex digests aligned with ``flattened_df``.
+    """
+    parts = []
+    for name in HASHED_COLUMNS:
+        values = flattened_df[name]
+        if name == 'created_at':
+            rendered = pd.to_datetime(values).dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        elif name in FLOAT_COLUMNS:
+            rendered = pd.to_numeric(values).round(6).astype('Float64').astype(str)
+        elif name in INTEGER_COLUMNS:
+            rendered = pd.to_numeric(values).astype('Int64').astype(str)
+        else:
+            rendered = values.astype(object).where(values.notna(), '').astype(str)
+        parts.append(rendered.fillna('<NA>'))
+
+    canonical = parts[0].str.cat(parts[1:], sep='\x1f')
+    return canonical.map(lambda value: hashlib.sha1(value.encode()).hexdigest()[:16])
+
+
+def _staging_records(batch_df):
+    batch_df = batch_df[STAGING_COLUMNS]
+    # psycopg2 can't adapt numpy scalars or NaN, so hand it plain Python values
+    return batch_df.astype(object).where(batch_df.notna(), None).to_dict(orient='records')
+
+
+def upsert_flat_tweets(flattened_df, truncate=False, progress_callback=None, batch_size=1000):
+    """
+    Bulk upsert tweets that are already in the flat `tweets` column layout.
+
+    Each batch is staged in a session-local temporary table. Rows whose content hash
+    matches the stored one are dropped from the stage before the merge, so re-loading
+    overlapping data rewrites (and WAL-logs) only the rows that actually changed.
+
+    Args:
+        flattened_df (DataFrame): Rows with the TWEET_COLUMNS columns.
+        truncate (bool): Empty the table before the first batch (full reload).
+        progress_callback (callable): Optional ``callback(processed, total)`` called after each batch.
+        batch_size (int): Rows written per transaction.
+
+    Returns:
+        dict: ``total``, ``inserted``, ``updated`` and ``unchanged`` row counts.
+    """
+    engine, _ = get_db_connection()
+    flattened_df = flattened_df.copy()
+    flattened_df['content_hash'] = compute_content_hashes(flattened_df)
+
+    staging = table(STAGING_TABLE, *[column(name) for name in STAGING_COLUMNS])
+    insert_columns = ", ".join(STAGING_COLUMNS)
+    update_columns = ",\n                ".join(f"{name} = EXCLUDED.{name}" for name in STAGING_COLUMNS if name != 'id')
+    # Live-update deltas and the daily rollups are built from the written rows and, for
+    # updates, the versions they replaced
+    returned = TWEET_COLUMNS if settings.TWEET_DELTAS_ENABLED else ['id', *ROLLUP_COLUMNS]
+    returning_columns = ", ".join(f"tweets.{name}" for name in returned)
+
+    stats = {'total': len(flattened_df), 'inserted': 0, 'updated': 0, 'unchanged': 0}
+    processed = 0
+
+    for i in range(0, len(flattened_df), batch_size):
+        batch_df = flattened_df.iloc[i:i+batch_size]
+
+        with engine.connect() as conn:
+            # Start a transaction
+            trans = conn.begin()
+            try:
+                # A full reload replaces the table; incremental feeds append to it
+                if i == 0 and truncate:
+                    conn.execute(text("TRUNCATE tweets, company_daily_stats"))
+                    bump_data_version(conn, DAILY_STATS_COMPLETE)
+
+                # Temporary tables are not WAL-logged and disappear with the transaction
+                conn.execute(text(f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE tweets INCLUDING DEFAULTS) ON COMMIT DROP"))
+                conn.execute(insert(staging), _staging_records(batch_df))
+
+                conn.execute(text(f"""
+                    DELETE FROM {STAGING_TABLE} AS s
+                    USING tweets AS t
+                    WHERE t.id = s.id AND t.content_hash = s.content_hash
+                """))
+
+                # What the rows about to be updated looked like, locked until the batch commits
+                previous = conn.execute(text(f"""
+                    SELECT {returning_columns} FROM tweets
+                    JOIN {STAGING_TABLE} AS s ON s.id = tweets.id
+                    FOR UPDATE OF tweets
+                """)).mappings().all()
+
+                # xmax is 0 only for freshly inserted row versions
+                written = conn.execute(text(f"""
+                    INSERT INTO tweets ({insert_columns})
+                    SELECT {insert_columns} FROM {STAGING_TABLE}
+                    ON CONFLICT (id) DO UPDATE SET
+                        {update_columns}
+                    WHERE tweets.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+                    RETURNING {returning_columns}, (xmax = 0) AS inserted
+                """)).mappings().all()
+
+                # Lets HTTP validators (ETags) notice the change; batches that wrote nothing keep them valid
+                delta = None
+                if written or (i == 0 and truncate):
+                    version = bump_data_version(conn, TWEETS)
+                    if settings.TWEET_DELTAS_ENABLED:
+                        delta = build_delta(written, previous, reset=(i == 0 and truncate))
+                        record_delta(conn, version, delta)
+                    update_daily_stats(conn, written, previous)
+
+                # Commit the transaction
+                trans.commit()
+            except Exception as e:
+                # Rollback in case of error
+                trans.rollback()
+                raise e
+
+        # The hot tier of this process sees the batch at once; other processes sync it from tweet_deltas
+        if delta is not None:
+            feed_hot_tier(version, delta)
+        if written and not (i == 0 and truncate):
+            apply_company_counts(version, _company_count_changes(written, previous))
+
+        inserted = sum(1 for row in written if row['inserted'])
+        stats['inserted'] += inserted
+        stats['updated'] += len(written) - inserted
+        stats['unchanged'] += len(batch_df) - len(written)
+
+        processed += len(batch_df)
+        print(f"Processed {processed}/{stats['total']} tweets")
+        if progress_callback:
+            progress_callback(processed, stats['total'])
+
+    if truncate:
+        invalidate_company_index()
+    return stats
+
+
+def _company_count_changes(written, previous):
+    # Updated rows leave the company they had before, usually to come back to it
+    changes = {}
+    for row in written:
+        changes[row['company']] = changes.get(row['company'], 0) + 1
+    for row in previous:
+        changes[row['company']] = changes.get(row['company'], 0) - 1
+    return {company: change for company, change in changes.items() if change}
+
+
+# Function to upsert tweets from a DataFrame
+def upsert_tweets_from_df(df, truncate=True, progress_callback=None):
+    try:
+        stats = upsert_flat_tweets(
+            flatten_tweets_df(df), truncate=truncate, progress_callback=progress_callback
+        )
+        print(f"All tweets have been successfully upserted into the database: {stats}")
+        return stats['total']
+
+    except Exception as e:
+        print(f"Error upserting tweets: {str(e)}")
+        raise
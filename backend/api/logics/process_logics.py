@@ -1,10 +1,18 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from api.models import get_db_connection, Tweet
+from api.models import get_db_connection, get_read_db_connection, Tweet
+from api.logics.singleflight_logics import coalesce
+from api.logics.version_logics import etl_validator, get_data_version, TWEETS
+from api.logics.cache_logics import get_cached_companies, store_companies, evict
+from api.logics.health_logics import etl_durations
+from api.logics.rollup_logics import (
+    load_daily_stats, window_days, build_unique_authors, build_sentiment_percentiles, build_sentiment_histogram
+)
 from sqlalchemy import create_engine, text, select
 from django.conf import settings
 import json
+import time
 
 def extract():
     engine, session = get_db_connection()
@@ -12,301 +20,445 @@ def extract():
     session.close()
     return data
 
-def process_tweets_for_frontend(db_url=None, days=30, output_file='processed_companies_data.json'):
+
+# Helper function to extract hashtags from the hashtags string
+def extract_hashtags_list(hashtags_str):
+    if not hashtags_str or pd.isna(hashtags_str):
+        return []
+    # Extract hashtags without the # symbol
+    return [tag.strip('#') for tag in hashtags_str.split() if tag.startswith('#')]
+
+
+def format_tweet(tweet):
+    """Format one tweets row the way the frontend's TopTweets widget expects it."""
+    hashtags = extract_hashtags_list(tweet['hashtags'])
+
+    formatted_tweet = {
+        'id': tweet['id'],
+        'text': tweet['text'],
+        'created_at': tweet['created_at'].isoformat(),
+        'sentiment': {
+            'score': float(tweet['sentiment_score']),
+            'label': tweet['sentiment_label'],
+            'confidence': float(tweet['sentiment_confidence']) if pd.notna(tweet['sentiment_confidence']) else 0.9
+        },
+        'user': {
+            'username': tweet['user_username'],
+            'name': tweet['user_name'],
+            'profile_image_url': tweet['user_profile_image_url'],
+            'followers_count': int(tweet['user_followers_count']) if pd.notna(tweet['user_followers_count']) else 0
+        },
+        'metrics': {
+            'retweet_count': int(tweet['retweet_count']),
+            'reply_count': int(tweet['reply_count']),
+            'like_count': int(tweet['like_count']),
+            'quote_count': int(tweet['quote_count'])
+        }
+    }
+
+    # Add entities if hashtags exist
+    if hashtags:
+        formatted_tweet['entities'] = {
+            'hashtags': hashtags
+        }
+    return formatted_tweet
+
+
+def build_sentiment_summary(company_df):
+    total_tweets = len(company_df)
+    positive_count = (company_df['sentiment_label'] == 'positive').sum()
+    negative_count = (company_df['sentiment_label'] == 'negative').sum()
+
+    positive_percentage = int(round(positive_count / total_tweets * 100)) if total_tweets > 0 else 0
+    negative_percentage = int(round(negative_count / total_tweets * 100)) if total_tweets > 0 else 0
+    neutral_percentage = 100 - positive_percentage - negative_percentage
+
+    overall_score = round(company_df['sentiment_score'].mean(), 2) if not company_df.empty else 0
+
+    return {
+        'overall_score': overall_score,
+        'positive_percentage': positive_percentage,
+        'negative_percentage': negative_percentage,
+        'neutral_percentage': neutral_percentage,
+        'total_tweets': total_tweets
+    }
+
+
+def build_sentiment_trend(company_df):
+    """Weekly sentiment averages and tweet counts."""
+    # Group by week and calculate averages
+    company_df = company_df.assign(week_start=company_df['created_at'].dt.to_period('W-MON').dt.start_time)
+    weekly_sentiment = company_df.groupby('week_start').agg(
+        average_score=('sentiment_score', 'mean'),
+        tweet_count=('id', 'count')
+    ).reset_index()
+
+    # Format the trend data
+    return [
+        {
+            'date': row['week_start'].strftime('%Y-%m-%d'),
+            'average_score': round(row['average_score'], 2),
+            'tweet_count': int(row['tweet_count'])
+        }
+        for _, row in weekly_sentiment.iterrows()
+    ]
+
+
+def build_top_tweets(company_df, count=5):
+    """Most positive and most negative tweets, ties broken by engagement."""
+    company_df = company_df.assign(engagement_score=(
+        company_df['retweet_count'] * 2 +
+        company_df['like_count'] +
+        company_df['reply_count'] * 1.5 +
+        company_df['quote_count'] * 1.5
+    ))
+    positive_df = company_df[company_df['sentiment_label'] == 'positive']
+    negative_df = company_df[company_df['sentiment_label'] == 'negative']
+
+    top_positive = positive_df.sort_values(
+        by=['sentiment_score', 'engagement_score'],
+        ascending=[False, False]
+    ).head(count)
+    top_negative = negative_df.sort_values(
+        by=['sentiment_score', 'engagement_score'],
+        ascending=[True, False]
+    ).head(count)
+
+    return {
+        'positive': [format_tweet(tweet) for _, tweet in top_positive.iterrows()],
+        'negative': [format_tweet(tweet) for _, tweet in top_negative.iterrows()],
+    }
+
+
+def build_key_topics(company_df, company):
+    """Top hashtags with their average sentiment, topped up with frequent words."""
+    topics = []
+
+    # Extract all hashtags from the company's tweets
+    all_hashtags = []
+    for hashtags_str in company_df['hashtags'].dropna():
+        all_hashtags.extend(extract_hashtags_list(hashtags_str))
+
+    # Count hashtag occurrences
+    if all_hashtags:
+        hashtag_counts = pd.Series(all_hashtags).value_counts()
+
+        # Get top hashtags
+        for hashtag, count in hashtag_counts.head(10).items():
+            # Calculate average sentiment for tweets with this hashtag
+            hashtag_tweets = company_df[company_df['hashtags'].str.contains(f"#{hashtag}", na=False)]
+            avg_sentiment = hashtag_tweets['sentiment_score'].mean() if not hashtag_tweets.empty else 0.5
+
+            topics.append({
+                'topic': hashtag,
+                'count': int(count),
+                'sentiment_score': round(float(avg_sentiment), 2)
+            })
+
+    # Fallback: Extract topics from tweet text if we don't have enough hashtags
+    if len(topics) < 5:
+        # Combine all tweet text
+        all_text = ' '.join(company_df['text'].tolist())
+
+        # Split into words and count occurrences
+        words = all_text.lower().split()
+        word_counts = pd.Series(words).value_counts()
+
+        # Filter out common words and short words
+        common_words = ['the', 'and', 'is', 'in', 'to', 'a', 'of', 'for', 'with', 'on', 'at', 'from', 'by', 'about', 'as', 'an', 'my', 'i', 'me', 'you', 'we', 'they', 'it', 'this', 'that']
+        filtered_words = word_counts[~word_counts.index.isin(common_words)]
+        filtered_words = filtered_words[filtered_words.index.str.len() > 3]
+
+        # Get top words
+        top_words = filtered_words.head(10)
+
+        # Add to topics
+        for word, count in top_words.items():
+            # Calculate average sentiment for tweets containing this word
+            word_tweets = company_df[company_df['text'].str.contains(word, case=False)]
+            avg_sentiment = word_tweets['sentiment_score'].mean() if not word_tweets.empty else 0.5
+
+            topics.append({
+                'topic': word.capitalize(),
+                'count': int(count),
+                'sentiment_score': round(float(avg_sentiment), 2)
+            })
+
+    # Ensure we have at least 5 topics
+    if len(topics) < 5:
+        # Add company name as a topic if we don't have enough
+        if not any(t['topic'] == company for t in topics):
+            topics.append({
+                'topic': company,
+                'count': len(company_df),
+                'sentiment_score': round(company_df['sentiment_score'].mean(), 2) if not company_df.empty else 0
+            })
+
+    # Limit to top 5 topics
+    return topics[:5]
+
+
+# Dashboard sections: builder(company_df, company) and the `tweets` columns it reads
+SECTIONS = {
+    'sentiment_summary': (
+        lambda company_df, company: build_sentiment_summary(company_df),
+        ['sentiment_score', 'sentiment_label'],
+    ),
+    'sentiment_trend': (
+        lambda company_df, company: build_sentiment_trend(company_df),
+        ['id', 'created_at', 'sentiment_score'],
+    ),
+    'top_tweets': (
+        lambda company_df, company: build_top_tweets(company_df),
+        [column.key for column in Tweet.__table__.columns if column.key != 'content_hash'],
+    ),
+    'key_topics': (
+        build_key_topics,
+        ['text', 'hashtags', 'sentiment_score'],
+    ),
+}
+
+# Dashboard sections answered from the per-day rollups (`company_daily_stats`) instead of the
+# tweets: builder(daily_rows, company) and the rollup columns it reads
+ROLLUP_SECTIONS = {
+    'unique_authors': (
+        lambda daily_rows, company: build_unique_authors(daily_rows),
+        ['tweet_count', 'author_sketch'],
+    ),
+    'sentiment_percentiles': (
+        lambda daily_rows, company: build_sentiment_percentiles(daily_rows),
+        ['sentiment_digest'],
+    ),
+    'sentiment_histogram': (
+        lambda daily_rows, company: build_sentiment_histogram(daily_rows),
+        ['sentiment_digest'],
+    ),
+}
+
+# Every section the dashboard can return
+ALL_SECTIONS = [*SECTIONS, *ROLLUP_SECTIONS]
+
+
+def load_rollups(conn, companies, days, sections=None):
+    """Rollup rows of the dashboard window for ``sections`` (all rollup sections when None), per company."""
+    sections = list(ROLLUP_SECTIONS) if sections is None else sections
+    columns = sorted({column for section in sections for column in ROLLUP_SECTIONS[section][1]})
+    return load_daily_stats(conn, companies, *window_days(days), columns=columns)
+
+
+def load_tweets(engine, days, companies=None, columns=None):
+    """
+    Tweets of the last ``days`` days, newest first, in one query.
+
+    Args:
+        engine: SQLAlchemy engine to read from.
+        days (int): Size of the window ending now.
+        companies (list): Only these companies (all when None).
+        columns (list): `tweets` columns to read (all when None); company and created_at are always included.
+    """
+    start_date = datetime.now() - timedelta(days=days)
+    table = Tweet.__table__
+    if columns is None:
+        selected = [table]
+    else:
+        names = ['company', 'created_at'] + [name for name in columns if name not in ('company', 'created_at')]
+        selected = [table.c[name] for name in names]
+
+    query = select(*selected).where(table.c.created_at >= start_date).order_by(table.c.created_at.desc())
+    if companies is not None:
+        query = query.where(table.c.company.in_(companies))
+
+    print(f"Loading tweets from {start_date.strftime('%Y-%m-%d')}...")
+    with engine.connect() as conn:
+        df = pd.read_sql_query(query, conn)
+    if len(df) and not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+        df['created_at'] = pd.to_datetime(df['created_at'])
+    return df
+
+
+def build_dashboard(companies, sections=None, days=30):
+    """
+    Dashboard sections for several companies from a single shared read.
+
+    The columns needed by the requested sections are planned up front and read for all
+    companies in one query; the rows are then split per company in memory. Rollup sections
+    are read the same way from `company_daily_stats`, and when only those are requested the
+    tweets aren't read at all.
+
+    Args:
+        companies (list): Company names.
+        sections (list): Keys of ALL_SECTIONS (all when None).
+        days (int): Number of days of data to include.
+
+    Returns:
+        dict: ``{company: {section: data}}``; companies without tweets in the window map to None.
+    """
+    sections = list(ALL_SECTIONS) if sections is None else sections
+    tweet_sections = [section for section in sections if section in SECTIONS]
+    rollup_sections = [section for section in sections if section in ROLLUP_SECTIONS]
+    engine, _ = get_read_db_connection()
+
+    daily = {}
+    if rollup_sections:
+        with engine.connect() as conn:
+            daily = load_rollups(conn, companies, days, rollup_sections)
+    grouped = daily
+    if tweet_sections:
+        columns = sorted({column for section in tweet_sections for column in SECTIONS[section][1]})
+        df = load_tweets(engine, days, companies=companies, columns=columns)
+        grouped = dict(tuple(df.groupby('company', sort=False))) if len(df) else {}
+
+    result = {}
+    for company in companies:
+        if company not in grouped:
+            result[company] = None
+            continue
+        result[company] = {
+            section: SECTIONS[section][0](grouped[company], company) if section in SECTIONS
+            else ROLLUP_SECTIONS[section][0](daily.get(company, []), company)
+            for section in sections
+        }
+    return result
+
+
+def build_dashboard_cached(companies, sections=None, days=30, etag=None):
+    """
+    build_dashboard backed by the persistent per-company cache (see cache_logics).
+
+    Companies cached for the current ETL validator are read from `searched_companies`; the
+    others are built with every section, stored for the next request (in any worker) and the
+    cache is trimmed to its budget. Same arguments and result as build_dashboard, plus ``etag``
+    (from etl_validator, looked up when not given).
+
+    Lookups go to the read database like the build; only storing entries uses the primary.
+    """
+    sections = list(ALL_SECTIONS) if sections is None else sections
+    read_engine, _ = get_read_db_connection()
+    with read_engine.connect() as conn:
+        version, _ = get_data_version(conn, TWEETS)
+        if etag is None:
+            etag, _ = etl_validator(conn, days)
+        payloads = get_cached_companies(conn, companies, etag)
+    # Entries stored before a section was added are rebuilt
+    payloads = {
+        company: payload for company, payload in payloads.items()
+        if payload is None or all(section in payload for section in ALL_SECTIONS)
+    }
+
+    missing = [company for company in companies if company not in payloads]
+    if missing:
+        built = build_dashboard(missing, days=days)
+        engine, _ = get_db_connection()
+        with engine.begin() as conn:
+            store_companies(conn, {company: payload for company, payload in built.items() if payload is not None}, etag, version)
+            evict(conn)
+        payloads.update(built)
+
+    return {
+        company: None if payloads[company] is None else {section: payloads[company][section] for section in sections}
+        for company in companies
+    }
+
+
+def process_tweets_for_frontend(db_url=None, days=30, output_file='processed_companies_data.json', progress_callback=None):
     """
     Process tweets from the database into the format needed for the frontend.
-    
+
     Args:
-        db_url (str): Database connection URL. If None, uses DATABASE_URL env variable.
+        db_url (str): Database connection URL. If None, uses the shared DATABASE_URL engine.
         days (int): Number of days of data to process (default: 30)
         output_file (str): Path to save the processed JSON data (default: 'processed_companies_data.json')
-        
+        progress_callback (callable): Optional ``callback(fraction, message)`` called as companies are processed
+
     Returns:
         dict: Processed data in the format needed for the frontend
     """
-    # Get database URL from environment if not provided
+    started = time.perf_counter()
+    # Use the shared read engine (the replica when available) unless a specific database was requested
     if db_url is None:
-        db_url = settings.DATABASE_URL
-        if not db_url:
-            raise ValueError("DATABASE_URL environment variable is not set")
-    
-    # Create database connection
-    engine = create_engine(db_url)
-    
-    # Calculate the date range
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    
-    # Query tweets from the database
-    query = f"""
-    SELECT * FROM tweets 
-    WHERE created_at >= '{start_date.isoformat()}' 
-    ORDER BY created_at DESC
-    """
-    
+        engine, _ = get_read_db_connection()
+    else:
+        engine = create_engine(db_url)
+
     # Load tweets into a DataFrame
-    print(f"Loading tweets from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
-    df = pd.read_sql(query, engine)
-    
+    df = load_tweets(engine, days)
+
     if len(df) == 0:
         print("No tweets found in the specified date range.")
         return []
-    
+
     print(f"Loaded {len(df)} tweets. Processing data...")
-    
+
     # Process the data for each company
     companies_data = []
-    
+
     # Get unique companies
     unique_companies = df['company'].unique()
-    
-    for company in unique_companies:
+    with engine.connect() as conn:
+        daily = load_rollups(conn, list(unique_companies), days)
+
+    for index, company in enumerate(unique_companies):
         print(f"Processing data for {company}...")
-        
+        if progress_callback:
+            progress_callback(index / len(unique_companies), f"Processing data for {company}")
+
         # Filter tweets for this company
-        company_df = df[df['company'] == company].copy()
-        
+        company_df = df[df['company'] == company]
+
         # Get company logo URL (using the first tweet's user profile image as a placeholder)
         # In a real app, you would have a separate table for company info
         logo_url = company_df['user_profile_image_url'].iloc[0] if not company_df.empty else ""
-        
-        # Calculate sentiment trend (weekly averages)
-        # Convert created_at to datetime if it's not already
-        if not pd.api.types.is_datetime64_any_dtype(company_df['created_at']):
-            company_df['created_at'] = pd.to_datetime(company_df['created_at'])
-        
-        # Create a date column for easier grouping
-        company_df['date'] = company_df['created_at'].dt.floor('D')
-        
-        # Group by week and calculate averages
-        company_df['week_start'] = company_df['created_at'].dt.to_period('W-MON').dt.start_time
-        
-        # Get weekly sentiment averages and tweet counts
-        weekly_sentiment = company_df.groupby('week_start').agg(
-            average_score=('sentiment_score', 'mean'),
-            tweet_count=('id', 'count')
-        ).reset_index()
-        
-        # Format the trend data
-        sentiment_trend = []
-        for _, row in weekly_sentiment.iterrows():
-            sentiment_trend.append({
-                'date': row['week_start'].strftime('%Y-%m-%d'),
-                'average_score': round(row['average_score'], 2),
-                'tweet_count': int(row['tweet_count'])
-            })
-        
-        # Get top positive and negative tweets
-        # Sort by a combination of sentiment score and engagement metrics
-        
-        company_df['engagement_score'] = (
-            company_df['retweet_count'] * 2 + 
-            company_df['like_count'] + 
-            company_df['reply_count'] * 1.5 + 
-            company_df['quote_count'] * 1.5
-        )
-
-        # Calculate sentiment summary
-        total_tweets = len(company_df)
-        positive_df = company_df[company_df['sentiment_label'] == 'positive']
-        negative_df = company_df[company_df['sentiment_label'] == 'negative']
-        
-        positive_percentage = int(round(len(positive_df) / total_tweets * 100)) if total_tweets > 0 else 0
-        negative_percentage = int(round(len(negative_df) / total_tweets * 100)) if total_tweets > 0 else 0
-        neutral_percentage = 100 - positive_percentage - negative_percentage
-        
-        overall_score = round(company_df['sentiment_score'].mean(), 2) if not company_df.empty else 0
-        
-        # Get top positive tweets
-        top_positive = positive_df.sort_values(
-            by=['sentiment_score', 'engagement_score'], 
-            ascending=[False, False]
-        ).head(5)
-        
-        # Get top negative tweets
-        top_negative = negative_df.sort_values(
-            by=['sentiment_score', 'engagement_score'], 
-            ascending=[True, False]
-        ).head(5)
-        
-        # Format top tweets
-        top_tweets = {
-            'positive': [],
-            'negative': []
-        }
-        
-        # Helper function to extract hashtags from the hashtags string
-        def extract_hashtags_list(hashtags_str):
-            if not hashtags_str or pd.isna(hashtags_str):
-                return []
-            # Extract hashtags without the # symbol
-            return [tag.strip('#') for tag in hashtags_str.split() if tag.startswith('#')]
-        
-        # Process positive tweets
-        for _, tweet in top_positive.iterrows():
-            # Extract hashtags from the hashtags string
-            hashtags = extract_hashtags_list(tweet['hashtags'])
-            
-            # Format the tweet
-            formatted_tweet = {
-                'id': tweet['id'],
-                'text': tweet['text'],
-                'created_at': tweet['created_at'].isoformat(),
-                'sentiment': {
-                    'score': float(tweet['sentiment_score']),
-                    'label': tweet['sentiment_label'],
-                    'confidence': float(tweet['sentiment_confidence']) if pd.notna(tweet['sentiment_confidence']) else 0.9
-                },
-                'user': {
-                    'username': tweet['user_username'],
-                    'name': tweet['user_name'],
-                    'profile_image_url': tweet['user_profile_image_url'],
-                    'followers_count': int(tweet['user_followers_count'])
-                },
-                'metrics': {
-                    'retweet_count': int(tweet['retweet_count']),
-                    'reply_count': int(tweet['reply_count']),
-                    'like_count': int(tweet['like_count']),
-                    'quote_count': int(tweet['quote_count'])
-                }
-            }
-            
-            # Add entities if hashtags exist
-            if hashtags:
-                formatted_tweet['entities'] = {
-                    'hashtags': hashtags
-                }
-            
-            top_tweets['positive'].append(formatted_tweet)
-        
-        # Process negative tweets
-        for _, tweet in top_negative.iterrows():
-            # Extract hashtags from the hashtags string
-            hashtags = extract_hashtags_list(tweet['hashtags'])
-            
-            # Format the tweet
-            formatted_tweet = {
-                'id': tweet['id'],
-                'text': tweet['text'],
-                'created_at': tweet['created_at'].isoformat(),
-                'sentiment': {
-                    'score': float(tweet['sentiment_score']),
-                    'label': tweet['sentiment_label'],
-                    'confidence': float(tweet['sentiment_confidence']) if pd.notna(tweet['sentiment_confidence']) else 0.9
-                },
-                'user': {
-                    'username': tweet['user_username'],
-                    'name': tweet['user_name'],
-                    'profile_image_url': tweet['user_profile_image_url'],
-                    'followers_count': int(tweet['user_followers_count'])
-                },
-                'metrics': {
-                    'retweet_count': int(tweet['retweet_count']),
-                    'reply_count': int(tweet['reply_count']),
-                    'like_count': int(tweet['like_count']),
-                    'quote_count': int(tweet['quote_count'])
-                }
-            }
-            
-            # Add entities if hashtags exist
-            if hashtags:
-                formatted_tweet['entities'] = {
-                    'hashtags': hashtags
-                }
-            
-            top_tweets['negative'].append(formatted_tweet)
-        
-        # Extract key topics from hashtags
-        topics = []
-        
-        # Extract all hashtags from the company's tweets
-        all_hashtags = []
-        for hashtags_str in company_df['hashtags'].dropna():
-            all_hashtags.extend(extract_hashtags_list(hashtags_str))
-        
-        # Count hashtag occurrences
-        if all_hashtags:
-            hashtag_counts = pd.Series(all_hashtags).value_counts()
-            
-            # Get top hashtags
-            for hashtag, count in hashtag_counts.head(10).items():
-                # Calculate average sentiment for tweets with this hashtag
-                hashtag_tweets = company_df[company_df['hashtags'].str.contains(f"#{hashtag}", na=False)]
-                avg_sentiment = hashtag_tweets['sentiment_score'].mean() if not hashtag_tweets.empty else 0.5
-                
-                topics.append({
-                    'topic': hashtag,
-                    'count': int(count),
-                    'sentiment_score': round(float(avg_sentiment), 2)
-                })
-        
-        # Fallback: Extract topics from tweet text if we don't have enough hashtags
-        if len(topics) < 5:
-            # Combine all tweet text
-            all_text = ' '.join(company_df['text'].tolist())
-            
-            # Split into words and count occurrences
-            words = all_text.lower().split()
-            word_counts = pd.Series(words).value_counts()
-            
-            # Filter out common words and short words
-            common_words = ['the', 'and', 'is', 'in', 'to', 'a', 'of', 'for', 'with', 'on', 'at', 'from', 'by', 'about', 'as', 'an', 'my', 'i', 'me', 'you', 'we', 'they', 'it', 'this', 'that']
-            filtered_words = word_counts[~word_counts.index.isin(common_words)]
-            filtered_words = filtered_words[filtered_words.index.str.len() > 3]
-            
-            # Get top words
-            top_words = filtered_words.head(10)
-            
-            # Add to topics
-            for word, count in top_words.items():
-                # Calculate average sentiment for tweets containing this word
-                word_tweets = company_df[company_df['text'].str.contains(word, case=False)]
-                avg_sentiment = word_tweets['sentiment_score'].mean() if not word_tweets.empty else 0.5
-                
-                topics.append({
-                    'topic': word.capitalize(),
-                    'count': int(count),
-                    'sentiment_score': round(float(avg_sentiment), 2)
-                })
-        
-        # Ensure we have at least 5 topics
-        if len(topics) < 5:
-            # Add company name as a topic if we don't have enough
-            if not any(t['topic'] == company for t in topics):
-                topics.append({
-                    'topic': company,
-                    'count': total_tweets,
-                    'sentiment_score': overall_score
-                })
-        
-        # Limit to top 5 topics
-        topics = topics[:5]
-        
+
         # Create the company data object
         company_data = {
             'company': company,
             'logo_url': logo_url,
             'time_period': f"Last {days} days",
-            'sentiment_summary': {
-                'overall_score': overall_score,
-                'positive_percentage': positive_percentage,
-                'negative_percentage': negative_percentage,
-                'neutral_percentage': neutral_percentage,
-                'total_tweets': total_tweets
-            },
-            'sentiment_trend': sentiment_trend,
-            'top_tweets': top_tweets,
-            'key_topics': topics
+            **{section: builder(company_df, company) for section, (builder, _) in SECTIONS.items()},
+            **{section: builder(daily.get(company, []), company) for section, (builder, _) in ROLLUP_SECTIONS.items()},
         }
-        
+
         companies_data.append(company_data)
-    
+
     json_output = json.dumps(companies_data, indent=2)
-    
-    
+
+
     print(f"Processed data for {len(companies_data)} companies.")
     print(f"Data saved to {output_file}")
-    
+    etl_durations.record(time.perf_counter() - started)
+
     return json_output
 
 
+def process_tweets_coalesced(days=30, progress_callback=None, etag=None):
+    """
+    process_tweets_for_frontend as a JSON string, shared with identical ETLs already running.
+
+    Concurrent callers for the same window and data version (``etag`` from etl_validator,
+    looked up when not given) wait for one run instead of each scanning the tweets table.
+    The run stores each company's sections in the persistent company cache.
+    """
+    # Versioned from the database the ETL reads; the cache is written on the primary
+    read_engine, _ = get_read_db_connection()
+    with read_engine.connect() as conn:
+        version, _ = get_data_version(conn, TWEETS)
+        if etag is None:
+            etag, _ = etl_validator(conn, days)
+    engine, _ = get_db_connection()
+
+    def compute():
+        result = process_tweets_for_frontend(days=days, progress_callback=progress_callback)
+        result = result if isinstance(result, str) else json.dumps(result)
+        # The per-company sections also warm the dashboard cache for the same window and version
+        try:
+            with engine.begin() as conn:
+                store_companies(conn, {
+                    company_data['company']: {section: company_data[section] for section in ALL_SECTIONS}
+                    for company_data in json.loads(result)
+                }, etag, version)
+                evict(conn)
+        except Exception as e:
+            print(f"Could not warm the company cache: {str(e)}")
+        return result
+
+    return coalesce(f"etl:{days}:{etag}", compute)
@@ -0,0 +1,209 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from sqlalchemy import and_, or_, select, tuple_
+
+from api.engines import get_async_engine, dispose_async_engines
+from api.models import SocialMediaData
+
+
+class InvalidQuery(ValueError):
+    """Raised for malformed pagination or filter parameters (reported as HTTP 400)."""
+
+
+def encode_cursor(created_at, row_id):
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor")
+
+
+def parse_positive_int(name, value, default, maximum=None):
+    """``value`` from a query string or JSON body as an integer of at least 1, capped at ``maximum``."""
+    if value in (None, ''):
+        return default
+    # JSON may hold any type; int() would silently accept booleans and truncate floats
+    if not isinstance(value, (int, str)) or isinstance(value, bool):
+        raise InvalidQuery(f"{name} must be an integer")
+    try:
+        number = int(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be an integer")
+    if number < 1:
+        raise InvalidQuery(f"{name} must be positive")
+    return number if maximum is None else min(number, maximum)
+
+
+def parse_limit(value, default, maximum):
+    return parse_positive_int('limit', value, default, maximum)
+
+
+def parse_datetime(name, value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be an ISO date or datetime")
+
+
+def _parse_number(name, value, cast=float):
+    try:
+        return cast(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be a number")
+
+
+def parse_filters(params):
+    """
+    WHERE clauses for the SocialMediaData filter query parameters.
+
+    Supported parameters: ``since`` / ``until`` (ISO date or datetime, ``until`` exclusive),
+    ``sentiment`` (label, comma-separated for several), ``min_score`` and ``min_likes``.
+    """
+    conditions = []
+    if params.get('since'):
+        conditions.append(SocialMediaData.created_at >= parse_datetime('since', params['since']))
+    if params.get('until'):
+        conditions.append(SocialMediaData.created_at < parse_datetime('until', params['until']))
+    if params.get('sentiment'):
+        labels = [label.strip() for label in params['sentiment'].split(',') if label.strip()]
+        conditions.append(SocialMediaData.sentiment.in_(labels))
+    if params.get('min_score'):
+        conditions.append(SocialMediaData.score >= _parse_number('min_score', params['min_score']))
+    if params.get('min_likes'):
+        conditions.append(SocialMediaData.likes >= _parse_number('min_likes', params['min_likes'], int))
+    return conditions
+
+
+def parse_fields(params, columns):
+    """
+    Project ``columns`` down to the comma-separated ``fields`` parameter, keeping their order.
+    """
+    if not params.get('fields'):
+        return columns
+    requested = {name.strip() for name in params['fields'].split(',') if name.strip()}
+    available = {column.key for column in columns}
+    unknown = requested - available
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(sorted(unknown))}; available: {', '.join(sorted(available))}")
+    return [column for column in columns if column.key in requested]
+
+
+def order_newest_first(query):
+    # DESC sorts NULLs first, which is the order a backward scan of the (created_at, id)
+    # indexes returns, so pages are read off the index without sorting
+    return query.order_by(SocialMediaData.created_at.desc(), SocialMediaData.id.desc())
+
+
+def after_cursor(query, cursor):
+    """
+    Keyset condition for rows that come after ``cursor`` in newest-first order.
+
+    A row comparison on (created_at, id) is an index range. Rows without a created_at sort
+    first; a cursor pointing at one of them continues with the older NULL rows and then
+    every dated row, which is slower but only while paging through those rows.
+    """
+    created_at, row_id = decode_cursor(cursor)
+    if created_at is None:
+        return query.where(or_(
+            and_(SocialMediaData.created_at.is_(None), SocialMediaData.id < row_id),
+            SocialMediaData.created_at.is_not(None),
+        ))
+    return query.where(tuple_(SocialMediaData.created_at, SocialMediaData.id) < tuple_(created_at, row_id))
+
+
+def page_query(columns, limit, cursor=None, conditions=()):
+    """
+    Select for one keyset page of SocialMediaData rows, newest first.
+
+    Args:
+        columns (list): SocialMediaData columns to select (plus created_at and id for the cursor).
+        limit (int): Page size.
+        cursor (str): Opaque cursor returned with the previous page.
+        conditions (iterable): Extra WHERE clauses.
+    """
+    keys = [SocialMediaData.created_at.label('_cursor_created_at'), SocialMediaData.id.label('_cursor_id')]
+    query = order_newest_first(select(*columns, *keys).where(*conditions))
+    if cursor:
+        query = after_cursor(query, cursor)
+    # Fetch one extra row to know whether there is a next page without a COUNT
+    return query.limit(limit + 1)
+
+
+def page_from_rows(result, columns, limit):
+    """Turn the rows of page_query into ``(rows, next_cursor)``; next_cursor is None on the last page."""
+    rows = [{column.key: row[column.key] for column in columns} for row in result[:limit]]
+    next_cursor = None
+    if len(result) > limit:
+        last = result[limit - 1]
+        next_cursor = encode_cursor(last['_cursor_created_at'], last['_cursor_id'])
+    return rows, next_cursor
+
+
+def fetch_page(session, columns, limit, cursor=None, conditions=()):
+    """One keyset page of SocialMediaData rows as dicts, see page_query."""
+    result = session.execute(page_query(columns, limit, cursor, conditions)).mappings().all()
+    return page_from_rows(result, columns, limit)
+
+
+async def async_fetch_page(conn, columns, limit, cursor=None, conditions=()):
+    """fetch_page on an AsyncConnection."""
+    result = (await conn.execute(page_query(columns, limit, cursor, conditions))).mappings().all()
+    return page_from_rows(result, columns, limit)
+
+
+def stream_rows_as_json(Session, columns, conditions=(), chunk_size=1000):
+    """
+    Generator yielding a JSON array of SocialMediaData rows, newest first.
+
+    Rows come from a server-side cursor in chunks of ``chunk_size``, so memory use doesn't
+    depend on the table size. The session lives as long as the generator.
+    """
+    session = Session()
+    try:
+        query = order_newest_first(select(*columns).where(*conditions))
+        result = session.execute(query.execution_options(stream_results=True, yield_per=chunk_size))
+        encoder = DjangoJSONEncoder()
+        yield '['
+        first = True
+        for partition in result.mappings().partitions():
+            chunk = ','.join(encoder.encode(dict(row)) for row in partition)
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+    finally:
+        session.close()
+
+
+async def async_stream_rows_as_json(columns, conditions=(), chunk_size=1000, database='default', dispose_engines=False):
+    """
+    Async generator version of stream_rows_as_json, reading from ``database`` ('default' or 'replica').
+
+    The engine is looked up when iteration starts rather than when the generator is created:
+    the server may consume the response body on a different event loop than the view ran on.
+    With ``dispose_engines`` (WSGI, where that loop ends with the body) the loop's engines are
+    closed once the body is written.
+    """
+    query = order_newest_first(select(*columns).where(*conditions))
+    encoder = DjangoJSONEncoder()
+    try:
+        async with get_async_engine(database).connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=chunk_size))
+            yield '['
+            first = True
+            async for partition in result.mappings().partitions():
+                chunk = ','.join(encoder.encode(dict(row)) for row in partition)
+                yield chunk if first else ',' + chunk
+                first = False
+            yield ']'
+    finally:
+        if dispose_engines:
+            await dispose_async_engines()
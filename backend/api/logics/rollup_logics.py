@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from api.models import get_db_connection, CompanyDailyStats, Tweet, DAILY_STATS_COMPLETE
+from api.logics.version_logics import bump_data_version
+from api.logics.sketch_logics import HyperLogLog, TDigest, build_tdigests, hash_values, hll_registers
+
+_table = CompanyDailyStats.__table__
+
+# `tweets` columns the rollups are built from; the loader returns them for the rows it inserts
+ROLLUP_COLUMNS = ['company', 'created_at', 'user_username', 'sentiment_score']
+
+# Percentiles of the sentiment_percentiles section and the bins of sentiment_histogram (scores are 0-1)
+SENTIMENT_PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+SENTIMENT_HISTOGRAM_EDGES = np.linspace(0, 1, 11)
+
+
+def update_daily_stats(conn, rows, previous_rows=()):
+    """
+    Apply the tweets a loader batch wrote to the rollups of their company and day.
+
+    Inserted rows are added: sketches are built for the whole batch in one pass and merged
+    with the stored ones. An updated row whose rollup contribution changed (see
+    _contribution) has to leave the company-day it was counted in, which a sketch can't
+    forget, so the company-days it left and joined are rebuilt from the `tweets` table,
+    which already holds the batch. The loader calls this after bump_data_version, whose row
+    lock serializes loaders, so two batches can't both read a sketch and overwrite each
+    other's merge.
+
+    Args:
+        conn: SQLAlchemy connection inside a transaction.
+        rows (list): Mappings with the ROLLUP_COLUMNS of the written tweets, plus ``id`` and
+            an ``inserted`` flag for updates (rows without the flag are added).
+        previous_rows (list): Same columns of the updated tweets, as they were before the batch.
+
+    Returns:
+        int: Number of company-days written.
+    """
+    previous = {row['id']: row for row in previous_rows}
+    dirty = set()
+    for row in rows:
+        if row.get('inserted', True):
+            continue
+        before = previous.get(row['id'])
+        if before is None or _contribution(before) != _contribution(row):
+            dirty.add(_company_day(row))
+            if before is not None:
+                dirty.add(_company_day(before))
+
+    added = [row for row in rows if row.get('inserted', True) and _company_day(row) not in dirty]
+    return _add_to_daily_stats(conn, added) + _rebuild_company_days(conn, dirty)
+
+
+def _company_day(row):
+    return row['company'], pd.Timestamp(row['created_at']).date()
+
+
+def _contribution(row):
+    # What a tweet adds to the rollups of its company-day; a rescored tweet (e.g. ingested
+    # with scoring='all') changes the sentiment digest
+    return _company_day(row), row['user_username'], float(row['sentiment_score'])
+
+
+def _rebuild_company_days(conn, keys):
+    """Recompute the rollups of ``keys`` (company, day) from the `tweets` table."""
+    if not keys:
+        return 0
+    conn.execute(_table.delete().where(tuple_(_table.c.company, _table.c.day).in_(list(keys))))
+    rows = conn.execute(_company_days_query(keys)).mappings().all()
+    return _add_to_daily_stats(conn, rows)
+
+
+def _company_days_query(keys):
+    # One range per company-day on ix_tweets_company_created_at
+    tweets = Tweet.__table__
+    return select(*[tweets.c[name] for name in ROLLUP_COLUMNS]).where(or_(*[
+        and_(tweets.c.company == company, tweets.c.created_at >= day, tweets.c.created_at < day + timedelta(days=1))
+        for company, day in keys
+    ]))
+
+
+def _add_to_daily_stats(conn, rows):
+    """Merge ``rows`` (mappings with the ROLLUP_COLUMNS) into the stored rollups."""
+    if not rows:
+        return 0
+    df = pd.DataFrame.from_records([{name: row[name] for name in ROLLUP_COLUMNS} for row in rows])
+    df['day'] = pd.to_datetime(df['created_at']).dt.date
+    grouped = df.groupby(['company', 'day'], sort=False)
+    counts = grouped.size()
+    keys = list(counts.index)
+    group_numbers = grouped.ngroup().to_numpy()
+    registers = hll_registers(hash_values(df['user_username']), group_numbers, len(keys))
+    digests = build_tdigests(df['sentiment_score'].astype(float), group_numbers, len(keys))
+
+    stored = {
+        (row.company, row.day): row
+        for row in conn.execute(
+            select(_table.c.company, _table.c.day, _table.c.tweet_count, _table.c.author_sketch, _table.c.sentiment_digest)
+            .where(tuple_(_table.c.company, _table.c.day).in_(keys))
+            .with_for_update()
+        )
+    }
+    now = datetime.now()
+    records = []
+    for number, (company, day) in enumerate(keys):
+        authors = HyperLogLog(registers[number])
+        scores = digests[number]
+        tweet_count = int(counts.iloc[number])
+        previous = stored.get((company, day))
+        if previous is not None:
+            authors.merge(HyperLogLog.from_bytes(previous.author_sketch))
+            if previous.sentiment_digest is not None:
+                scores.merge(TDigest.from_bytes(previous.sentiment_digest))
+            tweet_count += previous.tweet_count
+        records.append({
+            'company': company,
+            'day': day,
+            'tweet_count': tweet_count,
+            'author_sketch': authors.to_bytes(),
+            'sentiment_digest': scores.to_bytes(),
+            'updated_at': now,
+        })
+
+    statement = insert(_table)
+    conn.execute(statement.on_conflict_do_update(
+        index_elements=['company', 'day'],
+        set_={name: statement.excluded[name] for name in ('tweet_count', 'author_sketch', 'sentiment_digest', 'updated_at')},
+    ), records)
+    return len(records)
+
+
+def rebuild_daily_stats(chunk_size=50000):
+    """
+    Recompute every rollup from the `tweets` table, e.g. after deploying them on existing data.
+
+    Loaders wait for the rebuild to commit before updating rollups, and then add their batch
+    on top; dashboards keep reading the previous rollups meanwhile. Commits the
+    DAILY_STATS_COMPLETE marker, after which tweet counts come from the rollups.
+
+    Returns:
+        dict: Number of ``tweets`` read and ``company_days`` written.
+    """
+    engine, _ = get_db_connection()
+    tweets = Tweet.__table__
+    stats = {'tweets': 0, 'company_days': 0}
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE company_daily_stats IN SHARE ROW EXCLUSIVE MODE"))
+        conn.execute(_table.delete())
+        result = conn.execute(
+            select(*[tweets.c[name] for name in ROLLUP_COLUMNS]).execution_options(yield_per=chunk_size)
+        )
+        for partition in result.mappings().partitions():
+            _add_to_daily_stats(conn, partition)
+            stats['tweets'] += len(partition)
+            print(f"Rolled up {stats['tweets']} tweets")
+        stats['company_days'] = conn.execute(select(func.count()).select_from(_table)).scalar()
+        bump_data_version(conn, DAILY_STATS_COMPLETE)
+    return stats
+
+
+def window_days(days):
+    """First and last day of the dashboard window of ``days`` days ending today."""
+    now = datetime.now()
+    return (now - timedelta(days=days)).date(), now.date()
+
+
+def load_daily_stats(conn, companies, start_day, end_day, columns=None):
+    """
+    Rollup rows of ``companies`` between ``start_day`` and ``end_day`` (inclusive), oldest first.
+
+    Args:
+        columns (list): `company_daily_stats` columns to read besides company and day (all when None).
+
+    Returns:
+        dict: ``{company: [row, ...]}``; companies without tweets in the window are left out.
+    """
+    names = [column.key for column in _table.columns] if columns is None else ['company', 'day', *columns]
+    rows = conn.execute(
+        select(*[_table.c[name] for name in dict.fromkeys(names)])
+        .where(_table.c.company.in_(companies), _table.c.day.between(start_day, end_day))
+        .order_by(_table.c.company, _table.c.day)
+    )
+    daily = {}
+    for row in rows:
+        daily.setdefault(row.company, []).append(row)
+    return daily
+
+
+def build_unique_authors(daily_rows):
+    """Distinct authors over the window and per day, from the merged HyperLogLog sketches."""
+    return {
+        'unique_authors': HyperLogLog.merged([row.author_sketch for row in daily_rows]).count(),
+        'tweet_count': sum(row.tweet_count for row in daily_rows),
+        'daily': [
+            {
+                'date': row.day.isoformat(),
+                'unique_authors': HyperLogLog.from_bytes(row.author_sketch).count(),
+                'tweet_count': row.tweet_count,
+            }
+            for row in daily_rows
+        ],
+    }
+
+
+def build_sentiment_percentiles(daily_rows):
+    """Sentiment score percentiles over the window, from the merged t-digests."""
+    scores = TDigest.merged([row.sentiment_digest for row in daily_rows])
+    values = scores.quantiles(np.array(SENTIMENT_PERCENTILES) / 100)
+    if values is None:
+        return {'count': 0, 'min': None, 'max': None, 'percentiles': {f'p{percentile}': None for percentile in SENTIMENT_PERCENTILES}}
+    return {
+        'count': scores.count(),
+        'min': round(float(scores.minimum), 3),
+        'max': round(float(scores.maximum), 3),
+        'percentiles': {f'p{percentile}': round(float(value), 3) for percentile, value in zip(SENTIMENT_PERCENTILES, values)},
+    }
+
+
+def build_sentiment_histogram(daily_rows):
+    """Estimated tweet counts per sentiment score bin over the window, from the merged t-digests."""
+    counts = TDigest.merged([row.sentiment_digest for row in daily_rows]).histogram(SENTIMENT_HISTOGRAM_EDGES)
+    return [
+        {'start': round(float(start), 2), 'end': round(float(end), 2), 'count': int(count)}
+        for start, end, count in zip(SENTIMENT_HISTOGRAM_EDGES[:-1], SENTIMENT_HISTOGRAM_EDGES[1:], counts)
+    ]
@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import Float, and_, cast, func, literal_column, or_, select
+
+from api.models import Tweet
+from api.logics.process_logics import format_tweet
+from api.logics.read_logics import InvalidQuery, parse_datetime
+
+# Text search configuration of the generated tweets.text_search column (see ADDED_COLUMNS)
+SEARCH_CONFIG = 'english'
+MAX_QUERY_LENGTH = 256
+SORTS = ('rank', 'recent')
+
+_table = Tweet.__table__
+# Not mapped on Tweet: the ETL and the loader never read it
+_document = literal_column('tweets.text_search')
+_columns = [column for column in _table.columns if column.key != 'content_hash']
+
+
+def _encode_cursor(sort, key, tweet_id):
+    payload = json.dumps([sort, key, tweet_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, sort):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, key, tweet_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if cursor_sort != sort:
+            raise ValueError
+        key = float(key) if sort == 'rank' else datetime.fromisoformat(key)
+        return key, str(tweet_id)
+    except (ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor")
+
+
+def parse_search(params):
+    """
+    Keyword arguments of search_tweets from the query parameters of the search endpoint.
+
+    ``q`` is required; ``company`` may be repeated, ``sentiment`` is comma-separated,
+    ``since`` / ``until`` take ISO dates (``until`` exclusive) and ``sort`` is rank or recent.
+    """
+    q = (params.get('q') or '').strip()
+    if not q:
+        raise InvalidQuery("Pass a search query in ?q=")
+    if len(q) > MAX_QUERY_LENGTH:
+        raise InvalidQuery(f"q must be at most {MAX_QUERY_LENGTH} characters")
+
+    sort = params.get('sort') or 'rank'
+    if sort not in SORTS:
+        raise InvalidQuery(f"sort must be one of: {', '.join(SORTS)}")
+
+    search = {
+        'q': q,
+        'sort': sort,
+        'companies': [name.strip() for name in params.getlist('company') if name.strip()] or None,
+        'sentiments': [label.strip() for label in params.get('sentiment', '').split(',') if label.strip()] or None,
+        'since': parse_datetime('since', params['since']) if params.get('since') else None,
+        'until': parse_datetime('until', params['until']) if params.get('until') else None,
+        'cursor': params.get('cursor') or None,
+    }
+    if search['cursor']:
+        _decode_cursor(search['cursor'], sort)
+    return search
+
+
+def search_query(q, companies=None, since=None, until=None, sentiments=None, sort='rank', limit=20, cursor=None):
+    """
+    Select for one page of tweets matching the full-text query ``q``.
+
+    ``q`` uses web search syntax ("quoted phrases", ``or``, ``-excluded``). Matches come
+    from the GIN index on tweets.text_search and the filters are applied in the same query.
+    Pages are keyset-paginated on (rank, id) or (created_at, id), so deep pages cost the same
+    as the first one.
+    """
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    # Doubles survive the round trip through the cursor exactly; ts_rank_cd's real doesn't
+    rank = cast(func.ts_rank_cd(_document, tsquery), Float)
+
+    query = select(*_columns, rank.label('rank')).where(_document.op('@@')(tsquery))
+    if companies:
+        query = query.where(_table.c.company.in_(companies))
+    if sentiments:
+        query = query.where(_table.c.sentiment_label.in_(sentiments))
+    if since:
+        query = query.where(_table.c.created_at >= since)
+    if until:
+        query = query.where(_table.c.created_at < until)
+
+    sort_key = rank if sort == 'rank' else _table.c.created_at
+    if cursor:
+        key, tweet_id = _decode_cursor(cursor, sort)
+        query = query.where(or_(sort_key < key, and_(sort_key == key, _table.c.id > tweet_id)))
+    # One extra row tells whether there is a next page
+    return query.order_by(sort_key.desc(), _table.c.id).limit(limit + 1)
+
+
+def search_tweets(conn, q, limit=20, **filters):
+    """
+    One page of ranked full-text search results.
+
+    Args:
+        conn: SQLAlchemy connection or session.
+        q (str): Search query in web search syntax.
+        limit (int): Page size.
+        **filters: ``companies``, ``since``, ``until``, ``sentiments``, ``sort`` and ``cursor``,
+            see parse_search.
+
+    Returns:
+        tuple: ``(results, next_cursor)``; results are formatted like the top tweets of the
+            dashboard plus ``company`` and ``rank``, next_cursor is None on the last page.
+    """
+    sort = filters.get('sort') or 'rank'
+    rows = conn.execute(search_query(q, limit=limit, **filters)).mappings().all()
+
+    results = [{**format_tweet(row), 'company': row['company'], 'rank': row['rank']} for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        key = last['rank'] if sort == 'rank' else last['created_at'].isoformat()
+        next_cursor = _encode_cursor(sort, key, last['id'])
+    return results, next_cursor
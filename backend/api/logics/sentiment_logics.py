@@ -0,0 +1,224 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from api.logics.sketch_logics import hash_values
+
+# Valence of opinion words, from -3 (very negative) to 3 (very positive), for tweets about products
+LEXICON = {
+    # Positive
+    'love': 3, 'loved': 3, 'loving': 3, 'loves': 3, 'amazing': 3, 'awesome': 3, 'best': 3, 'excellent': 3,
+    'fantastic': 3, 'incredible': 3, 'outstanding': 3, 'perfect': 3, 'brilliant': 3, 'superb': 3, 'wonderful': 3,
+    'great': 2.5, 'impressed': 2.5, 'impressive': 2.5, 'beautiful': 2.5, 'beautifully': 2.5, 'exceeded': 2,
+    'good': 2, 'happy': 2, 'glad': 2, 'enjoy': 2, 'enjoying': 2, 'recommended': 2, 'solid': 2,
+    'reliable': 2, 'seamless': 2, 'smooth': 2, 'fast': 1.5, 'easy': 1.5, 'improved': 1.5, 'improvement': 1.5,
+    'improves': 1.5, 'nice': 1.5, 'cool': 1.5, 'worth': 1.5, 'favorite': 2, 'favourite': 2, 'like': 1, 'likes': 1,
+    'thanks': 1.5, 'thank': 1.5, 'win': 2, 'wins': 2, 'winning': 2, 'innovative': 2, 'transformed': 1.5,
+    'leading': 1, 'fixed': 1, 'works': 1, 'working': 1, 'value': 1, 'saving': 1, 'helpful': 2, 'wow': 2,
+    'mind-blowing': 3, 'top': 1, 'notch': 1, 'changer': 1.5, 'stunning': 3, 'delighted': 3, 'pleased': 2,
+    'industry-leading': 2.5, 'fun': 2, 'excited': 2.5, 'exciting': 2.5, 'recommend': 2,
+    # Negative
+    'terrible': -3, 'awful': -3, 'horrible': -3, 'worst': -3, 'hate': -3, 'hated': -3, 'hates': -3, 'useless': -3,
+    'scam': -3, 'broken': -2.5, 'broke': -2.5, 'disappointed': -2.5, 'disappointing': -2.5, 'ridiculous': -2.5,
+    'frustrating': -2.5, 'frustrated': -2.5, 'unhelpful': -2, 'bad': -2.5, 'poor': -2, 'crash': -2, 'crashes': -2,
+    'crashing': -2, 'crashed': -2, 'bug': -1.5, 'bugs': -1.5, 'buggy': -2, 'annoying': -2, 'annoyed': -2,
+    'overpriced': -2, 'expensive': -1.5, 'slow': -1.5, 'fail': -2, 'fails': -2, 'failed': -2, 'failure': -2,
+    'issue': -1, 'issues': -1, 'problem': -1.5, 'problems': -1.5, 'waste': -2.5, 'delay': -1.5, 'delays': -1.5,
+    'delayed': -1.5, 'outage': -2, 'outages': -2, 'worse': -2, 'angry': -2.5, 'sad': -2, 'unacceptable': -3,
+    'concerns': -1, 'concern': -1, 'anxiety': -1.5, 'forced': -1, 'waiting': -0.5, 'refund': -1, 'avoid': -2,
+    'lag': -1.5, 'laggy': -2, 'glitch': -1.5, 'glitches': -1.5, 'sucks': -3, 'ugh': -2, 'meh': -1,
+    'disengaged': -1.5, 'gaps': -1, 'unexpectedly': -0.5, 'unreliable': -2.5, 'regret': -2.5, 'ruined': -3,
+}
+
+# Words flipping the valence of the two words after them
+NEGATIONS = frozenset([
+    'not', 'no', 'never', 'nothing', 'nobody', 'neither', 'nor', 'without', "don't", "doesn't", "didn't",
+    "isn't", "wasn't", "aren't", "weren't", "won't", "wouldn't", "can't", "cannot", "couldn't", "shouldn't",
+    'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'wont', 'wouldnt', 'cant', 'couldnt',
+])
+
+# Multipliers applied to the word right after them
+INTENSIFIERS = {
+    'very': 1.3, 'really': 1.3, 'so': 1.3, 'too': 1.2, 'extremely': 1.5, 'super': 1.3, 'totally': 1.3,
+    'absolutely': 1.5, 'incredibly': 1.5, 'truly': 1.2, 'still': 1.1, 'slightly': 0.7, 'somewhat': 0.7, 'kinda': 0.7,
+}
+
+TOKEN_PATTERN = r"[a-z][a-z'\-]*"
+
+# Compound scores within this distance of 0 are neutral
+NEUTRAL_THRESHOLD = 0.05
+
+
+def score_texts(texts):
+    """
+    Lexicon sentiment of many texts, computed for the whole batch with array operations.
+
+    Words are looked up in LEXICON; a negation in the two previous words flips a word's
+    valence and an intensifier right before it scales it. A text's valence sum ``s`` is
+    squashed to a compound ``s / sqrt(s**2 + 15)`` in (-1, 1), as VADER does.
+
+    Args:
+        texts (array): Tweet texts; missing ones score as neutral.
+
+    Returns:
+        tuple: ``(scores, labels, confidences)`` arrays; scores are 0-1 like the mocked data
+            (0.5 is neutral) and confidence grows with the strength of the compound.
+    """
+    texts = pd.Series(np.asarray(texts, dtype=object)).fillna('')
+    tokens = texts.str.lower().str.replace('’', "'", regex=False).str.findall(TOKEN_PATTERN).explode().dropna()
+    rows = tokens.index.to_numpy()
+    words = tokens.to_numpy()
+
+    valence = tokens.map(LEXICON).fillna(0).to_numpy(dtype=float)
+    negation = tokens.isin(NEGATIONS).to_numpy()
+    intensity = tokens.map(INTENSIFIERS).fillna(1.0).to_numpy(dtype=float)
+
+    # Look back one and two words, never across texts
+    flip = np.zeros(len(words), dtype=bool)
+    for distance in (1, 2):
+        same_text = np.r_[np.zeros(min(distance, len(words)), dtype=bool), rows[distance:] == rows[:-distance]]
+        flip ^= same_text & np.r_[np.zeros(min(distance, len(words)), dtype=bool), negation[:-distance]]
+        if distance == 1:
+            valence = valence * np.where(same_text, np.r_[1.0, intensity[:-1]][:len(words)], 1.0)
+    valence = np.where(flip, -0.75 * valence, valence)
+
+    sums = np.bincount(rows, weights=valence, minlength=len(texts)) if len(words) else np.zeros(len(texts))
+    compound = sums / np.sqrt(sums * sums + 15)
+    scores = np.round((compound + 1) / 2, 3)
+    labels = np.where(compound >= NEUTRAL_THRESHOLD, 'positive', np.where(compound <= -NEUTRAL_THRESHOLD, 'negative', 'neutral'))
+    confidences = np.round(0.5 + np.abs(compound) / 2, 3)
+    return scores, labels.astype(object), confidences
+
+
+class SentimentScorer:
+    """
+    Scores tweet texts with score_texts, remembering results by text hash.
+
+    Identical texts (retweets, copy-pasted campaigns, re-ingested files) are scored once:
+    a batch is deduplicated by hash, then looked up in a cache of up to ``cache_size``
+    texts. What's left is split into ``chunk_size`` chunks scored across ``workers``
+    processes, or inline when it fits in one chunk.
+    """
+
+    def __init__(self, workers, chunk_size, cache_size):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self.texts = 0
+        self.scored = 0
+        self.cache_hits = 0
+        self.seconds = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Spawned rather than forked: the parent holds database pools and threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _score_unique(self, texts):
+        if self.workers > 1 and len(texts) > self.chunk_size:
+            chunks = np.array_split(texts, -(-len(texts) // self.chunk_size))
+            parts = list(self._get_pool().map(score_texts, chunks))
+            return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+        return score_texts(texts)
+
+    def score(self, texts):
+        """
+        Args:
+            texts (Series): Tweet texts.
+
+        Returns:
+            DataFrame: ``sentiment_score``, ``sentiment_label`` and ``sentiment_confidence``
+                with the index of ``texts``.
+        """
+        started = time.perf_counter()
+        values = texts.fillna('').astype(str).to_numpy(dtype=object)
+        unique_hashes, first, inverse = np.unique(hash_values(values), return_index=True, return_inverse=True)
+
+        with self._lock:
+            cached = [self._cache.get(key) for key in unique_hashes.tolist()]
+        missing = np.array([result is None for result in cached], dtype=bool)
+        scores = np.array([result[0] if result else np.nan for result in cached], dtype=float)
+        labels = np.array([result[1] if result else None for result in cached], dtype=object)
+        confidences = np.array([result[2] if result else np.nan for result in cached], dtype=float)
+
+        if missing.any():
+            scores[missing], labels[missing], confidences[missing] = self._score_unique(values[first[missing]])
+            with self._lock:
+                self._cache.update(zip(
+                    unique_hashes[missing].tolist(),
+                    zip(scores[missing].tolist(), labels[missing].tolist(), confidences[missing].tolist()),
+                ))
+                # Oldest entries go first; dicts keep insertion order
+                excess = len(self._cache) - self.cache_size
+                if excess > 0:
+                    for key in list(islice(self._cache, excess)):
+                        del self._cache[key]
+
+        seconds = time.perf_counter() - started
+        scored = int(missing.sum())
+        with self._lock:
+            self.texts += len(values)
+            self.scored += scored
+            self.cache_hits += len(values) - scored
+            self.seconds += seconds
+        print(f"Scored {len(values)} tweets in {seconds:.3f}s ({len(values) / seconds if seconds else 0:.0f} tweets/sec, "
+              f"{len(values) - scored} from cache)")
+        return pd.DataFrame({
+            'sentiment_score': scores[inverse],
+            'sentiment_label': labels[inverse],
+            'sentiment_confidence': confidences[inverse],
+        }, index=texts.index)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'texts': self.texts,
+                'scored': self.scored,
+                'cache_hits': self.cache_hits,
+                'cache_size': len(self._cache),
+                'workers': self.workers,
+                'tweets_per_second': round(self.texts / self.seconds, 1) if self.seconds else None,
+            }
+
+    def reset_after_fork(self):
+        # The parent's worker processes and their pipes belong to the parent
+        self._pool = None
+        self._lock = threading.Lock()
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer():
+    """Process-wide scorer, created on first use; its worker processes start with the first large batch."""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = SentimentScorer(settings.SENTIMENT_WORKERS, settings.SENTIMENT_CHUNK_SIZE, settings.SENTIMENT_CACHE_SIZE)
+        return _scorer
+
+
+def sentiment_scorer_stats():
+    """Statistics of the scorer (no IO); None when this process hasn't scored anything."""
+    return None if _scorer is None else _scorer.stats()
+
+
+def _reset_after_fork():
+    if _scorer is not None:
+        _scorer.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays per process
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time within the process; concurrent callers with the same
+    key wait for it and share its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['leaders'] += 1
+            else:
+                self.stats['followers'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class FileLease:
+    """
+    Exclusive flock on a file shared by the processes of this host.
+
+    The kernel drops the lock when its holder dies, so a crashed worker never blocks the
+    others. Waiting gives up after ``timeout`` seconds; the caller then runs unlocked.
+
+    The holder unlinks the file before unlocking it, so lock files don't pile up. A waiter
+    that then gets the lock on the unlinked file notices the path no longer leads to it and
+    starts over on a new file, so two holders never run at the same time.
+    """
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self.acquired = False
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return self
+                time.sleep(0.05)
+                continue
+            if self._is_current():
+                self.acquired = True
+                return self
+            # Locked a file its previous holder already unlinked
+            self._file.close()
+            self._file = None
+
+    def _is_current(self):
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            if self.acquired:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+
+
+_flight = SingleFlight()
+_process_stats = {'computed': 0, 'shared_across_processes': 0}
+
+
+def _paths(key):
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    directory = settings.SINGLE_FLIGHT_DIR
+    return os.path.join(directory, f"{digest}.lock"), os.path.join(directory, f"{digest}.result")
+
+
+def _remove_stale_results(directory, max_age):
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if name.endswith('.result'):
+                os.remove(path)
+            elif name.endswith('.lock'):
+                # Left by a worker that died holding it (or by older versions); only removed
+                # by taking the lease, since removing a held one would let a second holder in
+                with FileLease(path, timeout=0):
+                    pass
+        except OSError:
+            pass
+
+
+def _run_with_lease(key, fn):
+    os.makedirs(settings.SINGLE_FLIGHT_DIR, exist_ok=True)
+    lock_path, result_path = _paths(key)
+    waiting_since = time.time()
+
+    with FileLease(lock_path, settings.SINGLE_FLIGHT_TIMEOUT):
+        # Another process finished the same computation while this one waited for the lease
+        try:
+            if os.path.getmtime(result_path) >= waiting_since:
+                with open(result_path) as f:
+                    _process_stats['shared_across_processes'] += 1
+                    return f.read()
+        except OSError:
+            pass
+
+        result = fn()
+        _process_stats['computed'] += 1
+        temp_path = f"{result_path}.{os.getpid()}.{threading.get_ident()}"
+        with open(temp_path, 'w') as f:
+            f.write(result)
+        os.replace(temp_path, result_path)
+
+    _remove_stale_results(settings.SINGLE_FLIGHT_DIR, max(settings.SINGLE_FLIGHT_TIMEOUT, 60))
+    return result
+
+
+def coalesce(key, fn):
+    """
+    Share one run of ``fn`` among concurrent identical requests.
+
+    Threads of this process with the same key wait for the running call. Other processes on
+    the host queue behind a file lease and reuse the result the holder wrote, as long as it was
+    written after they started waiting. Keys must identify the result completely (include the
+    data version), because a follower never checks what the leader computed.
+
+    Args:
+        key (str): Identity of the computation.
+        fn (callable): Computation returning a ``str`` (the result is shared through a file).
+
+    Returns:
+        str: The result of ``fn``, computed here or by the call that was already running.
+    """
+    return _flight.do(key, lambda: _run_with_lease(key, fn))
+
+
+def single_flight_stats():
+    return {**_flight.stats, **_process_stats}
+
+
+class ClientConcurrencyLimiter:
+    """Caps the requests one client can have running at the same time in this process."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._active = defaultdict(int)
+        self.rejected = 0
+
+    def acquire(self, client):
+        with self._lock:
+            if self._active[client] >= self.limit:
+                self.rejected += 1
+                return False
+            self._active[client] += 1
+            return True
+
+    def release(self, client):
+        with self._lock:
+            self._active[client] -= 1
+            if self._active[client] <= 0:
+                del self._active[client]
@@ -0,0 +1,255 @@
+import hashlib
+import math
+
+import numpy as np
+import pandas as pd
+
+# 2**12 one-byte registers (4 KB per sketch): about 1.6% standard error
+HLL_PRECISION = 12
+
+
+def hash_values(values):
+    """
+    64-bit hashes of ``values``, identical in every process, run and library version.
+
+    Stored sketches are merged with sketches built later, so the hash is BLAKE2b of the
+    value's text rather than pandas' hashing, which may change between releases. Each
+    distinct value is hashed once.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big') for value in uniques),
+        dtype=np.uint64, count=len(uniques),
+    )
+    return hashes[codes]
+
+
+def _leading_zeros(words):
+    # Binary search on the high bits, for a whole uint64 array at once
+    words = words.copy()
+    zeros = np.zeros(len(words), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (words >> np.uint64(64 - shift)) == 0
+        zeros[empty] += shift
+        words[empty] <<= np.uint64(shift)
+    zeros[words == 0] = 64
+    return zeros
+
+
+def hll_registers(hashes, groups=None, group_count=1, precision=HLL_PRECISION):
+    """
+    HyperLogLog registers of several sketches, built in one vectorized pass.
+
+    Args:
+        hashes (ndarray): uint64 hashes from hash_values.
+        groups (ndarray): Sketch number of each hash (all in sketch 0 when None).
+        group_count (int): Number of sketches.
+        precision (int): log2 of the number of registers.
+
+    Returns:
+        ndarray: ``(group_count, 2**precision)`` uint8 registers.
+    """
+    size = 1 << precision
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    # Position of the first set bit after the index bits, 1-based
+    rank = np.minimum(_leading_zeros(hashes << np.uint64(precision)) + 1, 64 - precision + 1).astype(np.uint8)
+    if groups is not None:
+        index += np.asarray(groups, dtype=np.int64) * size
+    registers = np.zeros(group_count * size, dtype=np.uint8)
+    np.maximum.at(registers, index, rank)
+    return registers.reshape(group_count, size)
+
+
+class HyperLogLog:
+    """
+    Mergeable estimate of the number of distinct values seen.
+
+    Sketches of disjoint periods merge into the sketch of the whole period by taking the
+    register-wise maximum, which is why the rollups store sketches rather than counts.
+    """
+
+    def __init__(self, registers=None, precision=HLL_PRECISION):
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+        self.precision = int(math.log2(len(self.registers)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(np.frombuffer(data, dtype=np.uint8).copy())
+
+    @classmethod
+    def merged(cls, sketches):
+        """One sketch counting every value of ``sketches`` (bytes or HyperLogLog)."""
+        registers = [
+            np.frombuffer(sketch, dtype=np.uint8) if isinstance(sketch, (bytes, memoryview)) else sketch.registers
+            for sketch in sketches
+        ]
+        if not registers:
+            return cls()
+        return cls(np.max(np.vstack(registers), axis=0))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    def update(self, values):
+        self.merge(HyperLogLog(hll_registers(hash_values(values), precision=self.precision)[0]))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge sketches of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * size and empty:
+            estimate = size * math.log(size / empty)
+        return int(round(estimate))
+
+
+# Centroids of a t-digest: about compression / 2, denser towards the tails
+TDIGEST_COMPRESSION = 100
+
+
+def _compress(means, weights, groups, compression):
+    # Input is sorted by (group, mean). Each cluster covers at most one unit of the k1 scale
+    # k(q) = compression / 2pi * asin(2q - 1), so clusters stay small near q = 0 and q = 1
+    totals = np.bincount(groups, weights=weights)
+    cumulative = np.cumsum(weights)
+    group_starts = np.searchsorted(groups, groups, side='left')
+    before_group = np.where(group_starts > 0, cumulative[group_starts - 1], 0.0)
+    q_left = (cumulative - weights - before_group) / totals[groups]
+    bins = np.floor(compression / (2 * np.pi) * np.arcsin(2 * np.clip(q_left, 0, 1) - 1))
+
+    starts = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]) | (bins[1:] != bins[:-1])])
+    cluster_weights = np.add.reduceat(weights, starts)
+    cluster_means = np.add.reduceat(means * weights, starts) / cluster_weights
+    return cluster_means, cluster_weights, groups[starts]
+
+
+def build_tdigests(values, groups=None, group_count=1, compression=TDIGEST_COMPRESSION):
+    """
+    One TDigest per group, built in one vectorized pass.
+
+    Args:
+        values (array): Numbers to summarize; NaNs are skipped.
+        groups (array): Digest number of each value (all in digest 0 when None).
+        group_count (int): Number of digests.
+
+    Returns:
+        list: ``group_count`` TDigests.
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.zeros(len(values), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    present = ~np.isnan(values)
+    values, groups = values[present], groups[present]
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+    if len(values):
+        means, weights, cluster_groups = _compress(values, np.ones(len(values)), groups, compression)
+    else:
+        means = weights = cluster_groups = np.empty(0)
+
+    cluster_bounds = np.searchsorted(cluster_groups, np.arange(group_count + 1))
+    value_bounds = np.searchsorted(groups, np.arange(group_count + 1))
+    digests = []
+    for group in range(group_count):
+        first, last = cluster_bounds[group], cluster_bounds[group + 1]
+        low, high = value_bounds[group], value_bounds[group + 1]
+        digests.append(TDigest(
+            means[first:last], weights[first:last],
+            values[low] if high > low else np.nan, values[high - 1] if high > low else np.nan,
+            compression,
+        ))
+    return digests
+
+
+class TDigest:
+    """
+    Mergeable approximation of a distribution, accurate to fractions of a percent near the tails.
+
+    Weighted centroids sorted by mean, plus the exact minimum and maximum. Digests of
+    disjoint periods merge into the digest of the whole period.
+    """
+
+    def __init__(self, means=None, weights=None, minimum=np.nan, maximum=np.nan, compression=TDIGEST_COMPRESSION):
+        self.means = np.empty(0) if means is None else np.asarray(means, dtype=float)
+        self.weights = np.empty(0) if weights is None else np.asarray(weights, dtype=float)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=TDIGEST_COMPRESSION):
+        return build_tdigests(values, compression=compression)[0]
+
+    @classmethod
+    def from_bytes(cls, data):
+        # Layout: minimum, maximum, then the means and the weights of the centroids
+        array = np.frombuffer(data, dtype='<f8')
+        size = (len(array) - 2) // 2
+        return cls(array[2:2 + size].copy(), array[2 + size:].copy(), array[0], array[1])
+
+    @classmethod
+    def merged(cls, digests):
+        """One digest of every value summarized by ``digests`` (bytes or TDigest; None is skipped)."""
+        digests = [
+            cls.from_bytes(digest) if isinstance(digest, (bytes, memoryview)) else digest
+            for digest in digests if digest is not None
+        ]
+        # All centroids are compressed together, in a single pass
+        return cls().merge(cls(
+            np.concatenate([digest.means for digest in digests] or [np.empty(0)]),
+            np.concatenate([digest.weights for digest in digests] or [np.empty(0)]),
+            np.fmin.reduce([digest.minimum for digest in digests] or [np.nan]),
+            np.fmax.reduce([digest.maximum for digest in digests] or [np.nan]),
+        ))
+
+    def to_bytes(self):
+        return np.concatenate([[self.minimum, self.maximum], self.means, self.weights]).astype('<f8').tobytes()
+
+    def count(self):
+        return int(round(self.weights.sum()))
+
+    def merge(self, other):
+        if not len(other.means):
+            return self
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        order = np.argsort(means, kind='stable')
+        self.means, self.weights, _ = _compress(
+            means[order], weights[order], np.zeros(len(means), dtype=np.int64), self.compression
+        )
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        return self
+
+    def _points(self):
+        # Each centroid's mean sits at the middle of its weight; the extremes at 0 and the total
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return np.r_[self.minimum, self.means, self.maximum], np.r_[0.0, centers, total], total
+
+    def quantiles(self, qs):
+        """Estimated values at the fractions ``qs``; None for an empty digest."""
+        if not len(self.means):
+            return None
+        values, ranks, total = self._points()
+        return np.interp(np.asarray(qs, dtype=float) * total, ranks, values)
+
+    def cdf(self, xs):
+        """Estimated fraction of the values at or below each of ``xs``; None for an empty digest."""
+        if not len(self.means):
+            return None
+        values, ranks, total = self._points()
+        return np.interp(np.asarray(xs, dtype=float), values, ranks) / total
+
+    def histogram(self, edges):
+        """Estimated number of values between consecutive ``edges``, summing to the count inside them."""
+        if not len(self.means):
+            return np.zeros(len(edges) - 1, dtype=np.int64)
+        return np.diff(np.round(self.cdf(edges) * self.weights.sum())).astype(np.int64)
@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from django.conf import settings
+
+# Imported on first use only; a cold start that loads them has regressed
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'api.logics.data_mocking_logics']
+
+_CHILD = """
+import json, os, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+__import__(sys.argv[1])
+finished = time.perf_counter()
+print(json.dumps({
+    'setup_seconds': round(setup_done - started, 4),
+    'import_seconds': round(finished - setup_done, 4),
+    'total_seconds': round(finished - started, 4),
+    'heavy_modules': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def _parse_importtime(stderr):
+    # Lines look like "import time:  self [us] | cumulative | <2 spaces per nesting level>name"
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append({
+            'module': name.strip(),
+            'top_level': not name[1:].startswith(' '),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return imports
+
+
+def measure_cold_start(module=None):
+    """
+    Boot Django in a fresh interpreter and time it like a worker's cold start.
+
+    The child runs ``django.setup()`` and then imports ``module`` (the URLconf by default,
+    which pulls in every view), under ``python -X importtime``.
+
+    Args:
+        module (str): Module imported after setup.
+
+    Returns:
+        dict: ``setup_seconds``, ``import_seconds``, ``total_seconds``, the HEAVY_MODULES that
+            got loaded, and ``imports``: top-level imports, slowest first.
+    """
+    module = module or settings.ROOT_URLCONF
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD, module, json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup failed: {completed.stderr.strip().splitlines()[-1]}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = [entry for entry in _parse_importtime(completed.stderr) if entry['top_level']]
+    result['imports'] = sorted(imports, key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return result
+
+
+def _warm_company_index():
+    from api.logics.company_logics import get_company_index
+
+    get_company_index()
+
+
+def _warm_hot_tier():
+    # Starts the thread that loads the window, so the first dashboard after a restart doesn't
+    if settings.HOT_TIER_ENABLED:
+        from api.logics.hot_tier_logics import get_hot_tier
+
+        get_hot_tier()
+
+
+# Run once in the background by every server process (see start_background_work)
+STARTUP_TASKS = [_warm_company_index, _warm_hot_tier]
+
+
+def _run_startup_tasks():
+    for task in STARTUP_TASKS:
+        try:
+            task()
+        except Exception as e:
+            print(f"Startup task {task.__name__} failed: {str(e)}")
+
+
+def start_background_work():
+    """
+    Run STARTUP_TASKS on a daemon thread; called by the WSGI and ASGI entry points.
+
+    The thread keeps the worker's boot off the database, and management commands and tests,
+    which don't go through the entry points, don't run the tasks at all.
+    """
+    thread = threading.Thread(target=_run_startup_tasks, name='startup-tasks', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,108 @@
+import hashlib
+from datetime import date, datetime, time
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import ProgrammingError
+
+from api.models import DataVersion
+
+# Dataset names in `data_versions`
+TWEETS = 'tweets'
+# Bumped by a trigger on the table, see models.SOCIAL_MEDIA_DATA_VERSION_TRIGGER
+SOCIAL_MEDIA_DATA = 'social_media_data'
+
+
+def bump_data_version(conn, name):
+    """
+    Increment the version of ``name`` inside the caller's transaction.
+
+    Readers only see the new version once the data written with it is committed, so a
+    validator built from an old version can never be attached to newer data.
+
+    Returns:
+        int: The new version.
+    """
+    return conn.execute(text("""
+        INSERT INTO data_versions (name, version, updated_at) VALUES (:name, 1, :now)
+        ON CONFLICT (name) DO UPDATE SET
+            version = data_versions.version + 1,
+            updated_at = EXCLUDED.updated_at
+        RETURNING version
+    """), {'name': name, 'now': datetime.now()}).scalar_one()
+
+
+def data_version_query(name):
+    return select(DataVersion.version, DataVersion.updated_at).where(DataVersion.name == name)
+
+
+def get_data_version(conn, name):
+    """Returns ``(version, updated_at)``; ``(0, None)`` for a dataset that was never written."""
+    row = conn.execute(data_version_query(name)).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def make_etag(*parts, weak=False):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'{"W/" if weak else ""}"{digest}"'
+
+
+def social_media_validator_query():
+    """
+    The social_media_data version: a primary-key lookup, however many rows a filter matches.
+
+    Every write to the table changes it, so it also invalidates filters whose rows didn't change.
+    """
+    return data_version_query(SOCIAL_MEDIA_DATA)
+
+
+def _undefined_table(error):
+    # SQLSTATE 42P01; psycopg2 calls it pgcode, the asyncpg adapter sqlstate
+    return '42P01' in (getattr(error.orig, 'pgcode', None), getattr(error.orig, 'sqlstate', None))
+
+
+def read_social_media_version(conn):
+    """
+    Row of social_media_validator_query; None while data_versions doesn't exist yet.
+
+    A social_media_data table created outside the app may predate data_versions, which
+    create_tables adds together with the trigger. ``conn`` is a Connection or Session.
+    """
+    try:
+        return conn.execute(social_media_validator_query()).first()
+    except ProgrammingError as e:
+        if not _undefined_table(e):
+            raise
+        conn.rollback()
+        return None
+
+
+async def async_read_social_media_version(conn):
+    """read_social_media_version for an AsyncConnection."""
+    try:
+        return (await conn.execute(social_media_validator_query())).first()
+    except ProgrammingError as e:
+        if not _undefined_table(e):
+            raise
+        await conn.rollback()
+        return None
+
+
+def social_media_validator(row, conditions=()):
+    """``(etag, last_modified)`` for the rows matching ``conditions``, from social_media_validator_query's row."""
+    version, updated_at = row or (0, None)
+    compiled = [condition.compile() for condition in conditions]
+    filter_key = [(str(condition), sorted(condition.params.items())) for condition in compiled]
+    return make_etag(SOCIAL_MEDIA_DATA, version, filter_key), updated_at
+
+
+def etl_validator(conn, days):
+    """
+    ``(etag, last_modified)`` for the ETL output over the last ``days`` days.
+
+    The ETL window slides with the clock, so the validator also rolls over daily. Tweets
+    that age out of the window during the day don't change it, which is why the ETag is weak.
+    """
+    version, updated_at = get_data_version(conn, TWEETS)
+    today = datetime.combine(date.today(), time.min)
+    last_modified = max(updated_at, today) if updated_at else today
+    return make_etag('etl', version, days, today.date(), weak=True), last_modified
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.logics.ingest_logics import ingest_file, SUPPORTED_FORMATS, SCORING_MODES
+
+
+class Command(BaseCommand):
+    help = "Stream a JSONL, CSV or Parquet tweet export into the tweets table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to ingest")
+        parser.add_argument('--format', choices=SUPPORTED_FORMATS, default=None, help="Detected from the extension by default")
+        parser.add_argument('--batch-size', type=int, default=settings.INGEST_BATCH_SIZE, help="Rows validated and loaded at a time")
+        parser.add_argument('--reject-file', default=None, help="Where malformed rows are written (default: <path>.rejects.jsonl)")
+        parser.add_argument('--scoring', choices=SCORING_MODES, default=None,
+                            help="Which rows the lexicon sentiment scorer fills in (default: INGEST_SENTIMENT_SCORING)")
+
+    def handle(self, *args, **options):
+        try:
+            stats = ingest_file(
+                options['path'],
+                fmt=options['format'],
+                batch_size=options['batch_size'],
+                reject_path=options['reject_file'],
+                scoring=options['scoring'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {stats['rows_loaded']} of {stats['rows_read']} rows in {stats['seconds']}s "
+            f"({stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged)"
+        ))
+        if stats['rows_scored']:
+            self.stdout.write(
+                f"Scored the sentiment of {stats['rows_scored']} rows ({stats['scored_per_second']} tweets/sec)"
+            )
+        if stats['reject_path']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['rows_rejected']} rows rejected, see {stats['reject_path']}"
+            ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.logics.startup_logics import measure_cold_start
+
+
+class Command(BaseCommand):
+    help = "Time a worker cold start (django.setup() plus the URLconf) and list the slowest imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default=None, help="Module imported after setup (default: ROOT_URLCONF)")
+        parser.add_argument('--limit', type=int, default=15, help="Number of top-level imports to list")
+
+    def handle(self, *args, **options):
+        try:
+            result = measure_cold_start(options['module'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"Cold start: {result['total_seconds']:.3f}s "
+            f"(django.setup {result['setup_seconds']:.3f}s, imports {result['import_seconds']:.3f}s)"
+        )
+        for entry in result['imports'][:options['limit']]:
+            self.stdout.write(f"{entry['cumulative_ms']:10.1f} ms  {entry['module']}")
+
+        if result['heavy_modules']:
+            self.stdout.write(self.style.WARNING(
+                f"Loaded at startup although only needed on first use: {', '.join(result['heavy_modules'])}"
+            ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.logics.rollup_logics import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per company and day rollups (company_daily_stats) from the tweets table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50000, help="Tweets read per round trip")
+
+    def handle(self, *args, **options):
+        stats = rebuild_daily_stats(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {stats['tweets']} tweets into {stats['company_days']} company-days"
+        ))
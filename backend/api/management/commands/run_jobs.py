@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.logics.job_logics import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run the queued background jobs (mock data, ETL, ingest) until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Jobs run at once (default: JOB_WORKERS)")
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help="Seconds between looks for queued jobs when idle (default: JOB_POLL_SECONDS)"
+        )
+
+    def handle(self, *args, **options):
+        run_worker(workers=options['workers'], poll_interval=options['poll_interval'])
@@ -0,0 +1,64 @@
+from argparse import ArgumentTypeError
+
+from django.core.management.base import BaseCommand
+
+from api.logics.live_feed_logics import run_live_feed
+
+
+def positive_float(value):
+    # Tweets are spaced by expovariate(rate), which needs a rate above zero
+    number = float(value)
+    if not number > 0:
+        raise ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream mocked tweets into the database at a sustained rate and report ingest throughput and latency. "
+        "Latency runs from emitting a tweet until a direct query on the tweets table sees it; it doesn't go "
+        "through the HTTP API, so response caches and serialization are not part of it"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=positive_float, default=50.0, help="Base tweets per second")
+        parser.add_argument('--duration', type=float, default=None, help="Seconds to run (default: until interrupted)")
+        parser.add_argument('--batch-size', type=positive_int, default=200, help="Maximum tweets per database write")
+        parser.add_argument('--flush-interval', type=float, default=1.0, help="Maximum seconds a partial batch waits")
+        parser.add_argument('--queue-size', type=int, default=5000, help="Tweets buffered before the producer is throttled")
+        parser.add_argument('--seasonality', type=float, default=0.5, help="Daily rate swing, 0 for a flat rate")
+        parser.add_argument('--peak-hour', type=float, default=14, help="Hour of the day with the highest rate")
+        parser.add_argument('--burst-probability', type=float, default=0.01, help="Chance per second of starting a burst")
+        parser.add_argument('--burst-multiplier', type=positive_float, default=5.0, help="Rate multiplier during a burst")
+        parser.add_argument('--burst-seconds', type=float, default=10.0, help="Length of a burst")
+        parser.add_argument('--report-interval', type=float, default=10.0, help="Seconds between progress reports")
+
+    def handle(self, *args, **options):
+        try:
+            stats = run_live_feed(
+                rate=options['rate'],
+                duration=options['duration'],
+                batch_size=options['batch_size'],
+                flush_interval=options['flush_interval'],
+                queue_size=options['queue_size'],
+                seasonality=options['seasonality'],
+                peak_hour=options['peak_hour'],
+                burst_probability=options['burst_probability'],
+                burst_multiplier=options['burst_multiplier'],
+                burst_seconds=options['burst_seconds'],
+                report_interval=options['report_interval'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Live feed interrupted")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {stats['ingested']} tweets at {stats['ingest_throughput']} tweets/s "
+            f"(p95 latency to database visibility {stats['latency_p95']}s)"
+        ))
@@ -0,0 +1,173 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestProfile:
+    """SQL statements issued while serving one request."""
+
+    def __init__(self, path):
+        self.path = path
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self._lock = threading.Lock()
+
+    def record(self, statement, seconds, rowcount):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if rowcount is not None and rowcount >= 0:
+                self.rows += rowcount
+            if seconds >= self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_statement = statement
+
+    def summary(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_seconds * 1000, 3),
+            'rows': self.rows,
+            'slowest_ms': round(self.slowest_seconds * 1000, 3),
+            'slowest_statement': ' '.join(self.slowest_statement.split()) if self.slowest_statement else None,
+        }
+
+    def header(self):
+        summary = self.summary()
+        return '; '.join(f"{key}={summary[key]}" for key in ('queries', 'db_ms', 'rows', 'slowest_ms'))
+
+
+# Set by the middleware; copied into the threads and tasks serving the request
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+# Slow statements are explained on a separate connection, off the request's critical path
+# (its thread has no request profile, so the EXPLAIN itself is never recorded or explained)
+_explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+_explained_at = {}
+_explained_lock = threading.Lock()
+
+
+def _should_explain(statement, context):
+    if not settings.SLOW_QUERY_EXPLAIN:
+        return False
+    # ANALYZE runs the statement again, so only plain reads qualify
+    words = statement.lstrip().split(None, 1)
+    if not words or words[0].upper() != 'SELECT' or 'FOR UPDATE' in statement.upper():
+        return False
+    if context is None or context.executemany or context.dialect.driver != 'psycopg2':
+        return False
+    # The same statement is explained at most once per SLOW_QUERY_EXPLAIN_INTERVAL
+    key = hashlib.sha1(statement.encode()).hexdigest()
+    now = time.monotonic()
+    with _explained_lock:
+        if now - _explained_at.get(key, -float('inf')) < settings.SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        _explained_at[key] = now
+    return True
+
+
+def _explain(engine, statement, parameters, seconds, path):
+    try:
+        with engine.connect() as conn:
+            plan = '\n'.join(row[0] for row in conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+            ))
+        entry = {
+            'at': datetime.now().isoformat(),
+            'path': path,
+            'duration_ms': round(seconds * 1000, 3),
+            'statement': statement,
+            'parameters': repr(parameters),
+            'plan': plan,
+        }
+        os.makedirs(os.path.dirname(settings.SLOW_QUERY_LOG), exist_ok=True)
+        with open(settings.SLOW_QUERY_LOG, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    except Exception as e:
+        print(f"Could not explain slow query: {str(e)}")
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = getattr(context, '_profile_started', None)
+    if profile is None or started is None:
+        return
+    seconds = time.perf_counter() - started
+    profile.record(statement, seconds, getattr(cursor, 'rowcount', None))
+
+    if seconds * 1000 >= settings.SLOW_QUERY_MS and _should_explain(statement, context):
+        _explainer.submit(_explain, conn.engine, statement, parameters, seconds, profile.path)
+
+
+class QueryProfilingMiddleware:
+    """
+    Records the SQLAlchemy statements of each request: count, DB time, rows and the slowest.
+
+    With QUERY_PROFILE_HEADER on, the summary is returned in an ``X-Query-Profile`` header.
+    Statements slower than SLOW_QUERY_MS get an ``EXPLAIN (ANALYZE, BUFFERS)`` written to
+    SLOW_QUERY_LOG. Bodies streamed after the view returned are not included in the header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _finish(self, profile, response):
+        if settings.QUERY_PROFILE_HEADER:
+            response['X-Query-Profile'] = profile.header()
+            if profile.slowest_statement:
+                slowest = profile.summary()['slowest_statement'][:300]
+                response['X-Query-Profile-Slowest'] = slowest.encode('ascii', 'replace').decode()
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.QUERY_PROFILING_ENABLED:
+            return self.get_response(request)
+        profile = RequestProfile(request.path)
+        token = _current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._finish(profile, response)
+
+    async def __acall__(self, request):
+        if not settings.QUERY_PROFILING_ENABLED:
+            return await self.get_response(request)
+        profile = RequestProfile(request.path)
+        token = _current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._finish(profile, response)
@@ -1,6 +1,15 @@
+import importlib.util
+import runpy
 import pytest
 from django.contrib.auth.models import User
+from django.utils.module_loading import import_string
 from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+from ..authentication import UserCache, user_cache
 
 @pytest.mark.django_db
 class TestAuthentication:
@@ -73,4 +82,56 @@ class TestAuthentication:
         # Verify database was updated
         test_user.refresh_from_db()
         assert test_user.first_name == 'Updated'
-        assert test_user.last_name == 'Name'
\ No newline at end of file
+        assert test_user.last_name == 'Name'
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+    def test_repeated_requests_skip_the_user_lookup(self, auth_client, test_user, django_assert_num_queries):
+        user_cache.clear()
+        assert auth_client.get('/api/user/profile/').status_code == status.HTTP_200_OK
+        with django_assert_num_queries(0):
+            response = auth_client.get('/api/user/profile/')
+        assert response.data['email'] == test_user.email
+
+    def test_profile_update_invalidates_the_cache(self, auth_client, test_user):
+        user_cache.clear()
+        auth_client.get('/api/user/profile/')
+        auth_client.patch('/api/user/profile/', {'first_name': 'Changed'})
+        assert auth_client.get('/api/user/profile/').data['first_name'] == 'Changed'
+
+    def test_expired_entries_are_reloaded(self, test_user):
+        cache = UserCache(size=1, ttl=-1)
+        cache.set('1', test_user)
+        assert cache.get('1') is None
+
+    def test_least_recently_used_entry_is_dropped(self, test_user):
+        cache = UserCache(size=2, ttl=60)
+        for user_id in ('1', '2'):
+            cache.set(user_id, test_user)
+        cache.get('1')
+        cache.set('3', test_user)
+        assert cache.get('2') is None
+        assert cache.get('1') is not None
+
+@pytest.mark.django_db
+class TestStatelessAuthentication:
+    def test_setting_makes_views_trust_the_token(self, monkeypatch, test_user, django_assert_num_queries):
+        monkeypatch.setenv('JWT_STATELESS_AUTH', 'true')
+        namespace = runpy.run_path(importlib.util.find_spec('backend.settings').origin)
+
+        class WhoAmI(APIView):
+            authentication_classes = [
+                import_string(path) for path in namespace['REST_FRAMEWORK']['DEFAULT_AUTHENTICATION_CLASSES']
+            ]
+            permission_classes = [IsAuthenticated]
+
+            def get(self, request):
+                return Response({'user_id': str(request.user.id)})
+
+        token = AccessToken.for_user(test_user)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with django_assert_num_queries(0):
+            response = WhoAmI.as_view()(request)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'user_id': str(test_user.id)}
+
@@ -0,0 +1,116 @@
+import time
+import pandas as pd
+from rest_framework import status
+from django.test import override_settings
+from ..logics.company_logics import CompanyIndex, get_company_index, invalidate_company_index
+from .test_company_cache import record_statements
+from ..logics.loader_logics import upsert_flat_tweets
+from ..logics.rollup_logics import rebuild_daily_stats
+from ..models import create_tables, get_db_connection, CompanyDailyStats
+from .test_loader import flat_tweets
+
+
+def load_companies(**counts):
+    frames = []
+    for company, count in counts.items():
+        tweets = flat_tweets(count, company=company)
+        tweets['id'] = tweets['id'] + f'-{company}'
+        frames.append(tweets)
+    upsert_flat_tweets(pd.concat(frames, ignore_index=True))
+
+
+class TestCompanyIndex:
+    def test_prefix_matches_ranked_by_tweet_count(self):
+        index = CompanyIndex({'Apple Inc.': 5, 'Applied Materials': 9, 'Tesla, Inc.': 7, 'Amazon': 1})
+        assert index.search('app') == [
+            {'company': 'Applied Materials', 'tweet_count': 9},
+            {'company': 'Apple Inc.', 'tweet_count': 5},
+        ]
+        assert [match['company'] for match in index.search('  APPLE ')] == ['Apple Inc.']
+        assert index.search('xyz') == []
+
+    def test_later_words_match_after_name_prefixes(self):
+        index = CompanyIndex({'Apple Inc.': 5, 'Tesla, Inc.': 7, 'Inception Labs': 1})
+        assert [match['company'] for match in index.search('inc')] == ['Inception Labs', 'Tesla, Inc.', 'Apple Inc.']
+
+    def test_empty_prefix_returns_the_largest_companies(self):
+        index = CompanyIndex({'A': 1, 'B': 3, 'C': 2})
+        assert [match['company'] for match in index.search('', limit=2)] == ['B', 'C']
+
+    def test_lookup_is_fast(self):
+        index = CompanyIndex({f'Company {i:05d}': i for i in range(50000)})
+        started = time.perf_counter()
+        for _ in range(1000):
+            index.search('company 012')
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+
+class TestCompanySuggestions:
+    def test_endpoint(self, api_client, test_db_session):
+        invalidate_company_index()
+        load_companies(**{'Apple Inc.': 3, 'Applied Materials': 1})
+        response = api_client.get('/api/companies/?q=appl')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [
+            {'company': 'Apple Inc.', 'tweet_count': 3},
+            {'company': 'Applied Materials', 'tweet_count': 1},
+        ]
+        assert api_client.get('/api/companies/?q=a&limit=0').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_refreshed_on_ingest(self, test_db_session):
+        invalidate_company_index()
+        load_companies(**{'Apple Inc.': 2})
+        index = get_company_index()
+        assert get_company_index() is index
+
+        load_companies(**{'Tesla, Inc.': 4})
+        assert [match['company'] for match in get_company_index().search('')] == ['Tesla, Inc.', 'Apple Inc.']
+
+    def test_own_batches_update_the_index_without_counting_tweets(self, test_db_session):
+        invalidate_company_index()
+        load_companies(**{'Apple Inc.': 2})
+        get_company_index()
+        with record_statements() as statements:
+            load_companies(**{'Tesla, Inc.': 4, 'Apple Inc.': 1})
+            moved = flat_tweets(1, company='Tesla, Inc.')
+            moved['id'] = 'tweet-0-Apple Inc.'
+            upsert_flat_tweets(moved)
+            index = get_company_index()
+        assert index.search('') == [
+            {'company': 'Tesla, Inc.', 'tweet_count': 5},
+            {'company': 'Apple Inc.', 'tweet_count': 1},
+        ]
+        assert not any('GROUP BY' in statement for statement in statements)
+
+    def test_built_from_the_rollups(self, test_db_session):
+        invalidate_company_index()
+        create_tables()
+        load_companies(**{'Apple Inc.': 3})
+        with record_statements() as statements:
+            assert get_company_index().search('') == [{'company': 'Apple Inc.', 'tweet_count': 3}]
+        assert any('FROM company_daily_stats' in statement for statement in statements)
+        assert not any('FROM tweets' in statement for statement in statements)
+
+    def test_partly_rolled_up_tweets_are_counted(self, test_db_session):
+        # Tweets loaded before the rollups were deployed, then a batch rolled up on top of them
+        load_companies(**{'Apple Inc.': 3, 'Tesla, Inc.': 2})
+        engine, _ = get_db_connection()
+        with engine.begin() as conn:
+            conn.execute(CompanyDailyStats.__table__.delete())
+        load_companies(**{'Apple Inc.': 4})
+        invalidate_company_index()
+        expected = [{'company': 'Apple Inc.', 'tweet_count': 4}, {'company': 'Tesla, Inc.', 'tweet_count': 2}]
+        assert get_company_index().search('') == expected
+
+        rebuild_daily_stats()
+        invalidate_company_index()
+        with record_statements() as statements:
+            assert get_company_index().search('') == expected
+        assert not any('FROM tweets' in statement for statement in statements)
+
+    def test_unchanged_data_keeps_the_index(self, test_db_session):
+        invalidate_company_index()
+        load_companies(**{'Apple Inc.': 2})
+        index = get_company_index()
+        with override_settings(COMPANY_INDEX_MAX_AGE=0):
+            assert get_company_index() is index
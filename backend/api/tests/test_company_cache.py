@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from django.test import override_settings
+from sqlalchemy import event
+from ..models import get_db_connection, SearchedCompanies
+from ..logics.cache_logics import get_cached_companies, store_companies, evict, cache_stats, flush_hits
+from ..logics.process_logics import build_dashboard, build_dashboard_cached, process_tweets_coalesced
+from ..logics.version_logics import bump_data_version, TWEETS
+from .test_dashboard import load_two_companies
+
+
+@contextmanager
+def record_statements():
+    engine, _ = get_db_connection()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+class TestCompanyCache:
+    def test_hits_are_counted(self, test_db_session):
+        engine, _ = get_db_connection()
+        with engine.begin() as conn:
+            store_companies(conn, {'Apple Inc.': {'sentiment_summary': {'total_tweets': 3}}}, 'key', 1)
+            assert get_cached_companies(conn, ['Apple Inc.', 'Tesla, Inc.'], 'key') == {
+                'Apple Inc.': {'sentiment_summary': {'total_tweets': 3}}
+            }
+            assert get_cached_companies(conn, ['Apple Inc.'], 'key')
+            assert get_cached_companies(conn, ['Apple Inc.'], 'other-key') == {}
+            flush_hits(conn)
+        entry = test_db_session.query(SearchedCompanies).filter_by(company='Apple Inc.').one()
+        assert entry.hit_count == 2
+        assert entry.last_accessed_at >= entry.created_at
+        assert entry.size_bytes == len('{"sentiment_summary": {"total_tweets": 3}}')
+
+    def test_lookups_do_not_write(self, test_db_session):
+        engine, _ = get_db_connection()
+        with engine.begin() as conn:
+            store_companies(conn, {'Apple Inc.': {'value': 1}}, 'key', 1)
+        with record_statements() as statements, engine.begin() as conn:
+            for _ in range(3):
+                get_cached_companies(conn, ['Apple Inc.'], 'key')
+        assert not any(statement.lstrip().upper().startswith('UPDATE') for statement in statements)
+
+        with record_statements() as statements, engine.begin() as conn:
+            flush_hits(conn)
+            assert flush_hits(conn) == 0
+        assert sum(statement.lstrip().upper().startswith('UPDATE') for statement in statements) == 1
+        assert test_db_session.query(SearchedCompanies).filter_by(company='Apple Inc.').one().hit_count == 3
+
+    def test_dashboard_served_from_the_cache(self, test_db_session):
+        load_two_companies()
+        expected = build_dashboard(['Apple Inc.', 'Tesla, Inc.', 'Nobody'], ['sentiment_summary', 'top_tweets'], days=7)
+
+        first = build_dashboard_cached(['Apple Inc.', 'Tesla, Inc.', 'Nobody'], ['sentiment_summary', 'top_tweets'], days=7)
+        assert first['Nobody'] is None
+        assert first['Apple Inc.']['sentiment_summary'] == expected['Apple Inc.']['sentiment_summary']
+
+        with record_statements() as statements:
+            second = build_dashboard_cached(['Apple Inc.', 'Tesla, Inc.'], ['sentiment_summary', 'top_tweets'], days=7)
+        assert not any('FROM tweets' in statement for statement in statements)
+        assert second['Tesla, Inc.']['top_tweets'] == first['Tesla, Inc.']['top_tweets']
+        assert set(second['Apple Inc.']) == {'sentiment_summary', 'top_tweets'}
+
+    def test_warmed_by_the_etl(self, test_db_session):
+        load_two_companies()
+        process_tweets_coalesced(days=30)
+        engine, _ = get_db_connection()
+        with engine.connect() as conn:
+            assert cache_stats(conn)['entries'] == 2
+        with record_statements() as statements:
+            dashboard = build_dashboard_cached(['Apple Inc.'], ['key_topics'])
+        assert dashboard['Apple Inc.']['key_topics'][0]['topic'] == 'launch'
+        assert not any('FROM tweets' in statement for statement in statements)
+
+    def test_new_data_version_evicts_entries(self, test_db_session):
+        load_two_companies()
+        build_dashboard_cached(['Apple Inc.', 'Tesla, Inc.'])
+        engine, _ = get_db_connection()
+        with engine.begin() as conn:
+            bump_data_version(conn, TWEETS)
+            assert evict(conn) == 2
+            assert cache_stats(conn)['entries'] == 0
+
+    def test_least_recently_used_evicted_over_budget(self, test_db_session):
+        engine, _ = get_db_connection()
+        with engine.begin() as conn:
+            for company in ('A', 'B', 'C'):
+                store_companies(conn, {company: {'value': 'x' * 100}}, 'key', 0)
+            get_cached_companies(conn, ['A'], 'key')
+            with override_settings(COMPANY_CACHE_MAX_ENTRIES=2):
+                assert evict(conn) == 1
+            assert set(get_cached_companies(conn, ['A', 'B', 'C'], 'key')) == {'A', 'C'}
+            with override_settings(COMPANY_CACHE_MAX_BYTES=150):
+                evict(conn)
+            assert cache_stats(conn)['entries'] == 1
@@ -0,0 +1,146 @@
+import pandas as pd
+import pytest
+from datetime import datetime
+from rest_framework import status
+from sqlalchemy import text
+from ..models import SocialMediaData, DataVersion, upgrade_tables
+from ..logics.loader_logics import upsert_flat_tweets
+from .test_loader import flat_tweets
+from .test_company_cache import record_statements
+
+
+def add_social_media_row(session, username, company="CondCo"):
+    session.add(SocialMediaData(
+        username=username, gender="unknown", likes=1, text="content", company=company,
+        sentiment="positive", score=0.5, created_at=datetime(2024, 3, 1, 12, 0, 0)
+    ))
+    session.commit()
+
+
+class TestSocialMediaConditionalRequests:
+    def test_if_none_match_returns_304_until_data_changes(self, api_client, test_db_session):
+        add_social_media_row(test_db_session, "first")
+        url = '/api/social-media-data/by-company/CondCo/'
+        response = api_client.get(url)
+        etag = response['ETag']
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Last-Modified']
+        assert 'no-cache' in response['Cache-Control']
+
+        cached = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached['ETag'] == etag
+        assert cached.content == b''
+
+        # The filter is part of the ETag
+        assert api_client.get('/api/social-media-data/by-company/OtherCo/')['ETag'] != etag
+
+        add_social_media_row(test_db_session, "second")
+        fresh = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert fresh.status_code == status.HTTP_200_OK
+        assert fresh['ETag'] != etag
+        assert len(fresh.json()) == 2
+
+    def test_if_modified_since(self, api_client, test_db_session):
+        add_social_media_row(test_db_session, "first")
+        last_modified = api_client.get('/api/social-media-data/')['Last-Modified']
+        response = api_client.get('/api/social-media-data/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_validator_does_not_read_the_rows(self, api_client, test_db_session):
+        add_social_media_row(test_db_session, "first")
+        url = '/api/social-media-data/by-company/CondCo/?since=2024-01-01T00:00:00'
+        etag = api_client.get(url)['ETag']
+        with record_statements() as statements:
+            assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        assert not any('social_media_data.' in statement for statement in statements)
+
+    @pytest.mark.parametrize('url', ['/api/social-media-data/', '/api/async/social-media-data/'])
+    def test_table_without_data_versions_is_served(self, api_client, test_db_session, url):
+        # A social_media_data table that predates data_versions
+        DataVersion.__table__.drop(test_db_session.get_bind())
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+    def test_upgrade_keeps_the_trigger(self, test_db_session):
+        query = text("SELECT oid FROM pg_trigger WHERE tgname = 'social_media_data_version'")
+        trigger = test_db_session.execute(query).scalar()
+        test_db_session.commit()
+        upgrade_tables(test_db_session.get_bind())
+        assert trigger is not None
+        assert test_db_session.execute(query).scalar() == trigger
+
+    def test_writers_need_no_access_to_data_versions(self, api_client, test_db_session):
+        etag = api_client.get('/api/social-media-data/')['ETag']
+        with test_db_session.get_bind().connect() as conn:
+            conn.execute(text("DROP ROLE IF EXISTS social_media_feeder"))
+            conn.execute(text("CREATE ROLE social_media_feeder"))
+            conn.execute(text("GRANT INSERT ON social_media_data TO social_media_feeder"))
+            conn.execute(text("GRANT USAGE ON SEQUENCE social_media_data_id_seq TO social_media_feeder"))
+            try:
+                conn.execute(text("SET ROLE social_media_feeder"))
+                conn.execute(text("INSERT INTO social_media_data (username, company) VALUES ('fed', 'CondCo')"))
+                conn.execute(text("RESET ROLE"))
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.execute(text("DROP OWNED BY social_media_feeder"))
+                conn.execute(text("DROP ROLE social_media_feeder"))
+                conn.commit()
+        assert api_client.get('/api/social-media-data/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_every_write_changes_the_version(self, api_client, test_db_session):
+        add_social_media_row(test_db_session, "first")
+        etag = api_client.get('/api/social-media-data/')['ETag']
+        test_db_session.query(SocialMediaData).update({'likes': 5})
+        test_db_session.commit()
+        assert api_client.get('/api/social-media-data/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_async_endpoint_uses_the_same_validator(self, api_client, test_db_session):
+        add_social_media_row(test_db_session, "first")
+        etag = api_client.get('/api/social-media-data/')['ETag']
+        response = api_client.get('/api/async/social-media-data/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_bad_query_is_not_answered_with_304(self, api_client, test_db_session):
+        add_social_media_row(test_db_session, "first")
+        etag = api_client.get('/api/social-media-data/')['ETag']
+        response = api_client.get('/api/social-media-data/?cursor=garbage', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestCacheableEtl:
+    def test_get_is_revalidated_against_the_tweets_version(self, api_client, test_db_session, mocker):
+        upsert_flat_tweets(flat_tweets(3, created_at=pd.Timestamp.now().floor('s')))
+        etl = mocker.patch('api.logics.process_logics.process_tweets_for_frontend', return_value='[{"company": "Apple Inc."}]')
+
+        response = api_client.get('/api/social-media-data/etl/?days=7')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{'company': 'Apple Inc.'}]
+        assert response['ETag'].startswith('W/')
+        assert 'public' in response['Cache-Control']
+        etag = response['ETag']
+
+        assert api_client.get('/api/social-media-data/etl/?days=7', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        assert etl.call_count == 1
+
+        # Other windows are other representations
+        assert api_client.get('/api/social-media-data/etl/?days=30', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+        # Changed tweets invalidate it
+        upsert_flat_tweets(flat_tweets(3, created_at=pd.Timestamp.now().floor('s') - pd.Timedelta(days=1)))
+        assert api_client.get('/api/social-media-data/etl/?days=7', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_unchanged_reload_keeps_etag(self, api_client, test_db_session, mocker):
+        tweets = flat_tweets(3, created_at=pd.Timestamp.now().floor('s'))
+        upsert_flat_tweets(tweets)
+        mocker.patch('api.logics.process_logics.process_tweets_for_frontend', return_value='[]')
+        etag = api_client.get('/api/social-media-data/etl/')['ETag']
+
+        upsert_flat_tweets(tweets)
+        assert api_client.get('/api/social-media-data/etl/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_invalid_days(self, api_client):
+        assert api_client.get('/api/social-media-data/etl/?days=week').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/social-media-data/etl/?days=-3').status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from django.db import connections
+from sqlalchemy import exc, text
+
+from ..connection_budget import ConnectionBudget, ConnectionBudgetTimeout, connection_budget
+from ..engines import get_engine, get_async_engine, pool_stats, _release_closed_loop_slots
+
+
+class TestConnectionBudget:
+    def test_waits_for_a_released_slot(self):
+        budget = ConnectionBudget(2)
+        budget.acquire('django', 1)
+        budget.acquire('sqlalchemy', 1)
+
+        threading.Timer(0.05, budget.release, ['django']).start()
+        budget.acquire('sqlalchemy', 5)
+
+        stats = budget.stats()
+        assert stats['by_stack'] == {'sqlalchemy': 2}
+        assert stats['waits'] == 1
+        assert stats['waiting'] == 0
+        assert stats['max_wait_ms'] > 0
+
+    def test_times_out(self):
+        budget = ConnectionBudget(1)
+        budget.acquire('django', 1)
+        with pytest.raises(ConnectionBudgetTimeout):
+            budget.acquire('sqlalchemy', 0.05)
+        assert budget.stats()['timeouts'] == 1
+        assert budget.stats()['open'] == 1
+
+    def test_reclaims_idle_connections_before_waiting(self):
+        budget = ConnectionBudget(1)
+        budget.acquire('sqlalchemy', 1)
+        budget.add_reclaimer(lambda: budget.release('sqlalchemy') or True)
+
+        started = time.perf_counter()
+        budget.acquire('django', 5)
+        assert time.perf_counter() - started < 1
+        assert budget.stats()['by_stack'] == {'django': 1}
+        assert budget.stats()['reclaimed_idle'] == 1
+
+    def test_unlimited(self):
+        budget = ConnectionBudget(0)
+        for _ in range(50):
+            budget.acquire('sqlalchemy', 0)
+        assert budget.stats()['open'] == 50
+        assert budget.stats()['limit'] is None
+
+
+class TestSharedBudget:
+    def test_counts_sqlalchemy_and_django_connections(self, db):
+        engine = get_engine()
+        engine.dispose()
+        before = connection_budget.stats()['by_stack'].get('sqlalchemy', 0)
+        with engine.connect():
+            assert connection_budget.stats()['by_stack']['sqlalchemy'] == before + 1
+        connections['default'].ensure_connection()
+        assert connection_budget.stats()['by_stack']['django'] >= 1
+
+    def test_django_reclaims_an_idle_pooled_connection(self, db, monkeypatch):
+        engine = get_engine()
+        with engine.connect():
+            pass
+        assert engine.pool.checkedin() >= 1
+        monkeypatch.setattr(connection_budget, 'limit', connection_budget.stats()['open'])
+        reclaimed = connection_budget.stats()['reclaimed_idle']
+
+        extra = connections.create_connection('default')
+        try:
+            extra.ensure_connection()
+        finally:
+            extra.close()
+        assert connection_budget.stats()['reclaimed_idle'] == reclaimed + 1
+
+    def test_exhausted_budget_times_out_like_the_pool(self, db, settings, monkeypatch):
+        settings.DB_BUDGET_TIMEOUT = 0.05
+        engine = get_engine()
+        engine.dispose()
+        timeouts = pool_stats()['default']['timeouts']
+        with engine.connect():
+            monkeypatch.setattr(connection_budget, 'limit', connection_budget.stats()['open'])
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        assert pool_stats()['default']['timeouts'] == timeouts + 1
+        assert connection_budget.stats()['waiting'] == 0
+
+    def test_async_views_under_wsgi_give_their_slots_back(self, api_client, test_db_session):
+        # Each request runs on a loop of its own; its engine must not keep its slots
+        before = connection_budget.stats()['by_stack'].get('sqlalchemy_async', 0)
+        for _ in range(connection_budget.limit + 5):
+            assert api_client.get('/api/async/social-media-data/?limit=1').status_code == 200
+        assert connection_budget.stats()['by_stack'].get('sqlalchemy_async', 0) == before
+
+    def test_slots_of_a_closed_loop_are_reclaimed(self, db):
+        async def leave_connection_pooled():
+            async with get_async_engine().connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        _release_closed_loop_slots()
+        before = connection_budget.stats()['by_stack'].get('sqlalchemy_async', 0)
+        asyncio.run(leave_connection_pooled())
+        assert connection_budget.stats()['by_stack']['sqlalchemy_async'] == before + 1
+        assert _release_closed_loop_slots()
+        assert connection_budget.stats()['by_stack'].get('sqlalchemy_async', 0) == before
+
+    def test_readiness_reports_the_budget(self, api_client):
+        body = api_client.get('/api/health/ready/').json()
+        assert {'limit', 'open', 'waiting', 'waits', 'timeouts'} <= set(body['connection_budget'])
+
+
+class TestPgBouncerMode:
+    @pytest.mark.asyncio
+    async def test_async_engine_without_prepared_statement_caches(self, settings):
+        settings.DB_PGBOUNCER = True
+        engine = get_async_engine()
+        try:
+            assert engine.url.query['prepared_statement_cache_size'] == '0'
+            before = connection_budget.stats()['by_stack'].get('sqlalchemy_async', 0)
+            async with engine.connect() as conn:
+                assert (await conn.execute(text("SELECT CAST(:value AS integer)"), {'value': 1})).scalar() == 1
+                assert connection_budget.stats()['by_stack']['sqlalchemy_async'] == before + 1
+        finally:
+            await engine.dispose()
+        assert connection_budget.stats()['by_stack'].get('sqlalchemy_async', 0) == before
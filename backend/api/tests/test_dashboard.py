@@ -0,0 +1,70 @@
+import json
+import pandas as pd
+from rest_framework import status
+from sqlalchemy import event
+from ..models import get_db_connection
+from ..logics.loader_logics import upsert_flat_tweets
+from ..logics.process_logics import process_tweets_for_frontend, build_dashboard
+from .test_loader import flat_tweets
+
+
+def load_two_companies():
+    now = pd.Timestamp.now().floor('s')
+    apple = flat_tweets(4, created_at=now, hashtags=' #launch')
+    tesla = flat_tweets(3, company='Tesla, Inc.', sentiment_label='negative', sentiment_score=0.2, created_at=now)
+    tesla['id'] = tesla['id'] + '-tesla'
+    upsert_flat_tweets(pd.concat([apple, tesla], ignore_index=True))
+
+
+class TestDashboard:
+    def test_keyed_by_company_and_section(self, api_client, test_db_session):
+        load_two_companies()
+        response = api_client.get(
+            '/api/dashboard/?company=Apple Inc.&company=Tesla, Inc.&company=Nobody&sections=sentiment_summary,key_topics'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data['sections'] == ['sentiment_summary', 'key_topics']
+        assert set(data['companies']) == {'Apple Inc.', 'Tesla, Inc.', 'Nobody'}
+        assert data['companies']['Nobody'] is None
+        assert set(data['companies']['Apple Inc.']) == {'sentiment_summary', 'key_topics'}
+        assert data['companies']['Apple Inc.']['sentiment_summary']['total_tweets'] == 4
+        assert data['companies']['Tesla, Inc.']['sentiment_summary']['negative_percentage'] == 100
+        assert data['companies']['Apple Inc.']['key_topics'][0]['topic'] == 'launch'
+
+    def test_matches_the_etl_output(self, test_db_session):
+        load_two_companies()
+        etl = {company['company']: company for company in json.loads(process_tweets_for_frontend(days=7))}
+        dashboard = build_dashboard(['Apple Inc.', 'Tesla, Inc.'], days=7)
+        for company, sections in dashboard.items():
+            for section, value in sections.items():
+                assert json.loads(json.dumps(value)) == etl[company][section]
+
+    def test_one_query_for_all_companies(self, test_db_session):
+        load_two_companies()
+        engine, _ = get_db_connection()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            build_dashboard(['Apple Inc.', 'Tesla, Inc.'], ['sentiment_summary', 'sentiment_trend'])
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert len(statements) == 1
+        # Only the columns the requested sections need are read
+        assert 'tweets.text' not in statements[0]
+
+    def test_conditional_get(self, api_client, test_db_session):
+        load_two_companies()
+        etag = api_client.get('/api/dashboard/?company=Apple Inc.')['ETag']
+        response = api_client.get('/api/dashboard/?company=Apple Inc.', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_invalid_requests(self, api_client):
+        assert api_client.get('/api/dashboard/').status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.get('/api/dashboard/?company=Apple Inc.&sections=weather')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'weather' in response.json()['error']
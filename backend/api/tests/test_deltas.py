@@ -0,0 +1,156 @@
+import asyncio
+import json
+import pandas as pd
+import pytest
+from django.test import AsyncClient
+from ..models import TweetDelta
+from ..logics.delta_logics import DeltaHub, get_hub, sse_events
+from ..logics.loader_logics import upsert_flat_tweets
+from .test_loader import flat_tweets
+
+
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n') if not line.startswith(':'))
+        if 'data' in fields:
+            events.append((fields.get('event'), fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+async def next_event(iterator, timeout=10):
+    while True:
+        chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith('id:') or chunk.startswith('event:'):
+            return parse_events([chunk])[0]
+
+
+class TestDeltaRecording:
+    def test_loader_records_one_delta_per_written_batch(self, test_db_session):
+        tweets = flat_tweets(3, created_at=pd.Timestamp('2024-03-04 10:00:00'))
+        tweets.loc[2, 'sentiment_label'] = 'negative'
+        upsert_flat_tweets(tweets)
+        # Nothing changed, so no new version and no delta
+        upsert_flat_tweets(tweets)
+
+        deltas = test_db_session.query(TweetDelta).all()
+        assert len(deltas) == 1
+        company = deltas[0].payload['companies']['Apple Inc.']
+        assert company['sentiment_summary'] == {
+            'new_tweets': 3, 'updated_tweets': 0, 'positive': 2, 'negative': 1, 'neutral': 0, 'score_sum': 2.4,
+        }
+        assert company['sentiment_trend'] == [{'date': '2024-02-27', 'tweet_count': 3, 'score_sum': 2.4}]
+        assert [tweet['id'] for tweet in company['top_tweets']['negative']] == ['tweet-2']
+
+    def test_updates_replace_their_previous_version(self, test_db_session):
+        tweets = flat_tweets(2, created_at=pd.Timestamp('2024-03-04 10:00:00'))
+        upsert_flat_tweets(tweets)
+        edited = flat_tweets(2, text='edited', created_at=pd.Timestamp('2024-03-04 10:00:00'))
+        upsert_flat_tweets(edited)
+        company = test_db_session.query(TweetDelta).order_by(TweetDelta.version.desc()).first().payload['companies']['Apple Inc.']
+        # Nothing the counters see changed
+        assert company['sentiment_summary'] == {
+            'new_tweets': 0, 'updated_tweets': 2, 'positive': 0, 'negative': 0, 'neutral': 0, 'score_sum': 0.0,
+        }
+        assert 'sentiment_trend' not in company
+        assert sorted(company['updated_tweet_ids']) == ['tweet-0', 'tweet-1']
+        assert {tweet['text'] for tweet in company['top_tweets']['positive']} == {'edited'}
+
+    def test_rescored_and_moved_tweets_are_taken_out(self, test_db_session):
+        upsert_flat_tweets(flat_tweets(3, created_at=pd.Timestamp('2024-03-04 10:00:00')))
+        changed = flat_tweets(3, created_at=pd.Timestamp('2024-03-04 10:00:00'))
+        changed.loc[0, ['sentiment_label', 'sentiment_score']] = ['negative', 0.2]
+        changed.loc[1, 'company'] = 'Tesla, Inc.'
+        upsert_flat_tweets(changed)
+
+        companies = test_db_session.query(TweetDelta).order_by(TweetDelta.version.desc()).first().payload['companies']
+        assert companies['Apple Inc.']['sentiment_summary'] == {
+            'new_tweets': 0, 'updated_tweets': 1, 'positive': -2, 'negative': 1, 'neutral': 0, 'score_sum': -1.4,
+        }
+        assert companies['Apple Inc.']['sentiment_trend'] == [{'date': '2024-02-27', 'tweet_count': -1, 'score_sum': -1.4}]
+        assert companies['Tesla, Inc.']['sentiment_summary']['positive'] == 1
+        assert companies['Tesla, Inc.']['sentiment_trend'] == [{'date': '2024-02-27', 'tweet_count': 1, 'score_sum': 0.8}]
+
+
+class TestTweetEventStream:
+    @pytest.mark.asyncio
+    async def test_committed_batches_are_pushed_to_subscribers(self, test_db_session):
+        response = await AsyncClient().get('/api/events/tweets/?company=Tesla, Inc.')
+        assert response['Content-Type'] == 'text/event-stream'
+        iterator = response.streaming_content.__aiter__()
+        assert (await asyncio.wait_for(iterator.__anext__(), 10)).startswith(b'retry:')
+
+        # Apple's batch is filtered out, Tesla's arrives
+        await asyncio.to_thread(upsert_flat_tweets, flat_tweets(2))
+        tesla = flat_tweets(1, company='Tesla, Inc.')
+        tesla['id'] = 'tesla-1'
+        await asyncio.to_thread(upsert_flat_tweets, tesla)
+
+        event, event_id, data = await next_event(iterator)
+        assert event == 'delta'
+        assert int(event_id) == data['version']
+        assert list(data['companies']) == ['Tesla, Inc.']
+        assert data['companies']['Tesla, Inc.']['sentiment_summary']['new_tweets'] == 1
+        await iterator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_closing_the_stream_unsubscribes(self, test_db_session):
+        events = sse_events(heartbeat=0.05)
+        assert (await events.__anext__()).startswith('retry:')
+        assert get_hub().subscriber_count() == 1
+        assert await events.__anext__() == ': keepalive\n\n'
+        await events.aclose()
+        assert get_hub().subscriber_count() == 0
+
+    def test_restarted_listener_stays_listening(self, test_db_session, monkeypatch):
+        hub = DeltaHub()
+        has_subscribers = hub._has_subscribers
+        replacement = []
+
+        async def subscribe():
+            return hub.subscribe()
+
+        def last_check():
+            # The old listener detaches; a new subscriber starts its replacement before it finishes
+            if has_subscribers():
+                return True
+            replacement.append(hub._thread if asyncio.run(subscribe()) and hub.wait_until_listening() else None)
+            return False
+
+        async def first_subscriber():
+            subscriber = hub.subscribe()
+            assert await asyncio.to_thread(hub.wait_until_listening)
+            monkeypatch.setattr(hub, '_has_subscribers', last_check)
+            old_thread = hub._thread
+            hub.unsubscribe(subscriber)
+            return old_thread
+
+        old_thread = asyncio.run(first_subscriber())
+        old_thread.join(5)
+        monkeypatch.setattr(hub, '_has_subscribers', has_subscribers)
+        assert replacement and replacement[0] is hub._thread is not old_thread
+        assert hub.wait_until_listening(timeout=0)
+        for subscriber in list(hub._subscribers):
+            hub.unsubscribe(subscriber)
+        replacement[0].join(5)
+
+    @pytest.mark.asyncio
+    async def test_last_event_id_replays_missed_deltas(self, test_db_session):
+        await asyncio.to_thread(upsert_flat_tweets, flat_tweets(1))
+        first = test_db_session.query(TweetDelta).one().version
+        more = flat_tweets(1)
+        more['id'] = 'later'
+        await asyncio.to_thread(upsert_flat_tweets, more)
+
+        response = await AsyncClient().get('/api/events/tweets/', headers={'Last-Event-ID': str(first)})
+        iterator = response.streaming_content.__aiter__()
+        event, event_id, data = await next_event(iterator)
+        assert int(event_id) == first + 1
+        assert data['companies']['Apple Inc.']['top_tweets']['positive'][0]['id'] == 'later'
+        await iterator.aclose()
+
+    @pytest.mark.asyncio
+    async def test_invalid_last_event_id(self):
+        response = await AsyncClient().get('/api/events/tweets/?last_event_id=abc')
+        assert response.status_code == 400
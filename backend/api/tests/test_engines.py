@@ -0,0 +1,118 @@
+import json
+import pytest
+from rest_framework import status
+from sqlalchemy import text
+from .. import engines
+from ..engines import get_engine, get_sessionmaker, pool_stats, MeteredQueuePool, read_database_name, replica_status
+from ..models import get_db_connection, get_read_db_connection
+
+
+class TestEngineRegistry:
+    def test_engine_is_shared(self):
+        engine, Session = get_db_connection()
+        again, Session_again = get_db_connection()
+        assert engine is again is get_engine()
+        assert Session is Session_again is get_sessionmaker()
+
+    def test_pool_settings(self, settings):
+        pool = get_engine().pool
+        assert isinstance(pool, MeteredQueuePool)
+        assert pool.size() == settings.DB_POOL_SIZE
+
+    def test_checkouts_are_metered(self):
+        engine = get_engine()
+        before = pool_stats()['default']['checkouts']
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            during = pool_stats()['default']
+        assert during['checked_out'] >= 1
+        assert during['utilization'] > 0
+        assert pool_stats()['default']['checkouts'] == before + 1
+        assert pool_stats()['default']['avg_checkout_wait_ms'] is not None
+
+
+@pytest.mark.django_db
+class TestPoolMetricsView:
+    def test_pool_metrics(self, api_client):
+        get_engine()
+        response = api_client.get('/api/metrics/pool/')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'utilization' in response.json()['default']
+
+
+@pytest.fixture
+def replica(settings, monkeypatch):
+    """Point DATABASE_REPLICA_URL at the test database under a separate pool."""
+    settings.DATABASE_REPLICA_URL = f"{settings.DATABASE_URL}&application_name=replica"
+    monkeypatch.setattr(engines, '_replica_state', {'checked_at': None, 'usable': False, 'lag_seconds': None, 'error': None})
+    yield settings
+    engine = engines._engines.pop('replica', None)
+    engines._sessionmakers.pop('replica', None)
+    if engine is not None:
+        engine.dispose()
+
+
+class TestReadReplica:
+    def test_reads_use_the_primary_without_a_replica(self, settings):
+        settings.DATABASE_REPLICA_URL = None
+        assert read_database_name() == 'default'
+        assert get_read_db_connection()[0] is get_engine()
+        assert replica_status() is None
+
+    def test_reads_routed_to_the_replica(self, replica, api_client, test_db_session):
+        assert get_read_db_connection()[0] is get_engine('replica')
+        assert replica_status() == {'routing_reads': True, 'lag_seconds': 0.0, 'error': None}
+
+        before = pool_stats()['replica']['checkouts']
+        assert api_client.get('/api/social-media-data/').status_code == status.HTTP_200_OK
+        assert pool_stats()['replica']['checkouts'] > before
+
+    def test_cached_dashboard_reads_the_replica(self, replica, api_client, test_db_session):
+        from .test_dashboard import load_two_companies
+        load_two_companies()
+        url = '/api/dashboard/?company=Apple Inc.&sections=sentiment_summary'
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        # Served from the cache: only reads, all of them on the replica
+        before = {name: stats['checkouts'] for name, stats in pool_stats().items()}
+        response = api_client.get(url, HTTP_CACHE_CONTROL='no-cache')
+        assert response.status_code == status.HTTP_200_OK
+        after = pool_stats()
+        assert after['replica']['checkouts'] > before['replica']
+        assert after['default']['checkouts'] == before['default']
+
+    @pytest.mark.asyncio
+    async def test_async_stream_reads_the_replica(self, replica, sample_social_media_data, monkeypatch):
+        from django.test import AsyncClient
+        from asgiref.sync import sync_to_async
+        from ..logics import read_logics
+
+        used = []
+        get_async_engine = read_logics.get_async_engine
+        monkeypatch.setattr(read_logics, 'get_async_engine', lambda name: used.append(name) or get_async_engine(name))
+        try:
+            response = await AsyncClient().get('/api/async/social-media-data/?stream=1&fields=username')
+            body = json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+        finally:
+            await engines.dispose_async_engines()
+        assert body == [{'username': 'testuser'}]
+        assert await sync_to_async(read_database_name)() == 'replica'
+        assert used == ['replica']
+
+    def test_lagging_replica_falls_back_to_the_primary(self, replica, monkeypatch):
+        replica.REPLICA_MAX_LAG_SECONDS = 10
+        monkeypatch.setattr(engines, '_replica_lag', lambda: 42.0)
+        assert read_database_name() == 'default'
+        assert replica_status()['error'] == "Replica is 42.0s behind"
+
+        # Checked again only after REPLICA_CHECK_INTERVAL
+        monkeypatch.setattr(engines, '_replica_lag', lambda: 1.0)
+        assert read_database_name() == 'default'
+        replica.REPLICA_CHECK_INTERVAL = 0
+        assert read_database_name() == 'replica'
+
+    def test_unreachable_replica_falls_back_to_the_primary(self, replica):
+        replica.DATABASE_REPLICA_URL = 'postgresql+psycopg2://postgres:x@127.0.0.1:1/postgres'
+        assert read_database_name() == 'default'
+        assert replica_status()['routing_reads'] is False
+        assert replica_status()['error']
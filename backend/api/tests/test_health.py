@@ -0,0 +1,56 @@
+import time
+from rest_framework import status
+from ..models import DataVersion
+from ..logics import health_logics
+from ..logics.loader_logics import upsert_flat_tweets
+from ..logics.process_logics import process_tweets_for_frontend
+from .test_company_cache import record_statements
+from .test_loader import flat_tweets
+
+
+class TestHealth:
+    def test_liveness_does_not_touch_the_database(self, api_client):
+        with record_statements() as statements:
+            response = api_client.get('/api/health/live/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['status'] == 'ok'
+        assert response['Cache-Control'] == 'no-store'
+        assert statements == []
+
+    def test_readiness_reports(self, api_client, test_db_session):
+        upsert_flat_tweets(flat_tweets(3, created_at=time.strftime('%Y-%m-%d %H:%M:%S')))
+        process_tweets_for_frontend(days=1)
+
+        with record_statements() as statements:
+            response = api_client.get('/api/health/ready/')
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data['status'] == 'ready'
+        assert data['database']['ok'] is True
+        assert 0 <= data['last_ingest_age_seconds'] < 60
+        assert data['etl']['runs'] >= 1 and data['etl']['last_seconds'] is not None
+        assert 'default' in data['pools']
+        assert set(data['caches']) == {'users', 'company_payloads', 'company_index', 'single_flight'}
+        # The check itself is one lookup; nothing else is computed
+        assert not any('tweets' in statement and 'data_versions' not in statement for statement in statements)
+
+    def test_fresh_database_is_ready(self, api_client, test_db_session):
+        DataVersion.__table__.drop(test_db_session.get_bind())
+        response = api_client.get('/api/health/ready/')
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data['database']['ok'] is True
+        assert data['last_ingest_at'] is None
+
+    def test_unreachable_database_fails_fast(self, api_client, monkeypatch, settings):
+        settings.HEALTH_DB_TIMEOUT = 0.2
+        monkeypatch.setattr(health_logics, '_query_database', lambda: time.sleep(1))
+        started = time.perf_counter()
+        response = api_client.get('/api/health/ready/')
+        assert time.perf_counter() - started < 0.9
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        data = response.json()
+        assert data['status'] == 'unavailable'
+        assert 'within 0.2s' in data['database']['error']
+        # Let the hung check finish so later probes start a fresh one
+        time.sleep(1)
@@ -0,0 +1,169 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from rest_framework import status
+
+from ..logics import hot_tier_logics
+from ..logics.hot_tier_logics import HotTier, reload, sync
+from ..logics.loader_logics import upsert_flat_tweets
+from .test_loader import flat_tweets
+
+
+def recent_tweets(count, start_hours_ago, prefix='recent', **overrides):
+    """``count`` tweets one minute apart, the first ``start_hours_ago`` hours ago."""
+    start = pd.Timestamp.now().floor('s') - pd.Timedelta(hours=start_hours_ago)
+    df = flat_tweets(count, **overrides)
+    df['id'] = [f'{prefix}-{i}' for i in range(count)]
+    df['created_at'] = start + pd.to_timedelta(np.arange(count), unit='min')
+    return df
+
+
+@pytest.fixture
+def hot_tier(monkeypatch):
+    # A tier synced by the test rather than by a background thread
+    tier = HotTier(24, 60, 5)
+    monkeypatch.setattr(hot_tier_logics, '_hot_tier', tier)
+    return tier
+
+
+class TestRingBuffer:
+    def test_old_buckets_are_evicted(self, monkeypatch):
+        tier = HotTier(hours=3, bucket_minutes=60, top_count=2)
+        # All in the current bucket, whatever the time of day
+        tweets = recent_tweets(10, start_hours_ago=0)
+        tweets['created_at'] = pd.Timestamp.now().floor('h') + pd.to_timedelta(np.arange(10), unit='min')
+        tier.load(tweets, version=1)
+        assert tier.summary('Apple Inc.')['sentiment_summary']['total_tweets'] == 10
+
+        class Later(datetime):
+            hours = 3
+
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.now(tz) + pd.Timedelta(hours=cls.hours)
+
+        monkeypatch.setattr(hot_tier_logics, 'datetime', Later)
+        assert tier.summary('Apple Inc.') is None
+
+        # The current bucket takes over the slot of the one from three hours before
+        tier._add(tier._companies, 'Apple Inc.', [{
+            'start': Later.now().isoformat(), 'tweet_count': 1,
+            'positive': 0, 'negative': 1, 'neutral': 0, 'score_sum': 0.1,
+        }], [])
+        assert tier.summary('Apple Inc.')['sentiment_summary']['total_tweets'] == 1
+        assert sum(bucket.tweet_count for bucket in tier._companies['Apple Inc.'] if bucket is not None) == 1
+
+        Later.hours = 6
+        tier.evict()
+        assert tier.stats()['companies'] == 0
+
+    def test_summary_matches_the_dashboard_shapes(self):
+        tier = HotTier(hours=24, bucket_minutes=60, top_count=2)
+        tweets = pd.concat([
+            recent_tweets(30, start_hours_ago=5),
+            recent_tweets(10, start_hours_ago=2, prefix='negative', sentiment_label='negative', sentiment_score=0.0),
+        ])
+        tier.load(tweets, version=3)
+
+        result = tier.summary('Apple Inc.')
+        assert result['sentiment_summary'] == {
+            'overall_score': 0.6, 'positive_percentage': 75, 'negative_percentage': 25,
+            'neutral_percentage': 0, 'total_tweets': 40,
+        }
+        assert sum(point['tweet_count'] for point in result['sentiment_trend']) == 40
+        # Same score everywhere: the most liked tweets win
+        assert [tweet['id'] for tweet in result['top_tweets']['positive']] == ['recent-29', 'recent-28']
+        assert [tweet['id'] for tweet in result['top_tweets']['negative']] == ['negative-9', 'negative-8']
+
+        assert tier.summary('Apple Inc.', hours=3)['sentiment_summary']['total_tweets'] == 10
+        assert tier.summary('Nobody') is None
+
+    def test_deltas_apply_in_order(self):
+        tier = HotTier(hours=24, bucket_minutes=60, top_count=5)
+        tier.load(recent_tweets(0, start_hours_ago=1), version=4)
+        delta = {'reset': False, 'companies': {'Apple Inc.': {'recent_buckets': [{
+            'start': pd.Timestamp.now().floor('h').isoformat(), 'tweet_count': 2,
+            'positive': 2, 'negative': 0, 'neutral': 0, 'score_sum': 1.6,
+        }]}}}
+        assert not tier.apply_delta(6, delta)
+        assert tier.apply_delta(5, delta)
+        assert tier.apply_delta(5, delta)
+        assert not tier.apply_delta(6, {**delta, 'reset': True})
+        assert tier.version == 5
+        assert tier.summary('Apple Inc.')['sentiment_summary']['total_tweets'] == 2
+
+
+class TestSync:
+    def test_loader_feeds_the_hot_tier(self, test_db_session, hot_tier):
+        upsert_flat_tweets(recent_tweets(20, start_hours_ago=3))
+        sync(hot_tier)
+        assert hot_tier.stats()['reloads'] == 1
+
+        upsert_flat_tweets(recent_tweets(5, start_hours_ago=1, prefix='new'))
+        assert hot_tier.summary('Apple Inc.')['sentiment_summary']['total_tweets'] == 25
+        assert hot_tier.stats()['deltas_applied'] == 1
+
+    def test_updates_do_not_drift_from_a_reload(self, test_db_session, hot_tier):
+        tweets = recent_tweets(20, start_hours_ago=3)
+        upsert_flat_tweets(tweets)
+        sync(hot_tier)
+        changed = tweets.copy()
+        changed.loc[:4, ['sentiment_label', 'sentiment_score']] = ['negative', 0.1]
+        changed.loc[5:7, 'company'] = 'Tesla, Inc.'
+        changed.loc[8, 'like_count'] = 10000
+        upsert_flat_tweets(changed)
+        assert hot_tier.stats()['deltas_applied'] == 1
+
+        reloaded = HotTier(24, 60, 5)
+        reload(reloaded)
+        for company in ('Apple Inc.', 'Tesla, Inc.'):
+            assert hot_tier.summary(company) == reloaded.summary(company)
+
+    def test_catches_up_from_stored_deltas(self, test_db_session):
+        tier = HotTier(24, 60, 5)
+        upsert_flat_tweets(recent_tweets(20, start_hours_ago=3))
+        sync(tier)
+        # Written by another process: only the stored deltas tell this tier about it
+        upsert_flat_tweets(recent_tweets(7, start_hours_ago=1, prefix='other'), batch_size=3)
+        sync(tier)
+        assert tier.stats()['reloads'] == 1
+        assert tier.stats()['deltas_applied'] == 3
+
+        reloaded = HotTier(24, 60, 5)
+        reload(reloaded)
+        assert tier.summary('Apple Inc.') == reloaded.summary('Apple Inc.')
+
+    def test_reloads_after_a_truncate(self, test_db_session):
+        tier = HotTier(24, 60, 5)
+        upsert_flat_tweets(recent_tweets(20, start_hours_ago=3))
+        sync(tier)
+        upsert_flat_tweets(recent_tweets(4, start_hours_ago=1, prefix='fresh'), truncate=True)
+        sync(tier)
+        assert tier.stats()['reloads'] == 2
+        assert tier.summary('Apple Inc.')['sentiment_summary']['total_tweets'] == 4
+
+
+class TestRecentDashboard:
+    def test_served_from_memory(self, api_client, test_db_session, hot_tier):
+        upsert_flat_tweets(recent_tweets(12, start_hours_ago=2))
+        sync(hot_tier)
+        response = api_client.get('/api/dashboard/recent/?company=Apple Inc.&company=Nobody&hours=6')
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data['source'] == 'memory'
+        assert data['companies']['Apple Inc.']['sentiment_summary']['total_tweets'] == 12
+        assert data['companies']['Nobody'] is None
+
+    def test_falls_back_to_the_database_until_loaded(self, api_client, test_db_session, hot_tier):
+        upsert_flat_tweets(recent_tweets(12, start_hours_ago=2))
+        response = api_client.get('/api/dashboard/recent/?company=Apple Inc.')
+        data = response.json()
+        assert data['source'] == 'database'
+        assert data['companies']['Apple Inc.']['sentiment_summary']['total_tweets'] == 12
+
+    def test_validates_hours(self, api_client):
+        assert api_client.get('/api/dashboard/recent/?company=Apple Inc.&hours=48').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/dashboard/recent/?company=Apple Inc.&hours=soon').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/dashboard/recent/').status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,239 @@
+import json
+import os
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from rest_framework import status
+from ..models import Tweet
+from ..logics.ingest_logics import validate_batch, ingest_file, detect_format
+from ..logics.job_logics import _run_ingest_job
+
+
+def flat_row(**overrides):
+    row = {
+        'id': 'tweet-1',
+        'text': 'love my new iPhone',
+        'created_at': '2024-03-01T10:00:00Z',
+        'company': 'Apple Inc.',
+        'sentiment_score': '0.9',
+        'sentiment_label': 'Positive',
+        'sentiment_confidence': '0.95',
+        'user_username': 'techfan',
+        'user_name': 'Tech Fan',
+        'user_profile_image_url': 'http://example.com/a.jpg',
+        'user_followers_count': '120',
+        'retweet_count': '3',
+        'reply_count': '1',
+        'like_count': '10',
+        'quote_count': '0',
+        'hashtags': ' #Apple',
+    }
+    row.update(overrides)
+    return row
+
+
+def nested_row(tweet_id):
+    return {
+        'id': tweet_id,
+        'text': 'Teams keeps crashing',
+        'created_at': '2024-03-02T08:30:00',
+        'company': 'Microsoft',
+        'hashtags': '',
+        'sentiment': {'score': 0.1, 'label': 'negative', 'confidence': 0.9},
+        'user': {'username': 'cloudguru', 'name': 'Cloud Guru', 'profile_image_url': None, 'followers_count': 50},
+        'metrics': {'retweet_count': 1, 'reply_count': 0, 'like_count': 4, 'quote_count': 0},
+    }
+
+
+class TestValidateBatch:
+    def test_coerces_valid_rows(self):
+        raw = pd.DataFrame([flat_row()])
+        raw['_line'] = [2]
+        valid, rejected = validate_batch(raw)
+        assert len(rejected) == 0
+        row = valid.iloc[0]
+        assert row['sentiment_label'] == 'positive'
+        assert row['sentiment_score'] == pytest.approx(0.9)
+        assert row['like_count'] == 10
+        assert row['created_at'] == pd.Timestamp('2024-03-01 10:00:00')
+
+    def test_rejects_with_first_reason(self):
+        raw = pd.DataFrame([
+            flat_row(id='a', text=''),
+            flat_row(id='b', sentiment_score='high'),
+            flat_row(id='c', like_count='-2'),
+            flat_row(id='d', created_at='yesterday-ish'),
+            flat_row(id='e', sentiment_label='angry'),
+        ])
+        raw['_line'] = range(2, 7)
+        valid, rejected = validate_batch(raw)
+        assert len(valid) == 0
+        assert list(rejected['reason']) == [
+            'missing text', 'invalid sentiment_score', 'invalid like_count',
+            'invalid created_at', 'invalid sentiment_label',
+        ]
+
+    def test_duplicate_ids_keep_last(self):
+        raw = pd.DataFrame([flat_row(text='first'), flat_row(text='second')])
+        raw['_line'] = [2, 3]
+        valid, _ = validate_batch(raw)
+        assert list(valid['text']) == ['second']
+
+    def test_detect_format(self):
+        assert detect_format('dump.ndjson') == 'jsonl'
+        assert detect_format('dump.CSV') == 'csv'
+        with pytest.raises(ValueError):
+            detect_format('dump.xlsx')
+
+
+class TestIngestFile:
+    def test_jsonl_nested_with_rejects(self, test_db_session, tmp_path):
+        path = tmp_path / 'dump.jsonl'
+        lines = [json.dumps(nested_row(f'n{i}')) for i in range(5)]
+        lines.insert(2, '{not json')
+        path.write_text("\n".join(lines) + "\n")
+
+        stats = ingest_file(str(path), batch_size=2)
+        assert stats['rows_read'] == 6
+        assert stats['rows_loaded'] == 5
+        assert stats['rows_rejected'] == 1
+        assert test_db_session.query(Tweet).count() == 5
+
+        rejects = [json.loads(line) for line in open(stats['reject_path'])]
+        assert rejects == [{'line': 3, 'reason': 'invalid JSON', 'row': '{not json'}]
+        assert stats['reject_sample'] == rejects
+
+    def test_csv(self, test_db_session, tmp_path):
+        path = tmp_path / 'dump.csv'
+        pd.DataFrame([flat_row(id='c1'), flat_row(id='c2', sentiment_score='7')]).to_csv(path, index=False)
+
+        stats = ingest_file(str(path))
+        assert stats['rows_loaded'] == 1
+        assert stats['rows_rejected'] == 1
+        loaded = test_db_session.query(Tweet).filter_by(id='c1').one()
+        assert loaded.like_count == 10
+
+    def test_parquet_reingest_is_idempotent(self, test_db_session, tmp_path):
+        pytest.importorskip('pyarrow')
+        path = tmp_path / 'dump.parquet'
+        pd.DataFrame([flat_row(id=f'p{i}') for i in range(3)]).to_parquet(path)
+
+        ingest_file(str(path))
+        stats = ingest_file(str(path))
+        assert stats['rows_loaded'] == 3
+        assert stats['reject_path'] is None
+        assert test_db_session.query(Tweet).count() == 3
+
+    def test_scores_rows_without_sentiment(self, test_db_session, tmp_path):
+        path = tmp_path / 'unscored.csv'
+        unscored = {'sentiment_score': '', 'sentiment_label': '', 'sentiment_confidence': ''}
+        pd.DataFrame([
+            flat_row(id='s1', text='Teams keeps crashing, terrible update', **unscored),
+            flat_row(id='s2', text='love my new iPhone', **unscored),
+            flat_row(id='s3'),
+        ]).to_csv(path, index=False)
+
+        stats = ingest_file(str(path))
+        assert stats['rows_loaded'] == 3
+        assert stats['rows_scored'] == 2
+        assert stats['scored_per_second'] > 0
+        labels = {tweet.id: tweet.sentiment_label for tweet in test_db_session.query(Tweet)}
+        assert labels == {'s1': 'negative', 's2': 'positive', 's3': 'positive'}
+        # Rows that came with a sentiment keep it
+        assert test_db_session.query(Tweet).filter_by(id='s3').one().sentiment_score == pytest.approx(0.9)
+
+    def test_scoring_off_rejects_rows_without_sentiment(self, test_db_session, tmp_path):
+        path = tmp_path / 'unscored.csv'
+        pd.DataFrame([flat_row(id='s1', sentiment_label=''), flat_row(id='s2')]).to_csv(path, index=False)
+
+        stats = ingest_file(str(path), scoring='off')
+        assert stats['rows_loaded'] == 1
+        assert stats['rows_scored'] == 0
+        rejects = [json.loads(line) for line in open(stats['reject_path'])]
+        assert [reject['reason'] for reject in rejects] == ['missing sentiment_label']
+
+    def test_rescoring_replaces_the_source_sentiment(self, test_db_session, tmp_path):
+        path = tmp_path / 'dump.jsonl'
+        path.write_text(json.dumps(nested_row('n1')) + "\n")
+        stats = ingest_file(str(path), scoring='all')
+        assert stats['rows_scored'] == 1
+        tweet = test_db_session.query(Tweet).filter_by(id='n1').one()
+        assert tweet.sentiment_label == 'negative'
+        assert tweet.sentiment_score != pytest.approx(0.1)
+
+
+class TestIngestJob:
+    context = SimpleNamespace(job_id='job-3', report_progress=lambda fraction, message='': None)
+
+    def test_upload_is_removed_and_rejects_become_the_result(self, test_db_session, tmp_path, settings):
+        settings.JOB_RESULTS_DIR = tmp_path / 'results'
+        settings.INGEST_REJECT_SAMPLE_SIZE = 2
+        path = tmp_path / 'upload.jsonl'
+        path.write_text("\n".join([json.dumps(nested_row('j1')), '{bad', '{worse', '[]']) + "\n")
+
+        stats, result_path = _run_ingest_job(self.context, str(path), remove_upload=True)
+        assert not path.exists()
+        assert 'reject_path' not in stats
+        assert result_path == str(settings.JOB_RESULTS_DIR / 'job-3.rejects.jsonl')
+        rejects = [json.loads(line) for line in open(result_path)]
+        assert [reject['line'] for reject in rejects] == [2, 3, 4]
+        assert stats['reject_sample'] == rejects[:2]
+
+    def test_upload_is_removed_when_the_job_fails(self, tmp_path, settings):
+        settings.JOB_RESULTS_DIR = tmp_path / 'results'
+        path = tmp_path / 'upload.jsonl'
+        path.write_text(json.dumps(nested_row('j1')) + "\n")
+        with pytest.raises(ValueError):
+            _run_ingest_job(self.context, str(path), fmt='xml', remove_upload=True)
+        assert not path.exists()
+
+    def test_files_given_by_path_are_kept(self, test_db_session, tmp_path, settings):
+        settings.JOB_RESULTS_DIR = tmp_path / 'results'
+        path = tmp_path / 'dump.jsonl'
+        path.write_text(json.dumps(nested_row('j1')) + "\n")
+        stats, result_path = _run_ingest_job(self.context, str(path))
+        assert path.exists()
+        assert result_path is None
+        assert stats['reject_sample'] == []
+
+
+@pytest.mark.django_db
+class TestIngestView:
+    def test_upload_starts_job(self, api_client, test_db_session, tmp_path, settings, monkeypatch):
+        settings.INGEST_UPLOAD_DIR = tmp_path
+        submitted = []
+        monkeypatch.setattr(
+            'api.views.submit_job',
+            lambda kind, **params: submitted.append((kind, params)) or {
+                'id': 'job-2', 'kind': kind, 'status': 'queued', 'result_path': None
+            }
+        )
+        path = tmp_path / 'upload.jsonl'
+        path.write_text(json.dumps(nested_row('u1')) + "\n")
+        with open(path, 'rb') as f:
+            response = api_client.post('/api/tweets/ingest/', {'file': f}, format='multipart')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        kind, params = submitted[0]
+        assert kind == 'ingest'
+        assert params['fmt'] == 'jsonl'
+        assert params['remove_upload'] is True
+        assert open(params['path']).read() == path.read_text()
+
+    def test_upload_is_removed_when_the_job_is_not_submitted(self, api_client, tmp_path, settings, monkeypatch):
+        settings.INGEST_UPLOAD_DIR = tmp_path / 'uploads'
+
+        def submit_job(kind, **params):
+            raise RuntimeError("jobs table unavailable")
+        monkeypatch.setattr('api.views.submit_job', submit_job)
+        path = tmp_path / 'upload.jsonl'
+        path.write_text(json.dumps(nested_row('u1')) + "\n")
+        with open(path, 'rb') as f:
+            response = api_client.post('/api/tweets/ingest/', {'file': f}, format='multipart')
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert os.listdir(settings.INGEST_UPLOAD_DIR) == []
+
+    def test_upload_requires_file(self, api_client):
+        response = api_client.post('/api/tweets/ingest/', {}, format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
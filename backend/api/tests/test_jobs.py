@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from rest_framework import status
+from ..logics import job_logics
+from ..models import BackgroundJob, get_db_connection
+
+
+def wait_for_job(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_logics.get_job(job_id)
+        if job['status'] in (job_logics.JOB_SUCCEEDED, job_logics.JOB_FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.fixture
+def fake_handlers(monkeypatch, tmp_path):
+    def succeed(context, value=1):
+        context.report_progress(0.5, "halfway")
+        result_path = tmp_path / f"{context.job_id}.json"
+        result_path.write_text('{"value": %d}' % value)
+        return {'value': value}, str(result_path)
+
+    def fail(context):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(job_logics.JOB_HANDLERS, 'succeed', succeed)
+    monkeypatch.setitem(job_logics.JOB_HANDLERS, 'fail', fail)
+
+
+@pytest.fixture
+def job_worker(test_db_session):
+    stop = threading.Event()
+    thread = threading.Thread(target=job_logics.run_worker, kwargs={'workers': 2, 'poll_interval': 0.05, 'stop': stop})
+    thread.start()
+    yield
+    stop.set()
+    thread.join()
+
+
+class TestJobRunner:
+    def test_job_runs_in_background(self, test_db_session, fake_handlers, job_worker):
+        job = job_logics.submit_job('succeed', value=7)
+        assert job['status'] == job_logics.JOB_QUEUED
+
+        finished = wait_for_job(job['id'])
+        assert finished['status'] == job_logics.JOB_SUCCEEDED
+        assert finished['progress'] == 1.0
+        assert finished['result'] == {'value': 7}
+        assert finished['duration_seconds'] is not None
+
+    def test_failed_job_records_error(self, test_db_session, fake_handlers, job_worker):
+        job = job_logics.submit_job('fail')
+        finished = wait_for_job(job['id'])
+        assert finished['status'] == job_logics.JOB_FAILED
+        assert finished['error'] == "boom"
+
+    def test_orphaned_jobs_are_reclaimed(self, test_db_session, fake_handlers):
+        stale = datetime.now() - timedelta(hours=1)
+        test_db_session.add_all([
+            BackgroundJob(id='dead-running', kind='etl', status=job_logics.JOB_RUNNING, params={'days': 30},
+                          owner='gone:1', heartbeat_at=stale, created_at=stale),
+            BackgroundJob(id='waiting', kind='etl', status=job_logics.JOB_QUEUED, params={'days': 30}, created_at=stale),
+            BackgroundJob(id='alive', kind='etl', status=job_logics.JOB_RUNNING, params={'days': 7},
+                          owner='other:2', heartbeat_at=datetime.now(), created_at=stale),
+        ])
+        test_db_session.commit()
+
+        assert job_logics.reclaim_orphaned_jobs() == 1
+        assert 'submit it again' in job_logics.get_job('dead-running')['error']
+        assert job_logics.get_job('waiting')['status'] == job_logics.JOB_QUEUED
+        assert job_logics.get_job('alive')['status'] == job_logics.JOB_RUNNING
+
+    def test_heartbeat_keeps_own_jobs_alive(self, test_db_session, fake_handlers):
+        stale = datetime.now() - timedelta(hours=1)
+        test_db_session.add(BackgroundJob(id='mine', kind='etl', status=job_logics.JOB_RUNNING, params={},
+                                          owner=job_logics.worker_id(), heartbeat_at=stale, created_at=stale))
+        test_db_session.commit()
+
+        job_logics._heartbeat()
+        assert job_logics.get_job('mine')['status'] == job_logics.JOB_RUNNING
+        assert datetime.fromisoformat(job_logics.get_job('mine')['heartbeat_at']) > stale
+
+    def test_submitted_jobs_wait_for_a_worker(self, test_db_session, fake_handlers):
+        job = job_logics.submit_job('succeed')
+        time.sleep(0.2)
+        assert job_logics.get_job(job['id'])['status'] == job_logics.JOB_QUEUED
+
+        assert job_logics.claim_job() == (job['id'], 'succeed', {})
+        claimed = job_logics.get_job(job['id'])
+        assert claimed['status'] == job_logics.JOB_RUNNING
+        assert claimed['started_at'] is not None
+        assert job_logics.claim_job() is None
+
+    def test_jobs_being_claimed_are_skipped(self, test_db_session, fake_handlers):
+        first = job_logics.submit_job('succeed', value=1)
+        second = job_logics.submit_job('succeed', value=2)
+        _, Session = get_db_connection()
+        other_worker = Session()
+        try:
+            other_worker.query(BackgroundJob).filter(BackgroundJob.id == first['id']).with_for_update().one()
+            assert job_logics.claim_job() == (second['id'], 'succeed', {'value': 2})
+        finally:
+            other_worker.rollback()
+            other_worker.close()
+        assert job_logics.claim_job()[0] == first['id']
+
+    def test_unknown_job_kind(self, test_db_session):
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            job_logics.submit_job('nope')
+
+
+@pytest.mark.django_db
+class TestJobViews:
+    def test_etl_post_returns_job(self, api_client, test_db_session, monkeypatch):
+        submitted = []
+        monkeypatch.setattr(
+            'api.views.submit_job',
+            lambda kind, **params: submitted.append((kind, params)) or {
+                'id': 'job-1', 'kind': kind, 'status': 'queued', 'result_path': None
+            }
+        )
+        response = api_client.post('/api/social-media-data/etl/', {'days': 7}, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json()['status_url'].endswith('/api/jobs/job-1/')
+        assert submitted == [('etl', {'days': 7})]
+
+    @pytest.mark.parametrize('url, body', [
+        ('/api/social-media-data/etl/', {'days': 'week'}),
+        ('/api/social-media-data/etl/', {'days': 0}),
+        ('/api/social-media-data/create-new-mocked-data/', {'num_tweets_per_company': None, 'days': [1]}),
+        ('/api/social-media-data/create-new-mocked-data/', {'num_tweets_per_company': 1.5}),
+    ])
+    def test_bad_job_parameters_are_rejected(self, api_client, monkeypatch, url, body):
+        monkeypatch.setattr('api.views.submit_job', lambda kind, **params: pytest.fail("job submitted"))
+        response = api_client.post(url, body, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'must be' in response.json()['error']
+
+    def test_job_status_and_result(self, api_client, test_db_session, fake_handlers, job_worker):
+        job = job_logics.submit_job('succeed', value=3)
+        wait_for_job(job['id'])
+
+        response = api_client.get(f"/api/jobs/{job['id']}/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['status'] == job_logics.JOB_SUCCEEDED
+        assert response.json()['result_location'].endswith(f"/api/jobs/{job['id']}/result/")
+
+        result = api_client.get(f"/api/jobs/{job['id']}/result/")
+        assert result.status_code == status.HTTP_200_OK
+        assert b''.join(result.streaming_content) == b'{"value": 3}'
+
+    def test_missing_job(self, api_client, test_db_session):
+        response = api_client.get('/api/jobs/does-not-exist/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
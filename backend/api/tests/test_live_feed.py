@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from datetime import datetime
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..models import Tweet
+from ..logics.live_feed_logics import LiveFeedSimulator, seasonal_multiplier, percentile
+
+
+class TestLiveFeedRate:
+    def test_seasonality_peaks_at_peak_hour(self):
+        peak = seasonal_multiplier(datetime(2024, 1, 1, 14), amplitude=0.5, peak_hour=14)
+        trough = seasonal_multiplier(datetime(2024, 1, 1, 2), amplitude=0.5, peak_hour=14)
+        assert peak == pytest.approx(1.5)
+        assert trough == pytest.approx(0.5)
+
+    def test_seasonality_disabled(self):
+        assert seasonal_multiplier(datetime(2024, 1, 1, 3), amplitude=0) == 1
+
+    def test_burst_multiplies_rate(self):
+        simulator = LiveFeedSimulator(rate=10, seasonality=0, burst_probability=1.0, burst_multiplier=4)
+        assert simulator.current_rate() == pytest.approx(40)
+
+    def test_percentile(self):
+        assert percentile([], 50) is None
+        assert percentile([3, 1, 2, 4], 50) == 2
+        assert percentile([3, 1, 2, 4], 99) == 4
+
+    @pytest.mark.parametrize('option', ['--rate', '--burst-multiplier', '--batch-size'])
+    def test_command_rejects_rates_that_are_not_positive(self, option):
+        with pytest.raises(CommandError, match='must be greater than 0'):
+            call_command('simulate_live_feed', option, '0', '--duration', '1')
+
+
+class TestLiveFeedSimulator:
+    def test_short_run_ingests_everything(self, test_db_session):
+        simulator = LiveFeedSimulator(
+            rate=200, duration=1, batch_size=50, flush_interval=0.2,
+            burst_probability=0, report_interval=60
+        )
+        stats = asyncio.run(simulator.run())
+
+        assert stats['emitted'] > 0
+        assert stats['ingested'] == stats['emitted']
+        assert stats['failed_batches'] == 0
+        assert stats['latency_p50'] is not None
+        assert test_db_session.query(Tweet).count() == stats['ingested']
@@ -0,0 +1,73 @@
+import hashlib
+import pandas as pd
+from ..models import Tweet
+from ..logics.loader_logics import compute_content_hashes, upsert_flat_tweets
+
+
+def flat_tweets(count, **overrides):
+    rows = []
+    for i in range(count):
+        row = {
+            'id': f'tweet-{i}',
+            'text': f'tweet number {i}',
+            'created_at': pd.Timestamp('2024-03-01 10:00:00') + pd.Timedelta(minutes=i),
+            'company': 'Apple Inc.',
+            'sentiment_score': 0.8,
+            'sentiment_label': 'positive',
+            'sentiment_confidence': 0.9,
+            'user_username': 'techfan',
+            'user_name': 'Tech Fan',
+            'user_profile_image_url': None,
+            'user_followers_count': 100,
+            'retweet_count': 1,
+            'reply_count': 0,
+            'like_count': i,
+            'quote_count': 0,
+            'hashtags': '',
+        }
+        row.update(overrides)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+class TestContentHash:
+    def test_hash_ignores_dtype_differences(self):
+        df = flat_tweets(3)
+        nullable = df.astype({'like_count': 'Int64', 'sentiment_score': 'Float64'})
+        assert list(compute_content_hashes(df)) == list(compute_content_hashes(nullable))
+
+    def test_hash_changes_with_content(self):
+        before = compute_content_hashes(flat_tweets(1))
+        after = compute_content_hashes(flat_tweets(1, text='edited'))
+        assert before[0] != after[0]
+
+    def test_hash_is_sha1_of_the_canonical_row(self):
+        # Stored hashes must not change when pandas does
+        canonical = '\x1f'.join([
+            'tweet number 0', '2024-03-01T10:00:00.000000', 'Apple Inc.', '0.8', 'positive', '0.9',
+            'techfan', 'Tech Fan', '', '100', '1', '0', '0', '0', '',
+        ])
+        assert compute_content_hashes(flat_tweets(1))[0] == hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+class TestChangeDetectingUpsert:
+    def test_reload_only_touches_changed_rows(self, test_db_session):
+        first = upsert_flat_tweets(flat_tweets(5))
+        assert first == {'total': 5, 'inserted': 5, 'updated': 0, 'unchanged': 0}
+
+        again = upsert_flat_tweets(flat_tweets(5))
+        assert again == {'total': 5, 'inserted': 0, 'updated': 0, 'unchanged': 5}
+
+        changed = flat_tweets(6)
+        changed.loc[0, 'like_count'] = 999
+        third = upsert_flat_tweets(changed, batch_size=4)
+        assert third == {'total': 6, 'inserted': 1, 'updated': 1, 'unchanged': 4}
+
+        assert test_db_session.query(Tweet).filter_by(id='tweet-0').one().like_count == 999
+        assert test_db_session.query(Tweet).count() == 6
+
+    def test_truncate_reloads_table(self, test_db_session):
+        upsert_flat_tweets(flat_tweets(3))
+        stats = upsert_flat_tweets(flat_tweets(2), truncate=True)
+        assert stats['inserted'] == 2
+        assert test_db_session.query(Tweet).count() == 2
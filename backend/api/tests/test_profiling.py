@@ -0,0 +1,51 @@
+import json
+from rest_framework import status
+from .. import profiling
+from .test_dashboard import load_two_companies
+
+
+def wait_for_explains():
+    profiling._explainer.submit(lambda: None).result()
+
+
+class TestQueryProfiling:
+    def test_profile_header(self, api_client, test_db_session, settings):
+        settings.QUERY_PROFILE_HEADER = True
+        load_two_companies()
+        response = api_client.get('/api/dashboard/?company=Apple Inc.&sections=sentiment_summary')
+        assert response.status_code == status.HTTP_200_OK
+        fields = dict(part.split('=') for part in response['X-Query-Profile'].split('; '))
+        assert int(fields['queries']) >= 2
+        assert int(fields['rows']) >= 4
+        assert float(fields['db_ms']) >= float(fields['slowest_ms']) > 0
+        assert response['X-Query-Profile-Slowest'].startswith(('SELECT', 'UPDATE', 'INSERT', 'DELETE'))
+
+    def test_no_header_when_disabled(self, api_client, settings):
+        settings.QUERY_PROFILE_HEADER = False
+        assert 'X-Query-Profile' not in api_client.get('/api/health/live/')
+
+    def test_slow_reads_are_explained(self, api_client, test_db_session, settings, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling, '_explained_at', {})
+        settings.SLOW_QUERY_MS = 0
+        settings.SLOW_QUERY_LOG = str(tmp_path / 'slow.log')
+        load_two_companies()
+        api_client.get('/api/dashboard/?company=Apple Inc.&sections=sentiment_summary&days=3')
+        wait_for_explains()
+
+        entries = [json.loads(line) for line in open(settings.SLOW_QUERY_LOG)]
+        statements = [entry['statement'] for entry in entries]
+        assert all(statement.lstrip().upper().startswith('SELECT') for statement in statements)
+        tweets_read = next(entry for entry in entries if 'FROM tweets' in entry['statement'])
+        assert tweets_read['path'] == '/api/dashboard/'
+        assert 'actual time' in tweets_read['plan'] and 'Buffers' in tweets_read['plan']
+
+    def test_same_statement_explained_once(self, api_client, test_db_session, settings, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling, '_explained_at', {})
+        settings.SLOW_QUERY_MS = 0
+        settings.SLOW_QUERY_LOG = str(tmp_path / 'slow.log')
+        for _ in range(3):
+            api_client.get('/api/social-media-data/')
+        wait_for_explains()
+        statements = [json.loads(line)['statement'] for line in open(settings.SLOW_QUERY_LOG)]
+        assert len(statements) == 2
+        assert len(set(statements)) == 2
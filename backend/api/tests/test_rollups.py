@@ -0,0 +1,230 @@
+import numpy as np
+from datetime import date
+import pandas as pd
+import pytest
+from rest_framework import status
+from sqlalchemy import select
+
+from ..models import CompanyDailyStats, get_db_connection, upgrade_tables
+from ..logics.loader_logics import upsert_flat_tweets
+from ..logics.process_logics import build_dashboard
+from ..logics.rollup_logics import load_daily_stats, rebuild_daily_stats, build_unique_authors, _company_days_query
+from ..logics.sketch_logics import HyperLogLog, TDigest, build_tdigests, hash_values
+from .test_loader import flat_tweets
+
+
+def authored_tweets(count, authors, start='2024-03-01 10:00:00', **overrides):
+    """``count`` tweets cycling through ``authors`` distinct usernames, one per minute."""
+    df = flat_tweets(count, created_at=pd.Timestamp(start), **overrides)
+    df['created_at'] = pd.Timestamp(start) + pd.to_timedelta(np.arange(count), unit='min')
+    df['user_username'] = [f'author-{i % authors}' for i in range(count)]
+    return df
+
+
+def stored_rollups():
+    engine, _ = get_db_connection()
+    with engine.connect() as conn:
+        return {
+            (row.company, row.day.isoformat()): row
+            for row in conn.execute(select(CompanyDailyStats.__table__))
+        }
+
+
+class TestHyperLogLog:
+    def test_estimate_within_error(self):
+        sketch = HyperLogLog()
+        sketch.update([f'user-{i}' for i in range(20000)] * 2)
+        assert abs(sketch.count() / 20000 - 1) < 0.05
+
+    def test_small_counts_are_exact(self):
+        sketch = HyperLogLog()
+        sketch.update(['a', 'b', 'c', 'a'])
+        assert sketch.count() == 3
+
+    def test_merge_equals_sketch_of_the_union(self):
+        first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        first.update([f'user-{i}' for i in range(0, 6000)])
+        second.update([f'user-{i}' for i in range(4000, 10000)])
+        union.update([f'user-{i}' for i in range(10000)])
+
+        merged = HyperLogLog.merged([first.to_bytes(), second])
+        assert np.array_equal(merged.registers, union.registers)
+        assert HyperLogLog.from_bytes(merged.to_bytes()).count() == union.count()
+
+    def test_registers_are_pinned(self):
+        # Stored sketches are merged with new ones, so hashing must never change
+        assert int(hash_values(['techfan'])[0]) == 0x381b7fc0e7d2f405
+        sketch = HyperLogLog()
+        sketch.update(['techfan', 'techfan'])
+        assert np.flatnonzero(sketch.registers).tolist() == [897]
+        assert sketch.registers[897] == 1
+
+    def test_precisions_must_match(self):
+        with pytest.raises(ValueError):
+            HyperLogLog().merge(HyperLogLog(precision=10))
+
+
+class TestTDigest:
+    def test_quantiles_close_to_exact(self):
+        values = np.random.default_rng(0).beta(2, 5, 50000)
+        digest = TDigest.from_values(values)
+        qs = [0.01, 0.1, 0.5, 0.9, 0.99]
+        assert np.allclose(digest.quantiles(qs), np.quantile(values, qs), atol=0.005)
+        assert digest.count() == 50000
+        assert digest.minimum == values.min() and digest.maximum == values.max()
+        assert len(digest.means) <= 100
+
+    def test_merged_parts_match_the_whole(self):
+        values = np.random.default_rng(1).uniform(0, 1, 30000)
+        parts = [TDigest.from_values(part).to_bytes() for part in np.array_split(values, 30)]
+        merged = TDigest.merged(parts + [None])
+        assert merged.count() == 30000
+        assert np.allclose(merged.quantiles([0.05, 0.5, 0.95]), [0.05, 0.5, 0.95], atol=0.01)
+
+        histogram = merged.histogram(np.linspace(0, 1, 11))
+        assert histogram.sum() == 30000
+        assert np.allclose(histogram, np.histogram(values, np.linspace(0, 1, 11))[0], rtol=0.05)
+
+    def test_grouped_build(self):
+        digests = build_tdigests([0.1, 0.2, 0.3, np.nan, 0.9], [0, 0, 0, 0, 2], 3)
+        assert [digest.count() for digest in digests] == [3, 0, 1]
+        assert digests[0].quantiles([0.5])[0] == pytest.approx(0.2)
+        assert digests[1].quantiles([0.5]) is None
+
+
+class TestDailyRollups:
+    def test_loader_builds_sketches_per_company_and_day(self, test_db_session):
+        # 2000 minutes: about 1.4 days, so two rollup rows
+        upsert_flat_tweets(authored_tweets(2000, authors=300), batch_size=700)
+        rollups = stored_rollups()
+        assert set(rollups) == {('Apple Inc.', '2024-03-01'), ('Apple Inc.', '2024-03-02')}
+        assert sum(row.tweet_count for row in rollups.values()) == 2000
+        assert HyperLogLog.merged([row.author_sketch for row in rollups.values()]).count() == pytest.approx(300, rel=0.05)
+
+    def test_reloads_and_updates_are_not_counted_twice(self, test_db_session):
+        upsert_flat_tweets(authored_tweets(100, authors=10))
+        changed = authored_tweets(100, authors=10)
+        changed.loc[0, 'like_count'] = 999
+        upsert_flat_tweets(changed)
+        assert stored_rollups()[('Apple Inc.', '2024-03-01')].tweet_count == 100
+
+    def test_updates_move_tweets_between_company_days(self, test_db_session):
+        upsert_flat_tweets(authored_tweets(100, authors=10))
+        changed = authored_tweets(100, authors=10)
+        changed.loc[:9, 'company'] = 'Tesla, Inc.'
+        changed.loc[10:19, 'created_at'] = pd.Timestamp('2024-03-02 09:00:00')
+        changed.loc[20:, 'user_username'] = 'author-0'
+        upsert_flat_tweets(changed)
+
+        rollups = stored_rollups()
+        assert {key: row.tweet_count for key, row in rollups.items()} == {
+            ('Apple Inc.', '2024-03-01'): 80,
+            ('Apple Inc.', '2024-03-02'): 10,
+            ('Tesla, Inc.', '2024-03-01'): 10,
+        }
+        # Only author-0 is left after 2024-03-01's first twenty tweets
+        assert HyperLogLog.from_bytes(rollups[('Apple Inc.', '2024-03-01')].author_sketch).count() == 1
+        assert HyperLogLog.from_bytes(rollups[('Tesla, Inc.', '2024-03-01')].author_sketch).count() == 10
+
+        # Same as rolling the table up from scratch
+        rebuild_daily_stats()
+        assert {key: (row.tweet_count, row.author_sketch) for key, row in stored_rollups().items()} == {
+            key: (row.tweet_count, row.author_sketch) for key, row in rollups.items()
+        }
+
+    def test_rebuilt_company_days_are_read_off_the_index(self, test_db_session):
+        query = _company_days_query([('Apple Inc.', date(2024, 3, 1)), ('Tesla, Inc.', date(2024, 3, 2))])
+        sql = str(query.compile(dialect=test_db_session.bind.dialect, compile_kwargs={'literal_binds': True}))
+        with test_db_session.bind.connect() as conn, conn.begin():
+            # The table is empty; without this the planner would scan it
+            conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = '\n'.join(row[0] for row in conn.exec_driver_sql(f'EXPLAIN {sql}'))
+        assert 'ix_tweets_company_created_at' in plan
+
+    def test_existing_tables_get_the_index(self, test_db_session):
+        engine = test_db_session.get_bind()
+        with engine.begin() as conn:
+            conn.exec_driver_sql('DROP INDEX ix_tweets_company_created_at')
+        upgrade_tables(engine)
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT to_regclass('ix_tweets_company_created_at')").scalar()
+
+    def test_truncate_resets_rollups(self, test_db_session):
+        upsert_flat_tweets(authored_tweets(100, authors=10))
+        upsert_flat_tweets(authored_tweets(5, authors=2, start='2024-04-01'), truncate=True)
+        rollups = stored_rollups()
+        assert list(rollups) == [('Apple Inc.', '2024-04-01')]
+        assert rollups[('Apple Inc.', '2024-04-01')].tweet_count == 5
+
+    def test_rebuild_matches_incremental_rollups(self, test_db_session):
+        upsert_flat_tweets(authored_tweets(1500, authors=200), batch_size=400)
+        incremental = stored_rollups()
+
+        assert rebuild_daily_stats(chunk_size=300) == {'tweets': 1500, 'company_days': 2}
+        rebuilt = stored_rollups()
+        assert set(rebuilt) == set(incremental)
+        for key, row in rebuilt.items():
+            assert row.tweet_count == incremental[key].tweet_count
+            assert row.author_sketch == incremental[key].author_sketch
+
+    def test_window_merges_daily_sketches(self, test_db_session):
+        # The same 50 authors every day for three days
+        upsert_flat_tweets(authored_tweets(3 * 1440, authors=50, start='2024-03-01 00:00:00'))
+        engine, _ = get_db_connection()
+        with engine.connect() as conn:
+            daily = load_daily_stats(conn, ['Apple Inc.'], pd.Timestamp('2024-03-01').date(), pd.Timestamp('2024-03-03').date())
+        result = build_unique_authors(daily['Apple Inc.'])
+        assert result['unique_authors'] == pytest.approx(50, rel=0.05)
+        assert result['tweet_count'] == 3 * 1440
+        # Each day saw the same authors, so every daily sketch equals the merged one
+        assert [day['unique_authors'] for day in result['daily']] == [result['unique_authors']] * 3
+
+
+class TestUniqueAuthorsSections:
+    def test_dashboard_section_without_reading_tweets(self, test_db_session):
+        now = pd.Timestamp.now().floor('s')
+        upsert_flat_tweets(authored_tweets(40, authors=7, start=now - pd.Timedelta(hours=1)))
+        result = build_dashboard(['Apple Inc.', 'Nobody'], sections=['unique_authors'], days=7)
+        assert result['Nobody'] is None
+        assert result['Apple Inc.']['unique_authors']['unique_authors'] == 7
+        assert result['Apple Inc.']['unique_authors']['tweet_count'] == 40
+
+    def test_sentiment_distribution_sections(self, test_db_session):
+        now = pd.Timestamp.now().floor('s')
+        tweets = authored_tweets(100, authors=5, start=now - pd.Timedelta(hours=2))
+        tweets['sentiment_score'] = np.arange(100) / 100
+        upsert_flat_tweets(tweets, batch_size=30)
+        result = build_dashboard(['Apple Inc.'], sections=['sentiment_percentiles', 'sentiment_histogram'], days=7)['Apple Inc.']
+
+        percentiles = result['sentiment_percentiles']
+        assert percentiles['count'] == 100
+        assert (percentiles['min'], percentiles['max']) == (0.0, 0.99)
+        assert percentiles['percentiles']['p50'] == pytest.approx(0.495, abs=0.02)
+        assert percentiles['percentiles']['p95'] == pytest.approx(0.945, abs=0.02)
+
+        histogram = result['sentiment_histogram']
+        assert [(bin['start'], bin['end']) for bin in histogram][:2] == [(0.0, 0.1), (0.1, 0.2)]
+        assert sum(bin['count'] for bin in histogram) == 100
+        assert all(bin['count'] == pytest.approx(10, abs=2) for bin in histogram)
+
+    def test_rescored_tweets_replace_their_old_scores(self, test_db_session):
+        now = pd.Timestamp.now().floor('s')
+        tweets = authored_tweets(100, authors=5, start=now - pd.Timedelta(hours=2))
+        upsert_flat_tweets(tweets)
+        rescored = tweets.assign(sentiment_score=0.1, sentiment_label='negative')
+        upsert_flat_tweets(rescored, batch_size=30)
+        percentiles = build_dashboard(['Apple Inc.'], sections=['sentiment_percentiles'], days=7)['Apple Inc.']['sentiment_percentiles']
+        assert percentiles['count'] == 100
+        assert (percentiles['min'], percentiles['max']) == (0.1, 0.1)
+
+    def test_endpoint(self, api_client, test_db_session):
+        upsert_flat_tweets(authored_tweets(60, authors=12))
+        response = api_client.get('/api/companies/unique-authors/?company=Apple Inc.&company=Nobody&start=2024-03-01&end=2024-03-31')
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data['companies']['Apple Inc.']['unique_authors'] == 12
+        assert data['companies']['Nobody'] == {'unique_authors': 0, 'tweet_count': 0, 'daily': []}
+
+    def test_endpoint_validates_dates(self, api_client):
+        response = api_client.get('/api/companies/unique-authors/?company=Apple Inc.&start=March')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,93 @@
+from rest_framework import status
+from ..models import get_db_connection, upgrade_tables
+from ..logics.loader_logics import upsert_flat_tweets
+from ..logics.search_logics import search_tweets
+from .test_loader import flat_tweets
+
+
+def load_searchable_tweets():
+    engine, _ = get_db_connection()
+    upgrade_tables(engine)
+    tweets = flat_tweets(6)
+    tweets['text'] = [
+        'The new battery lasts forever',
+        'Battery life is terrible, battery drains fast',
+        'Loving the camera on this phone',
+        'Shipping was slow',
+        'battery battery battery',
+        'Camera and battery both great',
+    ]
+    tweets.loc[3:, 'company'] = 'Tesla, Inc.'
+    tweets.loc[1, 'sentiment_label'] = 'negative'
+    upsert_flat_tweets(tweets)
+
+
+class TestSearchTweets:
+    def test_ranked_matches_with_stemming(self, api_client, test_db_session):
+        load_searchable_tweets()
+        response = api_client.get('/api/tweets/search/?q=batteries')
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert {tweet['id'] for tweet in data} == {'tweet-0', 'tweet-1', 'tweet-4', 'tweet-5'}
+        ranks = [tweet['rank'] for tweet in data]
+        assert ranks == sorted(ranks, reverse=True)
+        assert data[0]['id'] == 'tweet-4'
+        assert data[0]['company'] == 'Tesla, Inc.'
+        assert data[0]['sentiment']['label'] == 'positive'
+
+    def test_filters(self, api_client, test_db_session):
+        load_searchable_tweets()
+        data = api_client.get('/api/tweets/search/?q=battery&company=Apple Inc.').json()
+        assert {tweet['id'] for tweet in data} == {'tweet-0', 'tweet-1'}
+        data = api_client.get('/api/tweets/search/?q=battery&sentiment=negative').json()
+        assert [tweet['id'] for tweet in data] == ['tweet-1']
+        data = api_client.get('/api/tweets/search/?q=battery&since=2024-03-01T10:04:00').json()
+        assert {tweet['id'] for tweet in data} == {'tweet-4', 'tweet-5'}
+        data = api_client.get('/api/tweets/search/?q="battery drains"').json()
+        assert [tweet['id'] for tweet in data] == ['tweet-1']
+        data = api_client.get('/api/tweets/search/?q=camera -battery').json()
+        assert [tweet['id'] for tweet in data] == ['tweet-2']
+
+    def test_pagination(self, api_client, test_db_session):
+        load_searchable_tweets()
+        for sort in ('rank', 'recent'):
+            seen = []
+            url = f'/api/tweets/search/?q=battery&sort={sort}&limit=1'
+            while url:
+                response = api_client.get(url)
+                seen.extend(tweet['id'] for tweet in response.json())
+                cursor = response.get('X-Next-Cursor')
+                url = f'/api/tweets/search/?q=battery&sort={sort}&limit=1&cursor={cursor}' if cursor else None
+            assert sorted(seen) == ['tweet-0', 'tweet-1', 'tweet-4', 'tweet-5']
+            if sort == 'recent':
+                assert seen == ['tweet-5', 'tweet-4', 'tweet-1', 'tweet-0']
+
+    def test_equal_ranks_are_not_skipped(self, test_db_session):
+        engine, _ = get_db_connection()
+        upgrade_tables(engine)
+        upsert_flat_tweets(flat_tweets(5, text='same words everywhere'))
+        ids = []
+        cursor = None
+        with engine.connect() as conn:
+            while True:
+                results, cursor = search_tweets(conn, 'words', limit=2, cursor=cursor)
+                ids.extend(tweet['id'] for tweet in results)
+                if cursor is None:
+                    break
+        assert ids == [f'tweet-{i}' for i in range(5)]
+
+    def test_invalid_parameters(self, api_client, test_db_session):
+        assert api_client.get('/api/tweets/search/').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/tweets/search/?q=x&sort=oldest').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/tweets/search/?q=x&cursor=abc').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/tweets/search/?q=x&since=yesterday').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_uses_the_gin_index(self, test_db_session):
+        load_searchable_tweets()
+        engine, _ = get_db_connection()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            plan = '\n'.join(row[0] for row in conn.exec_driver_sql(
+                "EXPLAIN SELECT id FROM tweets WHERE text_search @@ websearch_to_tsquery('english', 'battery')"
+            ))
+        assert 'ix_tweets_text_search' in plan
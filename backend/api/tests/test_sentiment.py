@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from ..logics.sentiment_logics import SentimentScorer, score_texts
+
+
+class TestScoreTexts:
+    def test_labels_and_score_range(self):
+        scores, labels, confidences = score_texts([
+            'love my new iPhone', 'Teams keeps crashing during meetings', 'shipping on Tuesday', None,
+        ])
+        assert list(labels) == ['positive', 'negative', 'neutral', 'neutral']
+        assert scores[0] > 0.7 and scores[1] < 0.3 and scores[2] == 0.5 and scores[3] == 0.5
+        assert ((confidences >= 0.5) & (confidences < 1)).all()
+
+    def test_negation_and_intensifiers(self):
+        scores, labels, _ = score_texts(['good', 'not good', 'very good', "wouldn't recommend it"])
+        assert list(labels) == ['positive', 'negative', 'positive', 'negative']
+        assert scores[2] > scores[0]
+
+    def test_lookback_stops_at_the_previous_text(self):
+        # A negation ending one text must not flip the first word of the next
+        _, labels, _ = score_texts(['this is not', 'great stuff'])
+        assert list(labels) == ['neutral', 'positive']
+
+
+class TestSentimentScorer:
+    def test_duplicates_and_repeats_come_from_the_cache(self):
+        scorer = SentimentScorer(workers=1, chunk_size=1000, cache_size=100)
+        texts = pd.Series(['love it', 'hate it', 'love it', 'love it'], index=[10, 11, 12, 13])
+        result = scorer.score(texts)
+        assert list(result.index) == [10, 11, 12, 13]
+        assert list(result['sentiment_label']) == ['positive', 'negative', 'positive', 'positive']
+        assert scorer.stats()['scored'] == 2
+
+        again = scorer.score(texts)
+        pd.testing.assert_frame_equal(again, result)
+        stats = scorer.stats()
+        assert (stats['texts'], stats['scored'], stats['cache_hits']) == (8, 2, 6)
+        assert stats['tweets_per_second'] > 0
+
+    def test_cache_is_bounded(self):
+        scorer = SentimentScorer(workers=1, chunk_size=1000, cache_size=10)
+        scorer.score(pd.Series([f'good tweet {i}' for i in range(25)]))
+        assert scorer.stats()['cache_size'] == 10
+
+    def test_process_pool_matches_inline_scoring(self):
+        texts = pd.Series([f'{phrase} #{i}' for i in range(300) for phrase in ('great phone', 'bugs everywhere', 'meh')])
+        scorer = SentimentScorer(workers=2, chunk_size=200, cache_size=10000)
+        try:
+            result = scorer.score(texts)
+        finally:
+            if scorer._pool is not None:
+                scorer._pool.shutdown()
+        scores, labels, _ = score_texts(texts.to_numpy())
+        assert np.array_equal(result['sentiment_score'].to_numpy(), scores)
+        assert list(result['sentiment_label']) == list(labels)
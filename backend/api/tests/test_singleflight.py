@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+import pytest
+from django.test import RequestFactory
+from rest_framework import status
+from ..logics import job_logics
+from ..models import BackgroundJob
+from ..logics.singleflight_logics import SingleFlight, coalesce, _run_with_lease, _remove_stale_results, FileLease
+
+
+def run_in_threads(count, target):
+    results = [None] * count
+    def worker(index):
+        results[index] = target()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_run(self):
+        calls = []
+        def slow():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'result'
+
+        flight = SingleFlight()
+        assert run_in_threads(5, lambda: flight.do('key', slow)) == ['result'] * 5
+        assert len(calls) == 1
+        assert flight.stats == {'leaders': 1, 'followers': 4}
+
+    def test_followers_get_the_error(self):
+        flight = SingleFlight()
+        errors = []
+        def fail():
+            time.sleep(0.2)
+            raise RuntimeError('boom')
+        def call():
+            try:
+                flight.do('key', fail)
+            except RuntimeError as e:
+                errors.append(str(e))
+        run_in_threads(3, call)
+        assert errors == ['boom'] * 3
+
+    def test_lease_shares_results_between_holders(self, settings, tmp_path):
+        # Separate open() calls conflict under flock, so threads stand in for processes here
+        settings.SINGLE_FLIGHT_DIR = str(tmp_path)
+        calls = []
+        def slow():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'shared'
+        assert run_in_threads(3, lambda: _run_with_lease('etl:key', slow)) == ['shared'] * 3
+        assert len(calls) == 1
+
+        # A finished result isn't reused by later callers: that would be caching, not coalescing
+        assert _run_with_lease('etl:key', lambda: 'fresh') == 'fresh'
+
+    def test_coalesce(self, settings, tmp_path):
+        settings.SINGLE_FLIGHT_DIR = str(tmp_path)
+        assert coalesce('a', lambda: 'x') == 'x'
+        assert not [name for name in os.listdir(tmp_path) if name.endswith('.lock')]
+
+    def test_lease_files_are_removed_without_letting_two_holders_in(self, tmp_path):
+        path = str(tmp_path / 'key.lock')
+        holders = []
+        active = []
+
+        def hold():
+            with FileLease(path, timeout=10) as lease:
+                assert lease.acquired
+                active.append(1)
+                holders.append(len(active))
+                time.sleep(0.05)
+                active.pop()
+        run_in_threads(6, hold)
+        assert holders == [1] * 6
+        assert not os.path.exists(path)
+
+    def test_stale_lock_files_are_swept_unless_held(self, tmp_path):
+        stale, held = tmp_path / 'stale.lock', tmp_path / 'held.lock'
+        for path in (stale, held):
+            path.touch()
+            os.utime(path, (0, 0))
+        with FileLease(str(held), timeout=0):
+            os.utime(held, (0, 0))
+            _remove_stale_results(str(tmp_path), 60)
+        assert not stale.exists()
+        assert not held.exists()
+
+
+class TestJobCoalescing:
+    def test_identical_etl_submissions_share_a_job(self, test_db_session):
+        first = job_logics.submit_job('etl', days=7)
+        second = job_logics.submit_job('etl', days=7)
+        other = job_logics.submit_job('etl', days=30)
+        assert second['id'] == first['id']
+        assert other['id'] != first['id']
+        assert test_db_session.query(BackgroundJob).count() == 2
+
+    def test_submissions_join_a_job_waiting_for_a_worker(self, test_db_session, settings):
+        settings.JOB_HEARTBEAT_TIMEOUT = 0
+        first = job_logics.submit_job('etl', days=7)
+        assert job_logics.submit_job('etl', days=7)['id'] == first['id']
+
+
+class TestClientKey:
+    def test_forwarded_for_ignored_from_untrusted_peers(self, settings):
+        from ..views import _client_key
+        settings.TRUSTED_PROXIES = []
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.2.3.4', REMOTE_ADDR='203.0.113.7')
+        assert _client_key(request) == '203.0.113.7'
+
+    def test_forwarded_for_read_from_the_right_behind_trusted_proxies(self, settings):
+        from ..views import _client_key
+        settings.TRUSTED_PROXIES = ['10.0.0.0/8']
+        # The client spoofed the first hop; 10.1.1.1 is a second proxy of ours
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 198.51.100.5, 10.1.1.1', REMOTE_ADDR='10.0.0.2')
+        assert _client_key(request) == '198.51.100.5'
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='garbage', REMOTE_ADDR='10.0.0.2')
+        assert _client_key(request) == 'garbage'
+
+
+class TestClientConcurrencyLimit:
+    def test_excess_requests_get_429(self, api_client, monkeypatch):
+        from .. import views
+        monkeypatch.setattr(views._expensive_requests, 'limit', 1)
+        assert views._expensive_requests.acquire('127.0.0.1')
+        try:
+            response = api_client.get('/api/dashboard/?company=Apple Inc.')
+            assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            assert response['Retry-After'] == '1'
+            # Other clients are unaffected
+            other = api_client.get('/api/dashboard/', REMOTE_ADDR='10.0.0.9')
+            assert other.status_code == status.HTTP_400_BAD_REQUEST
+        finally:
+            views._expensive_requests.release('127.0.0.1')
@@ -1,6 +1,9 @@
+import json
 import pytest
 from datetime import datetime, timedelta
 from ..models import SocialMediaData, Tweet
+from ..logics.read_logics import encode_cursor, page_query
+from django.test import AsyncClient
 from rest_framework import status
 
 @pytest.mark.django_db
@@ -115,4 +118,117 @@ class TestDatabaseOperations:
             SocialMediaData.created_at.desc()
         ).all()
         assert ordered_data[0].username == "user0"
-        assert ordered_data[-1].username == f"user{len(companies)-1}"
\ No newline at end of file
+        assert ordered_data[-1].username == f"user{len(companies)-1}"
+
+@pytest.fixture
+def many_social_media_data(test_db_session):
+    base = datetime(2024, 3, 1, 12, 0, 0)
+    rows = []
+    for i in range(7):
+        rows.append(SocialMediaData(
+            username=f"pager{i}",
+            gender="unknown",
+            likes=i,
+            text=f"Paged content {i}",
+            company="PageCo" if i % 2 == 0 else "OtherCo",
+            sentiment="positive",
+            score=0.5,
+            # Two rows share a timestamp so the id tie-breaker is exercised
+            created_at=base - timedelta(hours=min(i, 5))
+        ))
+    test_db_session.add_all(rows)
+    test_db_session.commit()
+    return rows
+
+
+@pytest.mark.django_db
+class TestSocialMediaPagination:
+    def test_keyset_pages_cover_all_rows_once(self, api_client, many_social_media_data):
+        seen = []
+        url = '/api/social-media-data/?limit=3'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(item['username'] for item in response.json())
+            cursor = response.get('X-Next-Cursor')
+            url = f'/api/social-media-data/?limit=3&cursor={cursor}' if cursor else None
+
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+        assert seen[:5] == ['pager0', 'pager1', 'pager2', 'pager3', 'pager4']
+
+    def test_link_header_keeps_query(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/by-company/PageCo/?limit=2')
+        assert [item['username'] for item in response.json()] == ['pager0', 'pager2']
+        assert 'rel="next"' in response['Link']
+        assert 'limit=2' in response['Link']
+
+    def test_invalid_cursor(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/?cursor=garbage')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_stream_mode_returns_full_array(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/by-company/OtherCo/?stream=1')
+        assert response.status_code == status.HTTP_200_OK
+        data = json.loads(b''.join(response.streaming_content))
+        assert [item['username'] for item in data] == ['pager1', 'pager3', 'pager5']
+        assert data[0]['score'] == 0.5
+
+    def test_cursor_pages_are_read_off_the_index(self, test_db_session, many_social_media_data):
+        query = page_query([SocialMediaData.id], 3, encode_cursor(datetime(2024, 3, 1, 10), 4), [SocialMediaData.company == 'PageCo'])
+        sql = str(query.compile(dialect=test_db_session.bind.dialect, compile_kwargs={'literal_binds': True}))
+        with test_db_session.bind.connect() as conn, conn.begin():
+            # The table is tiny; without this the planner would scan and sort it
+            conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = '\n'.join(row[0] for row in conn.exec_driver_sql(f'EXPLAIN {sql}'))
+        assert 'ix_social_media_data_company_created_at_id' in plan
+        assert 'Sort' not in plan
+
+
+@pytest.mark.django_db
+class TestSocialMediaFilters:
+    def test_filters_combine(self, api_client, many_social_media_data):
+        response = api_client.get(
+            '/api/social-media-data/?since=2024-03-01T08:00:00&min_likes=2&sentiment=positive'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['username'] for item in response.json()] == ['pager2', 'pager3', 'pager4']
+
+    def test_until_is_exclusive(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/by-company/PageCo/?until=2024-03-01T10:00:00')
+        assert [item['username'] for item in response.json()] == ['pager4', 'pager6']
+
+    def test_fields_projection(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/by-company/OtherCo/?fields=text,score&limit=1')
+        assert response.json() == [{'text': 'Paged content 1', 'score': 0.5}]
+        assert response.get('X-Next-Cursor')
+
+    def test_unknown_field(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/?fields=score')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'score' in response.json()['error']
+
+    def test_invalid_filter_value(self, api_client, many_social_media_data):
+        response = api_client.get('/api/social-media-data/?min_score=high')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestAsyncSocialMediaData:
+    def test_same_pages_as_sync_endpoint(self, api_client, many_social_media_data):
+        for query in ['?limit=3', '?since=2024-03-01T08:00:00&min_likes=2&sentiment=positive']:
+            sync_response = api_client.get('/api/social-media-data/' + query)
+            async_response = api_client.get('/api/async/social-media-data/' + query)
+            assert async_response.status_code == status.HTTP_200_OK
+            assert async_response.json() == sync_response.json()
+            assert async_response.get('X-Next-Cursor') == sync_response.get('X-Next-Cursor')
+
+    @pytest.mark.asyncio
+    async def test_by_company_stream(self, many_social_media_data):
+        response = await AsyncClient().get('/api/async/social-media-data/by-company/PageCo/?stream=1&fields=username')
+        assert response.status_code == status.HTTP_200_OK
+        body = json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+        assert body == [{'username': name} for name in ['pager0', 'pager2', 'pager4', 'pager6']]
+
+    def test_invalid_query(self, api_client, many_social_media_data):
+        response = api_client.get('/api/async/social-media-data/?cursor=garbage')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,40 @@
+import threading
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from ..logics import hot_tier_logics
+from ..logics.startup_logics import measure_cold_start, STARTUP_TASKS, _warm_hot_tier
+
+
+class TestStartup:
+    def test_settings_do_not_connect(self):
+        assert not hasattr(settings, 'engine')
+
+    def test_urlconf_leaves_heavy_modules_for_first_use(self):
+        result = measure_cold_start()
+        assert result['heavy_modules'] == []
+        assert result['total_seconds'] >= result['setup_seconds'] > 0
+        assert any(entry['module'] == 'django' for entry in result['imports'])
+
+    def test_profile_command(self):
+        out = StringIO()
+        call_command('profile_startup', '--limit', '3', stdout=out)
+        lines = out.getvalue().splitlines()
+        assert lines[0].startswith('Cold start: ')
+        assert len(lines) == 4
+
+    def test_hot_tier_is_loaded_at_startup(self, monkeypatch, settings):
+        assert _warm_hot_tier in STARTUP_TASKS
+        loaded = []
+        started = threading.Event()
+        monkeypatch.setattr(hot_tier_logics, '_hot_tier', None)
+        monkeypatch.setattr(hot_tier_logics, '_sync_forever', lambda tier: loaded.append(tier) or started.set())
+
+        settings.HOT_TIER_ENABLED = False
+        _warm_hot_tier()
+        assert hot_tier_logics.hot_tier_stats() is None
+
+        settings.HOT_TIER_ENABLED = True
+        _warm_hot_tier()
+        assert started.wait(5)
+        assert loaded == [hot_tier_logics.get_hot_tier()]
@@ -2,8 +2,22 @@ from django.urls import path
 from .views import (
     GetSocialMediaData,
     GetSocialMediaDataByCompany,
+    AsyncGetSocialMediaData,
+    AsyncGetSocialMediaDataByCompany,
     ProcessCompanyData,
     UpdateDatabaseWithNewMockedData,
+    IngestTweetsFile,
+    Dashboard,
+    SearchTweets,
+    CompanySuggestions,
+    UniqueAuthors,
+    RecentDashboard,
+    TweetEvents,
+    JobStatus,
+    PoolMetrics,
+    Liveness,
+    Readiness,
+    JobResult,
     UserProfileView
 )
 
@@ -11,6 +25,20 @@ urlpatterns = [
     path('user/profile/', UserProfileView.as_view(), name='user-profile'),
     path('social-media-data/', GetSocialMediaData.as_view(), name='social-media-data'),
     path('social-media-data/by-company/<str:company>/', GetSocialMediaDataByCompany.as_view(), name='social-media-data-by-company'),
+    path('async/social-media-data/', AsyncGetSocialMediaData.as_view(), name='async-social-media-data'),
+    path('async/social-media-data/by-company/<str:company>/', AsyncGetSocialMediaDataByCompany.as_view(), name='async-social-media-data-by-company'),
     path('social-media-data/etl/', ProcessCompanyData.as_view(), name='process_company_data'),
-    path('social-media-data/create-new-mocked-data/', UpdateDatabaseWithNewMockedData.as_view(), name='create_new_mocked_data')
+    path('social-media-data/create-new-mocked-data/', UpdateDatabaseWithNewMockedData.as_view(), name='create_new_mocked_data'),
+    path('dashboard/', Dashboard.as_view(), name='dashboard'),
+    path('dashboard/recent/', RecentDashboard.as_view(), name='dashboard-recent'),
+    path('events/tweets/', TweetEvents.as_view(), name='tweet-events'),
+    path('companies/', CompanySuggestions.as_view(), name='company-suggestions'),
+    path('companies/unique-authors/', UniqueAuthors.as_view(), name='unique-authors'),
+    path('tweets/search/', SearchTweets.as_view(), name='search-tweets'),
+    path('tweets/ingest/', IngestTweetsFile.as_view(), name='ingest-tweets'),
+    path('health/live/', Liveness.as_view(), name='health-live'),
+    path('health/ready/', Readiness.as_view(), name='health-ready'),
+    path('metrics/pool/', PoolMetrics.as_view(), name='pool-metrics'),
+    path('jobs/<str:job_id>/', JobStatus.as_view(), name='job-status'),
+    path('jobs/<str:job_id>/result/', JobResult.as_view(), name='job-result')
 ]
\ No newline at end of file
@@ -2,21 +2,47 @@ from django.shortcuts import render
 from django.contrib.auth.models import User
 from rest_framework import generics
 from .serializers import UserSerializer
+from .authentication import invalidate_user, CachedJWTAuthentication
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import SocialMediaData, SearchedCompanies, get_db_connection
+from .models import SocialMediaData, SearchedCompanies, get_db_connection, get_read_db_connection
+from .engines import pool_stats, get_async_engine, dispose_async_engines, read_database_name
 from django.views import View
-from django.http import JsonResponse
-from .logics.process_logics import process_tweets_for_frontend
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .logics.singleflight_logics import coalesce, ClientConcurrencyLimiter
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-import pandas as pd
-from .logics.data_mocking_logics import create_mocked_data_and_update_db
+from .logics.job_logics import submit_job, get_job
+from .logics.read_logics import (
+    InvalidQuery, parse_limit, parse_positive_int, parse_filters, parse_fields, decode_cursor, fetch_page,
+    stream_rows_as_json, async_fetch_page, async_stream_rows_as_json
+)
+from .logics.company_logics import get_company_index
+from .logics.health_logics import liveness, readiness
+from .logics.version_logics import (
+    read_social_media_version, async_read_social_media_version, social_media_validator, etl_validator
+)
+from django.conf import settings
+import functools
+import ipaddress
+import json
+import os
+import uuid
+from datetime import date
+
+# The logic modules built on pandas (process, ingest, delta, search, rollup, hot tier) are imported by the views
+# that use them, so loading the URLconf - every worker boot and manage.py command - stays light.
 
 
 # Create your views here.
 class UserProfileView(APIView):
+    # Serializes and updates the User row, which stateless authentication doesn't load
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -29,6 +55,7 @@ class UserProfileView(APIView):
         serializer = UserSerializer(request.user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            invalidate_user(request.user)
             return Response(serializer.data)
         return Response(serializer.errors, status=400)
 
@@ -39,66 +66,274 @@ class RegisterUser(generics.CreateAPIView):
     permission_classes = (AllowAny,)
 
 
+SOCIAL_MEDIA_DATA_FIELDS = [
+    SocialMediaData.id,
+    SocialMediaData.username,
+    SocialMediaData.gender,
+    SocialMediaData.likes,
+    SocialMediaData.text,
+    SocialMediaData.company,
+    SocialMediaData.sentiment,
+    SocialMediaData.created_at,
+]
+
+SOCIAL_MEDIA_DATA_BY_COMPANY_FIELDS = [
+    SocialMediaData.id,
+    SocialMediaData.username,
+    SocialMediaData.gender,
+    SocialMediaData.likes,
+    SocialMediaData.text,
+    SocialMediaData.company,
+    SocialMediaData.sentiment,
+    SocialMediaData.score,
+    SocialMediaData.created_at,
+]
+
+
+def _not_modified(request, etag, last_modified):
+    """A 304 when the client's copy (If-None-Match / If-Modified-Since) is current, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _with_validators(response, etag, last_modified, **cache_control):
+    """Add ETag, Last-Modified and Cache-Control (arguments of patch_cache_control) to 200s and 304s."""
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+def _parse_social_media_query(request, columns, conditions):
+    """Validate every query parameter up front so a bad request never gets a 304."""
+    columns = parse_fields(request.GET, columns)
+    conditions = list(conditions) + parse_filters(request.GET)
+    limit = parse_limit(request.GET.get('limit'), settings.SOCIAL_MEDIA_PAGE_SIZE, settings.SOCIAL_MEDIA_MAX_PAGE_SIZE)
+    if request.GET.get('cursor'):
+        decode_cursor(request.GET['cursor'])
+    return columns, conditions, limit
+
+
+def _page_response(request, rows, next_cursor, limit):
+    response = JsonResponse(rows, safe=False)
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        params['limit'] = limit
+        response['X-Next-Cursor'] = next_cursor
+        response['Link'] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+    return response
+
+
+def _social_media_data_response(request, columns, conditions=()):
+    """
+    Newest-first SocialMediaData rows as a JSON array.
+
+    ``?limit=`` and ``?cursor=`` page through the rows by (created_at, id); the cursor of the
+    next page is returned in the ``X-Next-Cursor`` header and a ``Link: rel="next"`` header.
+    ``?stream=1`` returns every row instead, streamed from a server-side cursor.
+    ``since``, ``until``, ``sentiment``, ``min_score`` and ``min_likes`` filter the rows and
+    ``fields`` selects the columns; all of them end up in the single SQL query.
+    Responses carry an ETag / Last-Modified from the social_media_data version and the filter,
+    so polling clients get a 304 after a single primary-key lookup.
+    """
+    # Read-only: served by the replica when one is configured and fresh enough
+    _, Session = get_read_db_connection()
+
+    try:
+        columns, conditions, limit = _parse_social_media_query(request, columns, conditions)
+    except InvalidQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    session = Session()
+    try:
+        etag, last_modified = social_media_validator(read_social_media_version(session), conditions)
+
+        response = _not_modified(request, etag, last_modified)
+        if response is None and request.GET.get('stream') in ('1', 'true'):
+            response = StreamingHttpResponse(
+                stream_rows_as_json(Session, columns, conditions),
+                content_type='application/json'
+            )
+        elif response is None:
+            rows, next_cursor = fetch_page(session, columns, limit, request.GET.get('cursor'), conditions)
+            response = _page_response(request, rows, next_cursor, limit)
+        # no-cache: caches may keep the body but must revalidate, which is a cheap 304
+        return _with_validators(response, etag, last_modified, no_cache=True)
+    finally:
+        session.close()
+
+
+async def _async_social_media_data_response(request, columns, conditions=()):
+    """Async twin of _social_media_data_response for ASGI servers; same parameters and output."""
+    try:
+        columns, conditions, limit = _parse_social_media_query(request, columns, conditions)
+    except InvalidQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # Under WSGI the view runs on an event loop of its own, which ends with the request
+    per_request_loop = not isinstance(request, ASGIRequest)
+    # The body is streamed from the database the validator came from
+    database = read_database_name()
+    try:
+        async with get_async_engine(database).connect() as conn:
+            etag, last_modified = social_media_validator(await async_read_social_media_version(conn), conditions)
+            response = _not_modified(request, etag, last_modified)
+            if response is None and request.GET.get('stream') in ('1', 'true'):
+                response = StreamingHttpResponse(
+                    async_stream_rows_as_json(columns, conditions, database=database, dispose_engines=per_request_loop),
+                    content_type='application/json'
+                )
+            elif response is None:
+                rows, next_cursor = await async_fetch_page(conn, columns, limit, request.GET.get('cursor'), conditions)
+                response = _page_response(request, rows, next_cursor, limit)
+    finally:
+        if per_request_loop:
+            await dispose_async_engines()
+    return _with_validators(response, etag, last_modified, no_cache=True)
+
+
 class GetSocialMediaData(View):
     def get(self, request):
-        _, Session = get_db_connection()
-        session = Session()
-        data = session.query(SocialMediaData).all()
-        session.close()
-        
-        result = [
-            {
-                'id': item.id,
-                'username': item.username,
-                'gender': item.gender,
-                'likes': item.likes,
-                'text': item.text,
-                'company': item.company,
-                'sentiment': item.sentiment,
-                'created_at': item.created_at
-            }
-            for item in data
-        ]
-        return JsonResponse(result, safe=False)
+        return _social_media_data_response(request, SOCIAL_MEDIA_DATA_FIELDS)
     
 
 class GetSocialMediaDataByCompany(View):
     def get(self, request, company):
-        _, Session = get_db_connection()
-        session = Session()
-        data = session.query(SocialMediaData).filter(SocialMediaData.company == company).all()
-        session.close()
-        
-        result = [
-            {
-                'id': item.id,
-                'username': item.username,
-                'gender': item.gender,
-                'likes': item.likes,
-                'text': item.text,
-                'company': item.company,
-                'sentiment': item.sentiment,
-                'score': item.score,
-                'created_at': item.created_at
-            }
-            for item in data
-        ]
-        return JsonResponse(result, safe=False)
+        return _social_media_data_response(
+            request, SOCIAL_MEDIA_DATA_BY_COMPANY_FIELDS, [SocialMediaData.company == company]
+        )
     
 
+class AsyncGetSocialMediaData(View):
+    async def get(self, request):
+        return await _async_social_media_data_response(request, SOCIAL_MEDIA_DATA_FIELDS)
+
+
+class AsyncGetSocialMediaDataByCompany(View):
+    async def get(self, request, company):
+        return await _async_social_media_data_response(
+            request, SOCIAL_MEDIA_DATA_BY_COMPANY_FIELDS, [SocialMediaData.company == company]
+        )
+
+
+_expensive_requests = ClientConcurrencyLimiter(settings.EXPENSIVE_REQUESTS_PER_CLIENT)
+
+
+@functools.lru_cache(maxsize=8)
+def _proxy_networks(proxies):
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted_proxy(address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _proxy_networks(tuple(settings.TRUSTED_PROXIES)))
+
+
+def _client_key(request):
+    """
+    Address of the client, as seen by the first proxy that isn't in TRUSTED_PROXIES.
+
+    These views don't run DRF authentication, so clients are told apart by address. Anyone
+    can send an X-Forwarded-For header, so it is only read when the peer is a trusted
+    proxy, and then from the right: each trusted proxy appended the address it received
+    the request from.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not forwarded or not _is_trusted_proxy(address):
+        return address
+    for hop in reversed([hop.strip() for hop in forwarded.split(',') if hop.strip()]):
+        address = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return address
+
+
+def _limit_per_client(view_method):
+    """Answer 429 when the client already has EXPENSIVE_REQUESTS_PER_CLIENT requests running."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        client = _client_key(request)
+        if not _expensive_requests.acquire(client):
+            response = JsonResponse({'error': 'Too many concurrent requests from this client'}, status=429)
+            response['Retry-After'] = '1'
+            return response
+        try:
+            return view_method(self, request, *args, **kwargs)
+        finally:
+            _expensive_requests.release(client)
+    return wrapper
+
+
+def _read_json_body(request):
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _job_response(request, job, status=200):
+    job = dict(job)
+    result_path = job.pop('result_path')
+    job['status_url'] = request.build_absolute_uri(reverse('job-status', args=[job['id']]))
+    job['result_location'] = (
+        request.build_absolute_uri(reverse('job-result', args=[job['id']])) if result_path else None
+    )
+    return JsonResponse(job, status=status)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ProcessCompanyData(View):
-    def post(self, request):
+    @_limit_per_client
+    def get(self, request):
+        """
+        Cacheable, synchronous variant of the ETL for dashboards and shared caches.
+
+        The validator comes from the tweets data version, so unchanged data is answered with
+        a 304 without running the ETL.
+        """
+        from .logics.process_logics import process_tweets_coalesced
+
         try:
-            # Log the request body for debugging
-            print("Request body:", request.body)
+            days = parse_positive_int('days', request.GET.get('days'), 30)
+        except InvalidQuery as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
-            # Assuming etl_company_data() returns a dataframe
-            json_result = process_tweets_for_frontend(days=30)
+        try:
+            # From the same database the ETL reads, so the validator never runs ahead of the data
+            engine, _ = get_read_db_connection()
+            with engine.connect() as conn:
+                etag, last_modified = etl_validator(conn, days)
 
-            
+            response = _not_modified(request, etag, last_modified)
+            if response is None:
+                # Identical concurrent requests share one ETL run
+                result = process_tweets_coalesced(days=days, etag=etag)
+                response = HttpResponse(result, content_type='application/json')
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+        return _with_validators(response, etag, last_modified, public=True, max_age=settings.ETL_CACHE_MAX_AGE)
+
+    def post(self, request):
+        # Log the request body for debugging
+        print("Request body:", request.body)
+        try:
+            days = parse_positive_int('days', _read_json_body(request).get('days'), 30)
+        except InvalidQuery as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
-            return JsonResponse(json_result, safe=False, status=200)
+        try:
+            # The ETL runs on the job pool; clients poll the status endpoint for the result
+            job = submit_job('etl', days=days)
+            return _job_response(request, job, status=202)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
         
@@ -106,13 +341,292 @@ class ProcessCompanyData(View):
 @method_decorator(csrf_exempt, name='dispatch')
 class UpdateDatabaseWithNewMockedData(View):
     def post(self, request):
+        # Log the request body for debugging
+        print("Request body:", request.body)
+        body = _read_json_body(request)
         try:
-            # Log the request body for debugging
-            print("Request body:", request.body)
+            num_tweets_per_company = parse_positive_int('num_tweets_per_company', body.get('num_tweets_per_company'), 5000)
+            days = parse_positive_int('days', body.get('days'), 365)
+        except InvalidQuery as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
-            create_mocked_data_and_update_db()
-            return JsonResponse('', safe=False, status=200)
+        try:
+            job = submit_job('mock_data', num_tweets_per_company=num_tweets_per_company, days=days)
+            return _job_response(request, job, status=202)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
-        
-    
\ No newline at end of file
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class IngestTweetsFile(View):
+    def post(self, request):
+        from .logics.ingest_logics import detect_format, SUPPORTED_FORMATS
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return JsonResponse({'error': 'Upload the export as the "file" form field'}, status=400)
+        try:
+            fmt = request.POST.get('format') or detect_format(upload.name)
+            if fmt not in SUPPORTED_FORMATS:
+                raise ValueError(f"Unsupported format {fmt}")
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Django already spooled large uploads to a temp file; copy it chunk by chunk
+        os.makedirs(settings.INGEST_UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.INGEST_UPLOAD_DIR, f"{uuid.uuid4().hex}.{fmt}")
+        with open(path, 'wb') as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+
+        try:
+            job = submit_job('ingest', path=path, fmt=fmt, batch_size=settings.INGEST_BATCH_SIZE, remove_upload=True)
+            return _job_response(request, job, status=202)
+        except Exception as e:
+            # The job deletes the upload once it has run; without one nothing else will
+            os.remove(path)
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class Dashboard(View):
+    @_limit_per_client
+    def get(self, request):
+        """
+        Several dashboard sections for several companies in one request.
+
+        ``?company=`` is repeated once per company (names may contain commas), ``?sections=``
+        is a comma-separated subset of ALL_SECTIONS (default: all) and ``?days=`` the window.
+        All companies are read with a single query and the response is keyed by company.
+        """
+        from .logics.process_logics import build_dashboard_cached, ALL_SECTIONS
+
+        companies = list(dict.fromkeys(name.strip() for name in request.GET.getlist('company') if name.strip()))
+        if not companies:
+            return JsonResponse({'error': 'Pass at least one ?company='}, status=400)
+        if len(companies) > settings.DASHBOARD_MAX_COMPANIES:
+            return JsonResponse({'error': f'At most {settings.DASHBOARD_MAX_COMPANIES} companies per request'}, status=400)
+
+        sections = [name.strip() for name in request.GET.get('sections', '').split(',') if name.strip()] or list(ALL_SECTIONS)
+        unknown = set(sections) - set(ALL_SECTIONS)
+        if unknown:
+            return JsonResponse({'error': f"Unknown sections: {', '.join(sorted(unknown))}; available: {', '.join(ALL_SECTIONS)}"}, status=400)
+
+        try:
+            days = parse_positive_int('days', request.GET.get('days'), 30)
+        except InvalidQuery as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            # Validator and body come from the same (read) database
+            engine, _ = get_read_db_connection()
+            with engine.connect() as conn:
+                etag, last_modified = etl_validator(conn, days)
+
+            response = _not_modified(request, etag, last_modified)
+            if response is None:
+                body = coalesce(
+                    f"dashboard:{etag}:{json.dumps([companies, sections, days])}",
+                    lambda: json.dumps({
+                        'time_period': f"Last {days} days",
+                        'sections': sections,
+                        'companies': build_dashboard_cached(companies, sections, days, etag),
+                    })
+                )
+                response = HttpResponse(body, content_type='application/json')
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+        return _with_validators(response, etag, last_modified, public=True, max_age=settings.ETL_CACHE_MAX_AGE)
+
+
+class RecentDashboard(View):
+    def get(self, request):
+        """
+        Sentiment summary, trend per bucket and top tweets of the last ``?hours=`` per company.
+
+        ``?company=`` is repeated once per company and hours defaults to (and is capped at)
+        HOT_TIER_HOURS. Answered from this process's hot tier without touching the database;
+        until it has loaded, or when it is disabled, the window is read from the database.
+        """
+        from .logics.hot_tier_logics import get_hot_tier, new_hot_tier, reload
+
+        companies = list(dict.fromkeys(name.strip() for name in request.GET.getlist('company') if name.strip()))
+        if not companies:
+            return JsonResponse({'error': 'Pass at least one ?company='}, status=400)
+        if len(companies) > settings.DASHBOARD_MAX_COMPANIES:
+            return JsonResponse({'error': f'At most {settings.DASHBOARD_MAX_COMPANIES} companies per request'}, status=400)
+
+        try:
+            hours = float(request.GET.get('hours', settings.HOT_TIER_HOURS))
+        except ValueError:
+            return JsonResponse({'error': 'hours must be a number'}, status=400)
+        if not 0 < hours <= settings.HOT_TIER_HOURS:
+            return JsonResponse({'error': f'hours must be between 0 and {settings.HOT_TIER_HOURS}'}, status=400)
+
+        try:
+            tier = get_hot_tier() if settings.HOT_TIER_ENABLED else None
+            source = 'memory'
+            if tier is None or not tier.ready:
+                tier = new_hot_tier()
+                reload(tier, companies)
+                source = 'database'
+            response = JsonResponse({
+                'hours': hours,
+                'source': source,
+                'version': tier.version,
+                'companies': {company: tier.summary(company, hours) for company in companies},
+            })
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class SearchTweets(View):
+    def get(self, request):
+        """
+        Full-text search over tweet text, best matches first.
+
+        ``?q=`` takes web search syntax; ``company`` (repeatable), ``sentiment``, ``since`` and
+        ``until`` filter the matches and ``sort=recent`` orders them newest first instead.
+        ``?limit=`` and ``?cursor=`` page through the results; the cursor of the next page is
+        returned in the ``X-Next-Cursor`` and ``Link: rel="next"`` headers.
+        """
+        from .logics.search_logics import parse_search, search_tweets
+
+        try:
+            search = parse_search(request.GET)
+            limit = parse_limit(request.GET.get('limit'), settings.SEARCH_PAGE_SIZE, settings.SEARCH_MAX_PAGE_SIZE)
+        except InvalidQuery as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            engine, _ = get_db_connection()
+            with engine.connect() as conn:
+                results, next_cursor = search_tweets(conn, limit=limit, **search)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+        return _page_response(request, results, next_cursor, limit)
+
+
+class CompanySuggestions(View):
+    def get(self, request):
+        """
+        Companies whose name (or a later word of it) starts with ``?q=``, with their tweet counts.
+
+        Served from the in-process CompanyIndex, so a keystroke never reaches the database.
+        """
+        try:
+            limit = parse_limit(request.GET.get('limit'), settings.COMPANY_SUGGESTIONS_LIMIT, 100)
+        except InvalidQuery as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            return JsonResponse(get_company_index().search(request.GET.get('q', ''), limit), safe=False)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class UniqueAuthors(View):
+    def get(self, request):
+        """
+        Approximate distinct authors per company between ``?start=`` and ``?end=`` (dates, inclusive).
+
+        ``?company=`` is repeated once per company. The window defaults to the last 30 days and
+        is answered by merging the daily HyperLogLog sketches, never by scanning tweets.
+        """
+        from .logics.rollup_logics import load_daily_stats, window_days, build_unique_authors
+
+        companies = list(dict.fromkeys(name.strip() for name in request.GET.getlist('company') if name.strip()))
+        if not companies:
+            return JsonResponse({'error': 'Pass at least one ?company='}, status=400)
+        if len(companies) > settings.DASHBOARD_MAX_COMPANIES:
+            return JsonResponse({'error': f'At most {settings.DASHBOARD_MAX_COMPANIES} companies per request'}, status=400)
+
+        default_start, default_end = window_days(30)
+        try:
+            start_day = date.fromisoformat(request.GET['start']) if request.GET.get('start') else default_start
+            end_day = date.fromisoformat(request.GET['end']) if request.GET.get('end') else default_end
+        except ValueError:
+            return JsonResponse({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=400)
+
+        try:
+            engine, _ = get_read_db_connection()
+            with engine.connect() as conn:
+                daily = load_daily_stats(conn, companies, start_day, end_day, columns=['tweet_count', 'author_sketch'])
+            return JsonResponse({
+                'start': start_day.isoformat(),
+                'end': end_day.isoformat(),
+                'companies': {company: build_unique_authors(daily.get(company, [])) for company in companies},
+            })
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class TweetEvents(View):
+    async def get(self, request):
+        """
+        Server-Sent Events stream of what each committed tweet batch changed.
+
+        ``?company=`` (repeatable) limits the stream to some companies. Reconnecting clients
+        send ``Last-Event-ID`` to receive what they missed. Requires an ASGI server: WSGI
+        servers would buffer the endless response.
+        """
+        from .logics.delta_logics import sse_events
+
+        companies = [name.strip() for name in request.GET.getlist('company') if name.strip()]
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return JsonResponse({'error': 'Last-Event-ID must be an integer'}, status=400)
+
+        response = StreamingHttpResponse(sse_events(companies, last_event_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keep reverse proxies (nginx) from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class Liveness(View):
+    def get(self, request):
+        response = JsonResponse(liveness())
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class Readiness(View):
+    def get(self, request):
+        """
+        200 when the database answers within HEALTH_DB_TIMEOUT, 503 otherwise.
+
+        The body also carries pool statistics, cache hit rates, the age of the last ingest and
+        the ETL durations of this worker, all read from in-memory counters.
+        """
+        ready, report = readiness()
+        response = JsonResponse(report, status=200 if ready else 503)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class PoolMetrics(View):
+    def get(self, request):
+        return JsonResponse(pool_stats())
+
+
+class JobStatus(View):
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None:
+            return JsonResponse({'error': 'Job not found'}, status=404)
+        return _job_response(request, job)
+
+
+class JobResult(View):
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None or not job['result_path']:
+            return JsonResponse({'error': 'Job result not available'}, status=404)
+        # Ingest results are the rejected rows, one JSON object per line
+        content_type = 'application/x-ndjson' if job['result_path'].endswith('.jsonl') else 'application/json'
+        return FileResponse(open(job['result_path'], 'rb'), content_type=content_type)
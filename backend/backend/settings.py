@@ -13,9 +13,6 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
 import os
 
 load_dotenv()
@@ -35,9 +32,13 @@ DEBUG = True
 
 ALLOWED_HOSTS = ["*"]
 
+# With JWT_STATELESS_AUTH, API views trust the claims of validated tokens instead of loading
+# the User row; the profile view still loads it (through the cache below)
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'false').lower() in ('1', 'true', 'yes')
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -50,6 +51,10 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Per-process cache of the users authenticated by api.authentication.CachedJWTAuthentication
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -65,6 +70,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -108,7 +114,8 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # django.db.backends.postgresql, counting its connections in the connection budget
+        'ENGINE': 'api.db_backends.postgresql',
         'NAME': os.getenv('SUPABASE_DB_NAME'),
         'USER': os.getenv('SUPABASE_DB_USER'),
         'PASSWORD': os.getenv('SUPABASE_DB_PASSWORD'),
@@ -127,21 +134,114 @@ DBNAME = os.getenv("SUPABASE_DB_NAME")
 # Construct the SQLAlchemy connection string
 DATABASE_URL = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
 
-# Create the SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
-def create_db_session():
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    with SessionLocal() as session:
-        yield session
-    
-
-# Test the connection
-try:
-    with engine.connect() as connection:
-        print("Connection successful!")
-except Exception as e:
-    print(f"Failed to connect: {e}")
+# Optional streaming replica for read-only endpoints and the ETL (see api/engines.py). Reads fall
+# back to the primary while it is unreachable or more than REPLICA_MAX_LAG_SECONDS behind.
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL') or None
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', '5'))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv('REPLICA_CONNECT_TIMEOUT', '3'))
+
+# Connection pool of the shared SQLAlchemy engines (see api/engines.py). Engines are created on
+# first use, so importing the settings never opens a connection.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# Connections this process may hold open to the primary across Django and the SQLAlchemy
+# engines (api/connection_budget.py); 0 disables the cap. Connects wait up to DB_BUDGET_TIMEOUT.
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', '20'))
+DB_BUDGET_TIMEOUT = float(os.getenv('DB_BUDGET_TIMEOUT', str(DB_POOL_TIMEOUT)))
+
+# Set when DATABASE_URL and the Django database point at PgBouncer in transaction pooling mode:
+# no prepared statements or server-side cursors outside transactions. The live delta listener
+# then needs DATABASE_DIRECT_URL (the server itself) for LISTEN.
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'false').lower() in ('1', 'true', 'yes')
+DATABASE_DIRECT_URL = os.getenv('DATABASE_DIRECT_URL') or None
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = DB_PGBOUNCER
+
+# Per-request SQL profiling (api/profiling.py): X-Query-Profile header and slow-query plans
+QUERY_PROFILING_ENABLED = os.getenv('QUERY_PROFILING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+QUERY_PROFILE_HEADER = os.getenv('QUERY_PROFILE_HEADER', str(DEBUG)).lower() in ('1', 'true', 'yes')
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() in ('1', 'true', 'yes')
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '300'))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', str(BASE_DIR / 'logs' / 'slow_queries.log'))
+
+# Seconds the readiness probe waits for the database (pool checkout, connect and query)
+HEALTH_DB_TIMEOUT = float(os.getenv('HEALTH_DB_TIMEOUT', '2'))
+
+# Keyset pagination of the social-media-data endpoints
+SOCIAL_MEDIA_PAGE_SIZE = int(os.getenv('SOCIAL_MEDIA_PAGE_SIZE', '500'))
+SOCIAL_MEDIA_MAX_PAGE_SIZE = int(os.getenv('SOCIAL_MEDIA_MAX_PAGE_SIZE', '5000'))
+
+# Seconds shared caches may serve the GET ETL output before revalidating it
+ETL_CACHE_MAX_AGE = int(os.getenv('ETL_CACHE_MAX_AGE', '60'))
+
+# Upper bound on ?company= values accepted by the batched dashboard endpoint
+DASHBOARD_MAX_COMPANIES = int(os.getenv('DASHBOARD_MAX_COMPANIES', '20'))
+
+# Page size of the full-text tweet search
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', '100'))
+
+# Company autocomplete: seconds between checks for tweets written by other processes, and page size
+COMPANY_INDEX_MAX_AGE = int(os.getenv('COMPANY_INDEX_MAX_AGE', '30'))
+COMPANY_SUGGESTIONS_LIMIT = int(os.getenv('COMPANY_SUGGESTIONS_LIMIT', '10'))
+
+# Budget of the persistent per-company dashboard cache (searched_companies), trimmed LRU-first
+COMPANY_CACHE_MAX_ENTRIES = int(os.getenv('COMPANY_CACHE_MAX_ENTRIES', '5000'))
+COMPANY_CACHE_MAX_BYTES = int(os.getenv('COMPANY_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+# Seconds between batched writes of cache hit counts (0 leaves them to the next eviction)
+COMPANY_CACHE_HIT_FLUSH_SECONDS = float(os.getenv('COMPANY_CACHE_HIT_FLUSH_SECONDS', '60'))
+
+# Live updates (Server-Sent Events) pushed when the loader commits tweets
+TWEET_DELTAS_ENABLED = os.getenv('TWEET_DELTAS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+TWEET_DELTA_RETENTION = int(os.getenv('TWEET_DELTA_RETENTION', '1000'))  # versions kept for Last-Event-ID replay
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))
+
+# In-process hot tier of the last HOT_TIER_HOURS (api/logics/hot_tier_logics.py), kept in sync
+# with the tweet deltas every HOT_TIER_SYNC_SECONDS
+HOT_TIER_ENABLED = os.getenv('HOT_TIER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+HOT_TIER_HOURS = int(os.getenv('HOT_TIER_HOURS', '24'))
+HOT_TIER_BUCKET_MINUTES = int(os.getenv('HOT_TIER_BUCKET_MINUTES', '60'))
+HOT_TIER_TOP_TWEETS = int(os.getenv('HOT_TIER_TOP_TWEETS', '5'))
+HOT_TIER_SYNC_SECONDS = float(os.getenv('HOT_TIER_SYNC_SECONDS', '5'))
+
+# Background jobs (mock data generation, ETL, ingest), run by `manage.py run_jobs`: jobs each
+# run_jobs process runs at once, and how often its idle threads look for queued jobs
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+JOB_RESULTS_DIR = BASE_DIR / 'job_results'
+# Identical ETL submissions join a running job created within this many seconds
+JOB_COALESCE_WINDOW = int(os.getenv('JOB_COALESCE_WINDOW', '900'))
+# Job workers mark their jobs alive this often; running jobs silent for longer than the
+# timeout belong to a worker that died and are marked failed
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_HEARTBEAT_TIMEOUT = float(os.getenv('JOB_HEARTBEAT_TIMEOUT', '120'))
+
+# Coalescing of identical expensive computations (ETL, dashboard) across threads and processes
+SINGLE_FLIGHT_DIR = BASE_DIR / 'singleflight'
+SINGLE_FLIGHT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_TIMEOUT', '300'))
+# Concurrent expensive requests (GET ETL, dashboard) allowed per client and process
+EXPENSIVE_REQUESTS_PER_CLIENT = int(os.getenv('EXPENSIVE_REQUESTS_PER_CLIENT', '2'))
+# Addresses or networks (comma-separated, e.g. "10.0.0.0/8,127.0.0.1") of the reverse proxies
+# whose X-Forwarded-For is believed when telling clients apart; without them REMOTE_ADDR is used
+TRUSTED_PROXIES = [proxy.strip() for proxy in os.getenv('TRUSTED_PROXIES', '').split(',') if proxy.strip()]
+
+# Uploaded tweet exports are spooled here before the ingest job streams them into the database
+INGEST_UPLOAD_DIR = BASE_DIR / 'ingest_uploads'
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '5000'))
+# Malformed rows of an upload are served from its job's result; this many are also in the job itself
+INGEST_REJECT_SAMPLE_SIZE = int(os.getenv('INGEST_REJECT_SAMPLE_SIZE', '20'))
+# Lexicon scoring of ingested tweets (api/logics/sentiment_logics.py): 'missing' scores rows
+# without a sentiment, 'all' rescores every row and 'off' rejects rows without one
+INGEST_SENTIMENT_SCORING = os.getenv('INGEST_SENTIMENT_SCORING', 'missing')
+SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', str(min(4, os.cpu_count() or 1))))
+SENTIMENT_CHUNK_SIZE = int(os.getenv('SENTIMENT_CHUNK_SIZE', '20000'))  # texts per worker task
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', '200000'))  # distinct texts remembered
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
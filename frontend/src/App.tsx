@@ -34,18 +34,8 @@ function App() {
     setError(null);
     
     try {
-      // Fetch data for all time periods in parallel
-      const promises = timeFilters.map(filter =>
-        apiService.getCompanySentimentData(selectedCompanyId, filter)
-      );
-      
-      const results = await Promise.all(promises);
-      
-      // Create cache object with data for each time period
-      const newCache = timeFilters.reduce((cache, filter, index) => ({
-        ...cache,
-        [filter]: results[index]
-      }), {});
+      // One request for the longest period; the shorter ones are computed from it
+      const newCache = await apiService.getCompanySentimentDataForPeriods(selectedCompanyId, timeFilters);
       
       setSentimentDataCache(newCache);
     } catch (err) {
@@ -58,6 +58,16 @@ export interface SentimentData {
   key_topics: CompanySentiment['key_topics'];
 }
 
+// Row of the by-company endpoint, projected to the fields the dashboard uses
+interface SocialMediaRow {
+  id: string;
+  created_at: string;
+  sentiment: string;
+  score: number;
+  text: string;
+  likes: number;
+}
+
 // Base API service class
 class ApiService {
   protected api;
@@ -236,19 +246,34 @@ class ExtendedApiService extends ApiService {
     return topics;
   }
   async getCompanySentimentData(company: string, timeFilter: string = 'month'): Promise<SentimentData> {
-    const response = await this.get<Array<{
-      id: string;
-      created_at: string;
-      sentiment: string;
-      score: number;
-      text: string;
-      likes: number;
-    }>>(API_ENDPOINTS.sentiment.byCompany(company));
-    console.log(response)
-    // Filter data based on timeFilter in memory
+    const periods = await this.getCompanySentimentDataForPeriods(company, [timeFilter]);
+    return periods[timeFilter];
+  }
+
+  // All periods are computed from one request covering the longest of them
+  async getCompanySentimentDataForPeriods(company: string, timeFilters: string[]): Promise<Record<string, SentimentData>> {
+    const filterDates = timeFilters.map(timeFilter => this.getFilterDate(timeFilter));
+    const since = new Date(Math.min(...filterDates.map(date => date.getTime())));
+
+    // The endpoint pages its results; stream=1 returns every matching row in one response,
+    // and the date filter and field list are applied by the query
+    const params = new URLSearchParams({
+      stream: '1',
+      since: since.toISOString().split('T')[0],
+      fields: 'id,created_at,sentiment,score,text,likes'
+    });
+    const response = await this.get<SocialMediaRow[]>(`${API_ENDPOINTS.sentiment.byCompany(company)}?${params.toString()}`);
+
+    return timeFilters.reduce((periods, timeFilter, index) => ({
+      ...periods,
+      [timeFilter]: this.summarizeSentimentData(response, timeFilter, filterDates[index])
+    }), {} as Record<string, SentimentData>);
+  }
+
+  private getFilterDate(timeFilter: string): Date {
     const now = new Date();
     const filterDate = new Date(now);
-    
+
     switch (timeFilter) {
       case 'day':
         filterDate.setDate(now.getDate() - 1);
@@ -260,6 +285,7 @@ class ExtendedApiService extends ApiService {
         filterDate.setMonth(now.getMonth() - 1);
         break;
       case '6month':
+      case 'sixMonths':
         filterDate.setMonth(now.getMonth() - 6);
         break;
       case 'year':
@@ -268,7 +294,10 @@ class ExtendedApiService extends ApiService {
       default:
         filterDate.setMonth(now.getMonth() - 1); // Default to month
     }
+    return filterDate;
+  }
 
+  private summarizeSentimentData(response: SocialMediaRow[], timeFilter: string, filterDate: Date): SentimentData {
     // Filter data by date
     const filteredData = response.filter(item => {
       const itemDate = new Date(item.created_at * 1000);